@@ -0,0 +1,154 @@
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+# Тело запроса до 1 МБ держится в памяти, больше — во временном файле.
+MAX_BODY_IN_MEMORY = 1024 * 1024
+
+
+class ASGIHandler:
+    """ASGI-приложение поверх WSGI-приложения Django.
+
+    В Django 2.2 нет асинхронных view и ASGI-обработчика, поэтому запросы
+    принимает событийный цикл ASGI-сервера (uvicorn, daphne), а сам Django
+    выполняется в пуле из ``max_workers`` потоков. Медленные клиенты
+    (загрузка картинок, чтение ответа) не занимают потоки пула: тело
+    запроса читается до передачи в пул, а ответ отправляется клиенту
+    с ожиданием на стороне цикла. Весь запрос, включая потоковые ответы,
+    обрабатывается в одном потоке, поэтому соединения с БД (они у Django
+    свои у каждого потока) закрываются как обычно по ``request_finished``.
+
+    Выигрыш есть только при медленных клиентах: при том же числе потоков
+    и быстрых клиентах WSGI-воркер быстрее, потому что здесь каждое
+    сообщение ответа проходит через событийный цикл (см. asgi_benchmark).
+    """
+
+    def __init__(self, application, max_workers=32):
+        self.application = application
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='asgi'
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        else:
+            raise ValueError(f'Неподдерживаемый тип соединения: {scope}')
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def http(self, scope, receive, send):
+        body = tempfile.SpooledTemporaryFile(max_size=MAX_BODY_IN_MEMORY)
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return
+            body.write(message.get('body', b''))
+            more_body = message.get('more_body', False)
+        body.seek(0)
+        loop = asyncio.get_running_loop()
+
+        def send_from_thread(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        try:
+            await loop.run_in_executor(
+                self.executor, self.run_wsgi,
+                self.environ(scope, body), send_from_thread,
+            )
+        finally:
+            body.close()
+
+    def run_wsgi(self, environ, send):
+        """Выполняет WSGI-приложение и отправляет ответ по частям."""
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [
+                (name.lower().encode('latin-1'), value.encode('latin-1'))
+                for name, value in headers
+            ]
+
+        chunks = self.application(environ, start_response)
+        try:
+            # Приложение-генератор вызывает start_response только при
+            # первой итерации, поэтому заголовки уходят перед первым куском.
+            started = False
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                if not started:
+                    send(self.response_start(response))
+                    started = True
+                send({
+                    'type': 'http.response.body',
+                    'body': chunk,
+                    'more_body': True,
+                })
+            if not started:
+                send(self.response_start(response))
+            send({'type': 'http.response.body', 'body': b''})
+        finally:
+            close = getattr(chunks, 'close', None)
+            if close is not None:
+                close()
+
+    @staticmethod
+    def response_start(response):
+        return {
+            'type': 'http.response.start',
+            'status': response['status'],
+            'headers': response['headers'],
+        }
+
+    @staticmethod
+    def environ(scope, body):
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        # WSGI передаёт путь байтами UTF-8 в строке latin-1 (PEP 3333).
+        path = scope['path'].encode('utf-8')
+        root_path = scope.get('root_path', '').encode('utf-8')
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': root_path.decode('latin-1'),
+            'PATH_INFO': path.decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': str(server[0]),
+            'SERVER_PORT': str(server[1]),
+            'REMOTE_ADDR': str(client[0]),
+            'REMOTE_PORT': str(client[1]),
+            'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        for name, value in scope.get('headers', []):
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                name = 'HTTP_' + name
+            if name in environ:
+                separator = '; ' if name == 'HTTP_COOKIE' else ','
+                value = environ[name] + separator + value
+            environ[name] = value
+        return environ
@@ -0,0 +1,295 @@
+"""Нагрузочный прогон страниц yatube через тестовый клиент Django.
+
+``seed`` наполняет базу синтетическими данными заданного размера (тексты
+даёт Faker из ``mixer``, как в фикстурах тестов), ``scenarios`` описывает
+по запросу на каждый адрес из ``posts.urls``, ``about.urls``
+и ``users.urls``, а ``run`` выполняет их по кругу и собирает задержки
+и число запросов к БД. Результат сохраняется в JSON и сравнивается
+с сохранённым ранее (``compare``), чтобы замечать регрессии.
+"""
+import importlib
+import random
+import statistics
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from mixer.backend.django import mixer
+
+from posts import caching, counters, importing, stats
+from posts.models import Comment, Follow, Group, Post, User
+
+URL_MODULES = ('posts.urls', 'about.urls', 'users.urls')
+AUTHOR = 'bench_author'
+READER = 'bench_reader'
+PASSWORD = 'bench-password'
+
+# Запрос к адресу: кто его делает (None — гость, иначе 'author' или
+# 'reader'), метод и данные. Автор — сотрудник, чтобы видеть выгрузки,
+# читатель подписан на автора.
+Scenario = namedtuple(
+    'Scenario', ('url_name', 'user', 'method', 'data'),
+    defaults=(None, 'get', None),
+)
+
+SCENARIOS = (
+    Scenario('posts:index'),
+    Scenario('posts:index', 'reader'),
+    Scenario('posts:post_search', data={'q': '{word}'}),
+    Scenario('posts:post_create', 'author'),
+    Scenario('posts:group_list'),
+    Scenario('posts:group_list', 'reader'),
+    Scenario('posts:profile'),
+    Scenario('posts:profile', 'reader'),
+    Scenario('posts:post_detail'),
+    Scenario('posts:post_detail', 'reader'),
+    Scenario('posts:post_edit', 'author'),
+    Scenario(
+        'posts:add_comment', 'reader', 'post', {'text': 'Комментарий'}
+    ),
+    Scenario('posts:export_data', 'author'),
+    Scenario('posts:api_index'),
+    Scenario('posts:api_post_detail'),
+    Scenario('posts:api_group_list'),
+    Scenario('posts:api_profile'),
+    Scenario('posts:api_follow_index', 'reader'),
+    Scenario('posts:follow_index', 'reader'),
+    # Сначала отписка, потом подписка: к следующему кругу читатель снова
+    # подписан на автора.
+    Scenario('posts:profile_unfollow', 'reader'),
+    Scenario('posts:profile_follow', 'reader'),
+    Scenario('about:author'),
+    Scenario('about:tech'),
+    Scenario('users:login'),
+    Scenario('users:logout', 'reader'),
+    Scenario('users:password_change', 'reader'),
+    Scenario('users:password_change_done', 'reader'),
+    Scenario('users:password_reset'),
+    Scenario('users:password_reset_done'),
+    Scenario('users:password_reset_confirm'),
+    Scenario('users:password_reset_complete'),
+    Scenario('users:signup'),
+)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def url_patterns():
+    """Пары (имя адреса с пространством имён, параметры адреса)."""
+    for module_name in URL_MODULES:
+        module = importlib.import_module(module_name)
+        for pattern in module.urlpatterns:
+            yield (
+                f'{module.app_name}:{pattern.name}',
+                tuple(pattern.pattern.converters),
+            )
+
+
+def scenarios():
+    """Сценарии из SCENARIOS и GET от гостя для адресов без сценария."""
+    covered = {scenario.url_name for scenario in SCENARIOS}
+    return list(SCENARIOS) + [
+        Scenario(url_name) for url_name, _ in url_patterns()
+        if url_name not in covered
+    ]
+
+
+def label(scenario):
+    user = scenario.user or 'guest'
+    return f'{scenario.method.upper()} {scenario.url_name} ({user})'
+
+
+def seed(users=200, groups=10, posts=5000, comments=5000, follows=1000,
+         random_seed=0, batch_size=1000):
+    """Наполняет пустую базу синтетическими данными.
+
+    Всё вставляется через bulk_create, а посты — тем же
+    ``importing.create_posts``, что и при импорте, поэтому поисковый
+    индекс, ленты подписок и счётчики обновляются так же.
+    """
+    rng = random.Random(random_seed)
+    faker = mixer.faker
+    faker.seed_instance(random_seed)
+    password = make_password(PASSWORD)
+    with transaction.atomic():
+        User.objects.bulk_create([
+            User(username=AUTHOR, password=password, is_staff=True),
+            User(username=READER, password=password),
+        ] + [
+            User(
+                username=f'{faker.user_name()}{number}',
+                email=faker.email(),
+                password=password,
+            )
+            for number in range(max(users - 2, 0))
+        ])
+        user_ids = list(User.objects.order_by('pk').values_list(
+            'pk', flat=True
+        ))
+        author_id, reader_id = User.objects.filter(
+            username__in=(AUTHOR, READER)
+        ).order_by('-is_staff').values_list('pk', flat=True)
+        Group.objects.bulk_create([
+            Group(
+                title=faker.sentence(nb_words=3)[:200],
+                slug=f'group-{number}',
+                description=faker.text(200),
+            )
+            for number in range(max(groups, 1))
+        ])
+        group_ids = list(Group.objects.values_list('pk', flat=True))
+
+        pairs = {(reader_id, author_id)}
+        for _ in range(follows * 2):
+            if len(pairs) >= follows + 1:
+                break
+            user_id, followed_id = rng.sample(user_ids, 2)
+            pairs.add((user_id, followed_id))
+        Follow.objects.bulk_create([
+            Follow(user_id=user_id, author_id=followed_id)
+            for user_id, followed_id in pairs
+        ])
+
+    for start in range(0, posts, batch_size):
+        with transaction.atomic():
+            importing.create_posts([
+                Post(
+                    author_id=author_id if number % 10 == 0 else rng.choice(
+                        user_ids
+                    ),
+                    group_id=rng.choice(group_ids + [None]),
+                    text=faker.text(rng.choice((200, 500, 1500))),
+                )
+                for number in range(start, min(start + batch_size, posts))
+            ])
+
+    post_ids = list(Post.objects.values_list('pk', flat=True))
+    if post_ids:
+        Comment.objects.bulk_create([
+            Comment(
+                post_id=rng.choice(post_ids),
+                author_id=rng.choice(user_ids),
+                text=faker.sentence(),
+            )
+            for _ in range(comments)
+        ])
+    stats.reconcile(batch_size)
+    counters.forget_all()
+    caching.purge([caching.ALL_TAG])
+
+
+def url_kwargs():
+    """Значения параметров адресов по засеянным данным."""
+    author = User.objects.get(username=AUTHOR)
+    reader = User.objects.get(username=READER)
+    post = Post.objects.filter(author=author).order_by('-pk').first()
+    post = post or Post.objects.order_by('-pk').first()
+    group = Group.objects.order_by('pk').first()
+    return {
+        'slug': group.slug,
+        'username': author.username,
+        'post_id': post.pk,
+        'name': 'follows',
+        'uidb64': urlsafe_base64_encode(force_bytes(reader.pk)),
+        'token': default_token_generator.make_token(reader),
+        'word': post.text.split()[0].strip('.,'),
+    }, {'author': author, 'reader': reader}
+
+
+def run(scenarios, rounds=20, warmup=2, cold=False):
+    """Выполняет сценарии по кругу ``warmup + rounds`` раз.
+
+    Возвращает словарь: подпись сценария → задержки (секунды), число
+    запросов к БД и коды ответов для каждого замеренного запроса. При
+    ``cold`` перед каждым запросом очищается кэш.
+    """
+    values, users = url_kwargs()
+    patterns = dict(url_patterns())
+    prepared = []
+    for scenario in scenarios:
+        url = reverse(scenario.url_name, kwargs={
+            name: values[name] for name in patterns[scenario.url_name]
+        })
+        data = {
+            key: value.format(**values)
+            for key, value in (scenario.data or {}).items()
+        }
+        client = Client()
+        if scenario.user:
+            client.force_login(users[scenario.user])
+        prepared.append((scenario, client, url, data))
+
+    cache.clear()
+    results = {
+        label(scenario): {'latencies': [], 'queries': [], 'statuses': []}
+        for scenario in scenarios
+    }
+    for number in range(warmup + rounds):
+        for scenario, client, url, data in prepared:
+            if cold:
+                cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = getattr(client, scenario.method)(url, data)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                elapsed = time.perf_counter() - started
+            if number >= warmup:
+                result = results[label(scenario)]
+                result['latencies'].append(elapsed)
+                result['queries'].append(len(queries))
+                result['statuses'].append(response.status_code)
+            session = client.cookies.get(settings.SESSION_COOKIE_NAME)
+            if scenario.user and not (session and session.value):
+                # Сценарий выхода завершил сессию.
+                client.force_login(users[scenario.user])
+    return results
+
+
+def summarize(results):
+    """Перцентили задержек (мс), запросы к БД и запросы в секунду."""
+    summary = {}
+    for name, result in results.items():
+        latencies = result['latencies']
+        summary[name] = {
+            'requests': len(latencies),
+            'p50': round(statistics.median(latencies) * 1000, 2),
+            'p95': round(percentile(latencies, 0.95) * 1000, 2),
+            'p99': round(percentile(latencies, 0.99) * 1000, 2),
+            'rps': round(len(latencies) / sum(latencies), 1),
+            'queries': round(statistics.mean(result['queries']), 1),
+            'errors': sum(status >= 400 for status in result['statuses']),
+        }
+    return summary
+
+
+def compare(summary, baseline, tolerance=0.25):
+    """Регрессии относительно baseline: p95 выросла больше чем
+    на ``tolerance`` или запросов к БД стало больше."""
+    regressions = []
+    for name, current in summary.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current['p95'] > previous['p95'] * (1 + tolerance):
+            regressions.append(
+                f'{name}: p95 {previous["p95"]} → {current["p95"]} мс'
+            )
+        if current['queries'] > previous['queries']:
+            regressions.append(
+                f'{name}: запросов к БД {previous["queries"]} → '
+                f'{current["queries"]}'
+            )
+    return regressions
@@ -0,0 +1,235 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# Время последнего чтения обновляется не чаще раза в секунду на ключ:
+# для LRU этого достаточно, а лишних записей в файл становится меньше.
+LRU_RESOLUTION = 1.0
+CULL_CHECK_EVERY = 64
+MAX_VARIABLES = 500
+
+
+class SQLiteCache(BaseCache):
+    """Кэш в файле SQLite, общий для всех процессов на машине.
+
+    В отличие от ``LocMemCache`` все воркеры gunicorn видят одни и те же
+    записи, поэтому прогрев и инвалидация в одном процессе действуют на
+    остальные. Файл открывается в режиме WAL: чтения не блокируют запись.
+    При переполнении вытесняются давно не читавшиеся ключи (LRU),
+    ``incr`` атомарен между процессами.
+
+    OPTIONS: ``MAX_ENTRIES``, ``CULL_FREQUENCY`` (как у встроенных
+    бэкендов) и ``BUSY_TIMEOUT`` — сколько секунд ждать блокировку файла.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        options = params.get('OPTIONS', {})
+        self._busy_timeout = float(options.get('BUSY_TIMEOUT', 5))
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+        directory = os.path.dirname(self._path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(
+            self._path, timeout=self._busy_timeout, isolation_level=None
+        )
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS cache ('
+            'key TEXT PRIMARY KEY, value BLOB NOT NULL, '
+            'expires REAL, accessed REAL NOT NULL) WITHOUT ROWID'
+        )
+        connection.execute(
+            'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)'
+        )
+        self._local.connection = connection
+        self._local.pid = os.getpid()
+        return connection
+
+    def _write(self, func):
+        """Выполняет func(connection, now) в транзакции с блокировкой
+        записи, чтобы чтение и изменение ключа были атомарны."""
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            result = func(connection, time.time())
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        return result
+
+    @staticmethod
+    def _alive(expires, now):
+        return expires is None or expires > now
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        names = {self._key(key, version): key for key in keys}
+        connection = self._connection()
+        now = time.time()
+        rows = []
+        chunk = list(names)
+        while chunk:
+            batch, chunk = chunk[:MAX_VARIABLES], chunk[MAX_VARIABLES:]
+            rows += connection.execute(
+                'SELECT key, value, expires, accessed FROM cache '
+                'WHERE key IN (%s)' % ', '.join('?' * len(batch)),
+                batch,
+            ).fetchall()
+        result, touched = {}, []
+        for name, value, expires, accessed in rows:
+            if not self._alive(expires, now):
+                continue
+            result[names[name]] = pickle.loads(value)
+            if now - accessed > LRU_RESOLUTION:
+                touched.append((now, name))
+        if touched:
+            connection.executemany(
+                'UPDATE cache SET accessed = ? WHERE key = ?', touched
+            )
+        return result
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout=timeout, version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        rows = [
+            (self._key(key, version),
+             pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+            for key, value in data.items()
+        ]
+
+        def store(connection, now):
+            connection.executemany(
+                'INSERT OR REPLACE INTO cache (key, value, expires, accessed) '
+                'VALUES (?, ?, ?, ?)',
+                [(name, value, expires, now) for name, value in rows],
+            )
+            self._maybe_cull(connection, now, len(rows))
+
+        self._write(store)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        name = self._key(key, version)
+        expires = self.get_backend_timeout(timeout)
+        value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+        def store(connection, now):
+            row = connection.execute(
+                'SELECT expires FROM cache WHERE key = ?', (name,)
+            ).fetchone()
+            if row is not None and self._alive(row[0], now):
+                return False
+            connection.execute(
+                'INSERT OR REPLACE INTO cache (key, value, expires, accessed) '
+                'VALUES (?, ?, ?, ?)',
+                (name, value, expires, now),
+            )
+            self._maybe_cull(connection, now, 1)
+            return True
+
+        return self._write(store)
+
+    def incr(self, key, delta=1, version=None):
+        name = self._key(key, version)
+
+        def increment(connection, now):
+            row = connection.execute(
+                'SELECT value, expires FROM cache WHERE key = ?', (name,)
+            ).fetchone()
+            if row is None or not self._alive(row[1], now):
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(row[0]) + delta
+            connection.execute(
+                'UPDATE cache SET value = ?, accessed = ? WHERE key = ?',
+                (pickle.dumps(value, pickle.HIGHEST_PROTOCOL), now, name),
+            )
+            return value
+
+        return self._write(increment)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        name = self._key(key, version)
+        expires = self.get_backend_timeout(timeout)
+
+        def update(connection, now):
+            return connection.execute(
+                'UPDATE cache SET expires = ?, accessed = ? WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                (expires, now, name, now),
+            ).rowcount > 0
+
+        return self._write(update)
+
+    def has_key(self, key, version=None):
+        row = self._connection().execute(
+            'SELECT expires FROM cache WHERE key = ?',
+            (self._key(key, version),),
+        ).fetchone()
+        return row is not None and self._alive(row[0], time.time())
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version=version)
+
+    def delete_many(self, keys, version=None):
+        names = [(self._key(key, version),) for key in keys]
+        if names:
+            self._write(lambda connection, now: connection.executemany(
+                'DELETE FROM cache WHERE key = ?', names
+            ))
+
+    def clear(self):
+        self._write(
+            lambda connection, now: connection.execute('DELETE FROM cache')
+        )
+
+    def close(self, **kwargs):
+        # Соединение живёт всё время работы потока: Django вызывает close()
+        # после каждого запроса, а открывать файл заново дорого.
+        pass
+
+    def _maybe_cull(self, connection, now, written):
+        self._writes += written
+        if self._writes < CULL_CHECK_EVERY:
+            return
+        self._writes = 0
+        connection.execute(
+            'DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?',
+            (now,),
+        )
+        count = connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            connection.execute('DELETE FROM cache')
+            return
+        connection.execute(
+            'DELETE FROM cache WHERE key IN ('
+            'SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+            (count - self._max_entries + count // self._cull_frequency,),
+        )
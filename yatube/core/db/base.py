@@ -0,0 +1,119 @@
+"""SQLite для работы под нагрузкой: ``ENGINE = 'core.db'``.
+
+Отличия от встроенного бэкенда:
+
+* при подключении включаются WAL (читатели не ждут писателя),
+  ``synchronous=NORMAL``, ``mmap_size``, ``cache_size``, ``busy_timeout``
+  и ``temp_store``; значения можно переопределить в ``OPTIONS['PRAGMAS']``;
+* транзакции на основной базе начинаются с ``BEGIN IMMEDIATE``: пишущая
+  транзакция сразу берёт блокировку записи и ждёт её, а не получает
+  ``database is locked`` посреди транзакции при попытке начать запись.
+  Цена — все блоки ``atomic()`` на основной базе выполняются по одному:
+  и пишущие (``save()`` с наследованием, ``delete()``, ``bulk_create``,
+  импорт постов, заполнение базы для бенчмарка, создание счётчиков в
+  ``posts.stats``), и только читающие, которые ждут писателя наравне
+  с записью. Поэтому чтение в ``atomic()`` не оборачиваем. На репликах
+  из ``DB_REPLICAS`` только читают, и там транзакции обычные (``BEGIN``);
+* запрос, получивший ``database is locked``, повторяется до
+  ``OPTIONS['LOCK_RETRIES']`` раз с растущей паузой от
+  ``OPTIONS['LOCK_BACKOFF']`` секунд, но все попытки вместе укладываются
+  в ``OPTIONS['LOCK_TIMEOUT']`` секунд: ``busy_timeout`` по умолчанию
+  делит это время между попытками, а новая попытка не начинается после
+  срока. Без повторов ``busy_timeout`` — всё время ожидания целиком.
+
+Соединения, как и во встроенном бэкенде, у каждого потока свои;
+со ``CONN_MAX_AGE`` они живут между запросами, и прагмы выполняются
+один раз на соединение.
+"""
+import random
+import time
+
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+from django.db.backends.sqlite3.base import Database
+
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    # Отрицательное значение — размер в КиБ, на каждое соединение.
+    'cache_size': -16 * 1024,
+    'temp_store': 'MEMORY',
+}
+OWN_OPTIONS = (
+    'PRAGMAS', 'LOCK_RETRIES', 'LOCK_BACKOFF', 'LOCK_TIMEOUT',
+    'TRANSACTION_MODE',
+)
+LOCKED_ERRORS = ('database is locked', 'database table is locked')
+
+
+def is_locked(error):
+    return any(message in str(error) for message in LOCKED_ERRORS)
+
+
+class SQLiteCursorWrapper(base.SQLiteCursorWrapper):
+    """Курсор, повторяющий запросы, упёршиеся в блокировку базы."""
+
+    retries = 0
+    backoff = 0
+    timeout = 5
+
+    def execute(self, query, params=None):
+        return self._retry(super().execute, query, params)
+
+    def executemany(self, query, param_list):
+        return self._retry(super().executemany, query, param_list)
+
+    def _retry(self, method, *args):
+        deadline = time.monotonic() + self.timeout
+        for attempt in range(self.retries + 1):
+            try:
+                return method(*args)
+            except Database.OperationalError as error:
+                left = deadline - time.monotonic()
+                if attempt == self.retries or left <= 0 or not is_locked(
+                    error
+                ):
+                    raise
+            # Экспоненциальная пауза со случайной добавкой, чтобы
+            # несколько ждущих потоков не просыпались одновременно.
+            time.sleep(min(
+                self.backoff * 2 ** attempt * random.uniform(1, 1.5), left
+            ))
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        for name in OWN_OPTIONS:
+            kwargs.pop(name, None)
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        options = self.settings_dict['OPTIONS']
+        pragmas = {
+            **PRAGMAS,
+            # Миллисекунды на одну попытку из общего LOCK_TIMEOUT.
+            'busy_timeout': int(
+                options.get('LOCK_TIMEOUT', 5) * 1000
+                / (options.get('LOCK_RETRIES', 5) + 1)
+            ),
+            **options.get('PRAGMAS', {}),
+        }
+        for name, value in pragmas.items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        return connection
+
+    def create_cursor(self, name=None):
+        cursor = self.connection.cursor(factory=SQLiteCursorWrapper)
+        options = self.settings_dict['OPTIONS']
+        cursor.retries = options.get('LOCK_RETRIES', 5)
+        cursor.backoff = options.get('LOCK_BACKOFF', 0.05)
+        cursor.timeout = options.get('LOCK_TIMEOUT', 5)
+        return cursor
+
+    def _start_transaction_under_autocommit(self):
+        default = '' if self.alias in settings.DB_REPLICAS else 'IMMEDIATE'
+        mode = self.settings_dict['OPTIONS'].get('TRANSACTION_MODE', default)
+        self.cursor().execute(f'BEGIN {mode}'.strip())
@@ -0,0 +1,212 @@
+import asyncio
+import io
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.urls import reverse
+
+from core.asgi import ASGIHandler
+from core.benchmark import percentile
+from posts.models import Group, Post
+
+
+def with_io_delay(application, delay):
+    """Добавляет к каждому запросу блокирующее ожидание, как у медленного
+    запроса к БД или к хранилищу картинок."""
+    def wrapper(environ, start_response):
+        if delay:
+            time.sleep(delay)
+        return application(environ, start_response)
+    return wrapper
+
+
+def scope_for(url):
+    path, _, query = url.partition('?')
+    return {
+        'type': 'http',
+        'method': 'GET',
+        'path': path,
+        'query_string': query.encode(),
+        'headers': [(b'host', b'testserver')],
+        'server': ('testserver', 80),
+    }
+
+
+def warm_up(application, urls):
+    """По запросу на адрес до замера, чтобы оба варианта работали
+    с прогретыми шаблонами и кэшем страниц, а не первый — с холодными."""
+    for url in urls:
+        environ = ASGIHandler.environ(scope_for(url), io.BytesIO())
+        chunks = application(environ, lambda *args: None)
+        try:
+            b''.join(chunks)
+        finally:
+            chunks.close()
+
+
+def run_wsgi(application, urls, requests, concurrency, threads,
+             client_delay):
+    """Клиенты ждут свободный поток пула, как запросы в очереди воркера.
+
+    Поток WSGI-воркера сам читает запрос из сокета, поэтому медленная
+    передача запроса клиентом (``client_delay``) занимает поток.
+    """
+    pool = ThreadPoolExecutor(max_workers=threads)
+    latencies, errors = [], []
+
+    def handle(url):
+        if client_delay:
+            time.sleep(client_delay)
+        status = []
+        environ = ASGIHandler.environ(scope_for(url), io.BytesIO())
+        chunks = application(
+            environ, lambda line, headers, exc_info=None: status.append(line)
+        )
+        try:
+            b''.join(chunks)
+        finally:
+            chunks.close()
+        return status[0]
+
+    def client(number):
+        for i in range(requests // concurrency):
+            started = time.perf_counter()
+            status = pool.submit(
+                handle, urls[(number + i) % len(urls)]
+            ).result()
+            if not status.startswith('200'):
+                errors.append(status)
+            latencies.append(time.perf_counter() - started)
+
+    clients = [
+        threading.Thread(target=client, args=(number,))
+        for number in range(concurrency)
+    ]
+    started = time.perf_counter()
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    pool.shutdown()
+    return latencies, len(errors), elapsed
+
+
+def run_asgi(application, urls, requests, concurrency, threads,
+             client_delay):
+    """Запрос от медленного клиента читает событийный цикл, и поток пула
+    занимается только обработкой в Django."""
+    handler = ASGIHandler(application, max_workers=threads)
+    latencies, errors = [], []
+
+    async def request(url):
+        statuses = []
+
+        async def receive():
+            if client_delay:
+                await asyncio.sleep(client_delay)
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                statuses.append(message['status'])
+
+        await handler(scope_for(url), receive, send)
+        return statuses[0]
+
+    async def client(number):
+        for i in range(requests // concurrency):
+            started = time.perf_counter()
+            status = await request(urls[(number + i) % len(urls)])
+            if status != 200:
+                errors.append(status)
+            latencies.append(time.perf_counter() - started)
+
+    async def main():
+        await asyncio.gather(
+            *(client(number) for number in range(concurrency))
+        )
+
+    started = time.perf_counter()
+    asyncio.run(main())
+    elapsed = time.perf_counter() - started
+    handler.executor.shutdown()
+    return latencies, len(errors), elapsed
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает один процесс с одинаковым числом потоков при запуске '
+        'через WSGI и через ASGI (yatube/asgi.py): блокирующий ввод-вывод '
+        'внутри запроса занимает поток в обоих случаях, а медленная '
+        'передача запроса клиентом — только у WSGI'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=64)
+        parser.add_argument(
+            '--threads', type=int, default=settings.ASGI_THREADS,
+            help='Потоков в пуле у обоих вариантов (по умолчанию '
+                 'ASGI_THREADS)',
+        )
+        parser.add_argument(
+            '--io-delay', type=float, default=0.02,
+            help='Блокирующее ожидание внутри запроса (БД, хранилище), '
+                 'секунд',
+        )
+        parser.add_argument(
+            '--client-delay', type=float, default=0.1,
+            help='Сколько клиент передаёт запрос (медленная сеть, загрузка '
+                 'картинки), секунд',
+        )
+        parser.add_argument(
+            'urls', nargs='*',
+            help='Адреса страниц (по умолчанию главная, группа, профиль '
+                 'и пост из базы)',
+        )
+
+    def default_urls(self):
+        urls = [reverse('posts:index')]
+        post = Post.objects.select_related('author').first()
+        group = Group.objects.first()
+        if group is not None:
+            urls.append(reverse('posts:group_list', args=(group.slug,)))
+        if post is not None:
+            urls.append(reverse('posts:profile', args=(post.author,)))
+            urls.append(reverse('posts:post_detail', args=(post.pk,)))
+        return urls
+
+    def handle(self, *args, **options):
+        settings.ALLOWED_HOSTS = list(settings.ALLOWED_HOSTS) + ['testserver']
+        urls = options['urls'] or self.default_urls()
+        application = with_io_delay(
+            get_wsgi_application(), options['io_delay']
+        )
+        self.stdout.write(
+            f'{len(urls)} адресов, {options["requests"]} запросов, '
+            f'{options["concurrency"]} клиентов, '
+            f'{options["threads"]} потоков, '
+            f'ввод-вывод {options["io_delay"] * 1000:.0f} мс, '
+            f'передача запроса {options["client_delay"] * 1000:.0f} мс'
+        )
+        for name, run in (('wsgi', run_wsgi), ('asgi', run_asgi)):
+            warm_up(application, urls)
+            latencies, errors, elapsed = run(
+                application, urls, options['requests'],
+                options['concurrency'], options['threads'],
+                options['client_delay'],
+            )
+            self.stdout.write(
+                f'{name}: '
+                f'{len(latencies) / elapsed:.0f} запросов/с, '
+                f'p50 {statistics.median(latencies) * 1000:.1f} мс, '
+                f'p95 {percentile(latencies, 0.95) * 1000:.1f} мс, '
+                f'p99 {percentile(latencies, 0.99) * 1000:.1f} мс, '
+                f'ошибок {errors}'
+            )
@@ -0,0 +1,152 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import setup_databases, teardown_databases
+
+from core import benchmark
+from posts.models import User
+
+
+# Тестовая SQLite-база по умолчанию живёт в памяти и исчезает вместе с
+# соединением, поэтому для --keepdb ей нужен файл.
+KEEPDB_NAME = os.path.join(settings.BASE_DIR, 'benchmark.sqlite3')
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный прогон всех страниц из posts.urls, about.urls '
+        'и users.urls на тестовой базе с синтетическими данными: '
+        'p50/p95/p99, запросы к БД и запросы в секунду для каждой страницы'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--posts', type=int, default=5000)
+        parser.add_argument('--comments', type=int, default=5000)
+        parser.add_argument('--follows', type=int, default=1000)
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Зерно генератора данных, чтобы прогоны были сравнимы',
+        )
+        parser.add_argument(
+            '--rounds', type=int, default=20,
+            help='Сколько раз выполнить каждый сценарий',
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=2,
+            help='Сколько первых кругов не учитывать',
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш перед каждым запросом',
+        )
+        parser.add_argument(
+            '--url-name', action='append',
+            help='Прогнать только эти адреса (например, posts:index)',
+        )
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help='Держать тестовую базу в файле KEEPDB_NAME, не удалять '
+                 'её и не засевать повторно',
+        )
+        parser.add_argument(
+            '--save-baseline', metavar='PATH',
+            help='Сохранить результаты в JSON',
+        )
+        parser.add_argument(
+            '--baseline', metavar='PATH',
+            help='Сравнить результаты с сохранённым JSON и завершиться '
+                 'с ошибкой при регрессии',
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.25,
+            help='Допустимый рост p95 относительно baseline (доля)',
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as stream:
+                baseline = json.load(stream)['results']
+        scenarios = benchmark.scenarios()
+        if options['url_name']:
+            scenarios = [
+                scenario for scenario in scenarios
+                if scenario.url_name in options['url_name']
+            ]
+            if not scenarios:
+                raise CommandError('Нет сценариев для указанных адресов')
+        scale = {
+            name: options[name]
+            for name in ('users', 'groups', 'posts', 'comments', 'follows')
+        }
+
+        # Как у тестового раннера: без DEBUG и на отдельной базе.
+        settings.DEBUG = False
+        if options['keepdb']:
+            connections['default'].settings_dict['TEST']['NAME'] = (
+                KEEPDB_NAME
+            )
+        old_config = setup_databases(
+            verbosity=0, interactive=False, keepdb=options['keepdb']
+        )
+        try:
+            if not User.objects.filter(username=benchmark.AUTHOR).exists():
+                self.stdout.write(f'Заполняем базу: {scale}')
+                benchmark.seed(random_seed=options['seed'], **scale)
+            summary = benchmark.summarize(benchmark.run(
+                scenarios, options['rounds'], options['warmup'],
+                options['cold'],
+            ))
+        finally:
+            teardown_databases(
+                old_config, verbosity=0, keepdb=options['keepdb']
+            )
+
+        self.report(summary)
+        if options['save_baseline']:
+            with open(
+                options['save_baseline'], 'w', encoding='utf-8'
+            ) as stream:
+                json.dump({
+                    'scale': scale,
+                    'seed': options['seed'],
+                    'rounds': options['rounds'],
+                    'cold': options['cold'],
+                    'results': summary,
+                }, stream, ensure_ascii=False, indent=2)
+        if baseline is not None:
+            regressions = benchmark.compare(
+                summary, baseline, options['tolerance']
+            )
+            if regressions:
+                raise CommandError(
+                    'Регрессии относительно baseline:\n'
+                    + '\n'.join(regressions)
+                )
+            self.stdout.write(self.style.SUCCESS('Регрессий нет'))
+
+    def report(self, summary):
+        width = max(map(len, summary))
+        self.stdout.write(
+            f'{"":{width}}  {"p50":>8} {"p95":>8} {"p99":>8} '
+            f'{"запр/с":>8} {"SQL":>6} {"ошибок":>6}'
+        )
+        for name, row in summary.items():
+            self.stdout.write(
+                f'{name:{width}}  {row["p50"]:8.2f} {row["p95"]:8.2f} '
+                f'{row["p99"]:8.2f} {row["rps"]:8.1f} '
+                f'{row["queries"]:6.1f} {row["errors"]:6d}'
+            )
+        latencies = sum(
+            row['requests'] / row['rps'] for row in summary.values()
+        )
+        requests = sum(row['requests'] for row in summary.values())
+        self.stdout.write(
+            f'Всего {requests} запросов, {requests / latencies:.1f} '
+            f'запросов/с (задержки в мс)'
+        )
@@ -0,0 +1,75 @@
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from core.cache import SQLiteCache
+
+
+def make_cache(backend, location):
+    if backend == 'sqlite':
+        return SQLiteCache(location, {'OPTIONS': {'MAX_ENTRIES': 10 ** 6}})
+    return LocMemCache(location, {'OPTIONS': {'MAX_ENTRIES': 10 ** 6}})
+
+
+def run_worker(backend, location, keys, requests, seed, results):
+    """Имитирует воркер: читает популярные ключи и кладёт их в кэш
+    при промахе, как это делают кэшированные страницы."""
+    cache = make_cache(backend, location)
+    rng = random.Random(seed)
+    hits = 0
+    started = time.perf_counter()
+    for _ in range(requests):
+        key = f'page:{int(keys ** rng.random())}'
+        if cache.get(key) is not None:
+            hits += 1
+        else:
+            cache.set(key, 'x' * 2048, 300)
+    results.put((hits, requests, time.perf_counter() - started))
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает долю попаданий в кэш у нескольких процессов для '
+        'LocMemCache и общего SQLiteCache'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--requests', type=int, default=5000)
+        parser.add_argument('--keys', type=int, default=2000)
+        parser.add_argument(
+            '--backend', action='append', choices=('locmem', 'sqlite'),
+            help='Бэкенды для сравнения (по умолчанию оба)',
+        )
+
+    def handle(self, *args, **options):
+        context = multiprocessing.get_context('fork')
+        for backend in options['backend'] or ('locmem', 'sqlite'):
+            with tempfile.TemporaryDirectory() as directory:
+                location = os.path.join(directory, 'cache.sqlite3')
+                results = context.Queue()
+                workers = [
+                    context.Process(target=run_worker, args=(
+                        backend, location, options['keys'],
+                        options['requests'], seed, results,
+                    ))
+                    for seed in range(options['workers'])
+                ]
+                for worker in workers:
+                    worker.start()
+                stats = [results.get() for _ in workers]
+                for worker in workers:
+                    worker.join()
+            hits = sum(hit for hit, _, _ in stats)
+            total = sum(requests for _, requests, _ in stats)
+            seconds = max(elapsed for _, _, elapsed in stats)
+            self.stdout.write(
+                f'{backend:>7}: попаданий {hits / total:6.1%}, '
+                f'{total / seconds:8.0f} операций/с '
+                f'(процессов: {options["workers"]}, запросов: {total})'
+            )
@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import profiling
+
+
+class Command(BaseCommand):
+    help = (
+        'Складывает сохранённые профили запросов в один файл стеков '
+        'в формате collapsed для flamegraph.pl или speedscope'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--directory', default=settings.PROFILING_DIR,
+            help='Каталог с профилями (по умолчанию PROFILING_DIR)',
+        )
+        parser.add_argument(
+            '--view', action='append',
+            help='Только профили этих адресов (например, posts:index)',
+        )
+        parser.add_argument(
+            '--user', choices=('guest', 'user', 'staff'),
+            help='Только профили запросов пользователей этого типа',
+        )
+        parser.add_argument(
+            '--reason', choices=('slow', 'sample'),
+            help='Только медленные или только случайно выбранные запросы',
+        )
+        parser.add_argument(
+            '--by-view', action='store_true',
+            help='Добавить имя адреса корневым кадром, чтобы страницы '
+                 'были на графике отдельно',
+        )
+        parser.add_argument(
+            '-o', '--output', help='Файл для стеков (по умолчанию stdout)',
+        )
+
+    def handle(self, *args, **options):
+        profiles = [
+            profile for profile in profiling.load(options['directory'])
+            if (not options['view'] or profile['view'] in options['view'])
+            and options['user'] in (None, profile['user'])
+            and options['reason'] in (None, profile['reason'])
+        ]
+        if not profiles:
+            raise CommandError('Подходящих профилей не найдено')
+        stacks = profiling.merge(
+            profiles,
+            root=(lambda profile: profile['view'])
+            if options['by_view'] else None,
+        )
+        lines = [
+            f'{stack} {count}' for stack, count in sorted(stacks.items())
+        ]
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                stream.writelines(f'{line}\n' for line in lines)
+        else:
+            for line in lines:
+                self.stdout.write(line)
+        self.stderr.write(
+            f'Профилей: {len(profiles)}, стеков: {len(stacks)}, '
+            f'выборок: {sum(stacks.values())}'
+        )
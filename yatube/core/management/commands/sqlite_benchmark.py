@@ -0,0 +1,179 @@
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connections, transaction
+
+from core.benchmark import percentile
+
+# Встроенный бэкенд с настройками по умолчанию и core.db с WAL,
+# прагмами и постоянными соединениями.
+PROFILES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'CONN_MAX_AGE': 0,
+        'OPTIONS': {},
+    },
+    'tuned': {
+        'ENGINE': 'core.db',
+        'CONN_MAX_AGE': 600,
+        'OPTIONS': {},
+    },
+}
+
+SCHEMA = (
+    'CREATE TABLE post ('
+    'id INTEGER PRIMARY KEY, author_id INTEGER NOT NULL, '
+    'text TEXT NOT NULL, pub_date REAL NOT NULL, '
+    'comments_count INTEGER NOT NULL DEFAULT 0)',
+    'CREATE INDEX post_pub_date ON post (pub_date)',
+    'CREATE INDEX post_author ON post (author_id, pub_date)',
+)
+READS = (
+    'SELECT id, author_id, text FROM post ORDER BY pub_date DESC LIMIT 10',
+    'SELECT id, text FROM post WHERE author_id = %s '
+    'ORDER BY pub_date DESC LIMIT 10',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает чтение из SQLite во время непрерывной записи для '
+        'встроенного бэкенда и core.db (WAL, прагмы, BEGIN IMMEDIATE, '
+        'повтор при блокировке, постоянные соединения)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument(
+            '--seconds', type=float, default=5,
+            help='Длительность прогона каждого профиля',
+        )
+        parser.add_argument(
+            '--rows', type=int, default=20000,
+            help='Сколько постов в таблице до начала прогона',
+        )
+        parser.add_argument(
+            '--profile', action='append', choices=tuple(PROFILES),
+            help='Профили для сравнения (по умолчанию все)',
+        )
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            for name in options['profile'] or PROFILES:
+                alias = f'sqlite_benchmark_{name}'
+                connections.databases[alias] = dict(
+                    PROFILES[name],
+                    NAME=os.path.join(directory, f'{name}.sqlite3'),
+                )
+                connections.ensure_defaults(alias)
+                connections.prepare_test_settings(alias)
+                try:
+                    self.prepare(alias, options['rows'])
+                    result = self.run(alias, options)
+                finally:
+                    connections[alias].close()
+                    del connections.databases[alias]
+                self.report(name, result, options['seconds'])
+
+    def prepare(self, alias, rows):
+        with transaction.atomic(using=alias):
+            with connections[alias].cursor() as cursor:
+                for statement in SCHEMA:
+                    cursor.execute(statement)
+                cursor.executemany(
+                    'INSERT INTO post (author_id, text, pub_date) '
+                    'VALUES (%s, %s, %s)',
+                    [(i % 100, 'x' * 300, i) for i in range(rows)],
+                )
+
+    def run(self, alias, options):
+        self.stop = threading.Event()
+        self.lock = threading.Lock()
+        self.reads, self.writes, self.errors = [], 0, 0
+        threads = [
+            threading.Thread(target=self.reader, args=(alias, i))
+            for i in range(options['readers'])
+        ] + [
+            threading.Thread(target=self.writer, args=(alias, i))
+            for i in range(options['writers'])
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(options['seconds'])
+        self.stop.set()
+        for thread in threads:
+            thread.join()
+        return self.reads, self.writes, self.errors
+
+    def request(self, alias, func, number):
+        """Как обработка запроса: после неё соединение закрывается,
+        если этого требует CONN_MAX_AGE."""
+        try:
+            func(alias, number)
+        except DatabaseError:
+            with self.lock:
+                self.errors += 1
+            return False
+        finally:
+            connections[alias].close_if_unusable_or_obsolete()
+        return True
+
+    def reader(self, alias, number):
+        latencies = []
+        while not self.stop.is_set():
+            number += 1
+            started = time.perf_counter()
+            if self.request(alias, self.read, number):
+                latencies.append(time.perf_counter() - started)
+        connections[alias].close()
+        with self.lock:
+            self.reads.extend(latencies)
+
+    def writer(self, alias, number):
+        while not self.stop.is_set():
+            number += 1
+            if self.request(alias, self.write, number):
+                with self.lock:
+                    self.writes += 1
+        connections[alias].close()
+
+    @staticmethod
+    def read(alias, number):
+        with connections[alias].cursor() as cursor:
+            cursor.execute(READS[0])
+            cursor.fetchall()
+            cursor.execute(READS[1], [number % 100])
+            cursor.fetchall()
+
+    @staticmethod
+    def write(alias, number):
+        with transaction.atomic(using=alias):
+            with connections[alias].cursor() as cursor:
+                cursor.execute(
+                    'INSERT INTO post (author_id, text, pub_date) '
+                    'VALUES (%s, %s, %s)',
+                    [number % 100, 'y' * 300, time.time()],
+                )
+                cursor.execute(
+                    'UPDATE post SET comments_count = comments_count + 1 '
+                    'WHERE author_id = %s AND pub_date = ('
+                    'SELECT MAX(pub_date) FROM post WHERE author_id = %s)',
+                    [number % 100, number % 100],
+                )
+
+    def report(self, name, result, seconds):
+        reads, writes, errors = result
+        if not reads:
+            self.stdout.write(f'{name:>8}: ни одного успешного чтения')
+            return
+        self.stdout.write(
+            f'{name:>8}: чтений {len(reads) / seconds:7.0f}/с '
+            f'(p50 {statistics.median(reads) * 1000:.2f} мс, '
+            f'p99 {percentile(reads, 0.99) * 1000:.2f} мс), '
+            f'записей {writes / seconds:5.0f}/с, ошибок {errors}'
+        )
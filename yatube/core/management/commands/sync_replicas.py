@@ -0,0 +1,50 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.routers import copy_database, mark_synced
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу SQLite в файлы реплик из DB_REPLICAS — '
+        'локальная замена настоящей репликации'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'aliases', nargs='*',
+            help='Реплики для обновления (по умолчанию все из DB_REPLICAS)',
+        )
+        parser.add_argument(
+            '--interval', type=float,
+            help='Повторять каждые столько секунд, пока не остановят',
+        )
+
+    def handle(self, *args, **options):
+        aliases = options['aliases'] or settings.DB_REPLICAS
+        if not aliases:
+            raise CommandError(
+                'Реплики не настроены: задайте YATUBE_DB_REPLICAS'
+            )
+        unknown = set(aliases) - set(settings.DB_REPLICAS)
+        if unknown:
+            raise CommandError(
+                'Неизвестные реплики: {}'.format(', '.join(sorted(unknown)))
+            )
+        source = connections.databases[DEFAULT_DB_ALIAS]['NAME']
+        while True:
+            for alias in aliases:
+                position = time.time()
+                started = time.perf_counter()
+                target = connections.databases[alias]['NAME']
+                copy_database(source, target)
+                mark_synced(target, position)
+                self.stdout.write(
+                    f'{alias}: {(time.perf_counter() - started) * 1000:.0f} мс'
+                )
+            if options['interval'] is None:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,218 @@
+"""Замеры запросов: SQL, шаблоны, миниатюры.
+
+``RequestMetricsMiddleware`` замеряет каждый запрос целиком, а для доли
+``METRICS_SAMPLE_RATE`` запросов ещё и собирает все SQL-запросы через
+``connection.execute_wrapper`` и время в функциях из ``METRICS_TIMERS``
+(рендер шаблонов, поиск миниатюр). Гистограммы по имени адреса
+(``posts:index``, ``posts:profile``, ...) копятся в кэше атомарными
+``incr``, поэтому общие для всех процессов при общем кэше; их показывает
+сотрудникам страница ``request_metrics`` (``/admin/metrics/``).
+
+Список адресов тоже собирается без чтения-изменения-записи: адрес
+занимает свой ключ через ``add``, а номер ячейки, где лежит его имя,
+выдаёт ``incr`` счётчика ``NAMES_KEY``.
+"""
+import threading
+import time
+from collections import Counter
+from functools import wraps
+from importlib import import_module
+
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+KEY_PREFIX = 'core:metrics'
+NAMES_KEY = f'{KEY_PREFIX}:names'
+
+# Верхние границы корзин гистограммы длительности запроса, мс.
+BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Суммы, которые копятся для каждого адреса (время — в микросекундах,
+# потому что incr работает только с целыми).
+TOTALS = ('count', 'queries', 'total', 'db', 'template', 'thumbnail')
+
+_local = threading.local()
+
+
+class RequestMetrics:
+    """Замеры одного запроса, попавшего в выборку."""
+
+    def __init__(self):
+        self.queries = []
+        self.timers = Counter()
+        self.active = set()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - started))
+
+    @property
+    def db_time(self):
+        return sum(duration for _, duration in self.queries)
+
+    def top_queries(self, limit=5):
+        """Самые долгие по суммарному времени SQL-запросы:
+        (запрос, сколько раз выполнен, суммарное время)."""
+        calls, durations = Counter(), Counter()
+        for sql, duration in self.queries:
+            calls[sql] += 1
+            durations[sql] += duration
+        return [
+            (sql, calls[sql], duration)
+            for sql, duration in durations.most_common(limit)
+        ]
+
+
+def current():
+    """Замеры текущего запроса или None, если он не в выборке."""
+    return getattr(_local, 'metrics', None)
+
+
+def start():
+    _local.metrics = RequestMetrics()
+    return _local.metrics
+
+
+def stop():
+    _local.metrics = None
+
+
+def timed(name):
+    """Декоратор: время в функции прибавляется к таймеру ``name``
+    текущего запроса. Вложенные вызовы (шаблон внутри шаблона)
+    учитываются один раз."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            metrics = current()
+            if metrics is None or name in metrics.active:
+                return func(*args, **kwargs)
+            metrics.active.add(name)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                metrics.timers[name] += time.perf_counter() - started
+                metrics.active.discard(name)
+        wrapper.metrics_timer = name
+        return wrapper
+    return decorator
+
+
+def instrument(path, name):
+    """Оборачивает функцию или метод по пути ``path`` в ``timed(name)``."""
+    owner_path, attribute = path.rsplit('.', 1)
+    try:
+        owner = import_module(owner_path)
+    except ImportError:
+        owner = import_string(owner_path)
+    func = getattr(owner, attribute)
+    if getattr(func, 'metrics_timer', None) != name:
+        setattr(owner, attribute, timed(name)(func))
+
+
+def _key(name, field):
+    return f'{KEY_PREFIX}:{name}:{field}'
+
+
+def _incr(key, delta):
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        if cache.add(key, delta, None):
+            return delta
+        return cache.incr(key, delta)
+
+
+def _register(name):
+    if cache.add(_key(name, 'registered'), True, None):
+        slot = _incr(NAMES_KEY, 1)
+        cache.set(f'{NAMES_KEY}:{slot}', name, None)
+
+
+def _names():
+    slots = [
+        f'{NAMES_KEY}:{slot}'
+        for slot in range(1, (cache.get(NAMES_KEY) or 0) + 1)
+    ]
+    return list(cache.get_many(slots).values()), slots
+
+
+def _micros(seconds):
+    return int(seconds * 1000000)
+
+
+def record(name, total, metrics):
+    """Добавляет запрос к гистограмме адреса ``name``."""
+    _register(name)
+    milliseconds = total * 1000
+    bucket = next(
+        (str(bound) for bound in BUCKETS if milliseconds <= bound), 'inf'
+    )
+    for field, delta in (
+        ('count', 1),
+        ('queries', len(metrics.queries)),
+        ('total', _micros(total)),
+        ('db', _micros(metrics.db_time)),
+        ('template', _micros(metrics.timers['template'])),
+        ('thumbnail', _micros(metrics.timers['thumbnail'])),
+        (f'le:{bucket}', 1),
+    ):
+        if delta:
+            _incr(_key(name, field), delta)
+
+
+def _percentile(buckets, count, fraction):
+    """Верхняя граница корзины, в которую попадает перцентиль
+    (None — дольше последней границы)."""
+    seen = 0
+    for bound, hits in buckets.items():
+        seen += hits
+        if seen >= count * fraction:
+            return None if bound == 'inf' else int(bound)
+    return None
+
+
+def snapshot():
+    """Сводка по адресам: число замеров, средние времена в мс,
+    перцентили по гистограмме и сама гистограмма."""
+    names = sorted(_names()[0])
+    bounds = [str(bound) for bound in BUCKETS] + ['inf']
+    fields = list(TOTALS) + [f'le:{bound}' for bound in bounds]
+    values = cache.get_many(
+        [_key(name, field) for name in names for field in fields]
+    )
+    summary = {}
+    for name in names:
+        row = {field: values.get(_key(name, field), 0) for field in fields}
+        count = row['count']
+        if not count:
+            continue
+        buckets = {bound: row[f'le:{bound}'] for bound in bounds}
+        summary[name] = {
+            'count': count,
+            'queries': round(row['queries'] / count, 1),
+            **{
+                f'{field}_ms': round(row[field] / count / 1000, 2)
+                for field in ('total', 'db', 'template', 'thumbnail')
+            },
+            'p50_ms': _percentile(buckets, count, 0.5),
+            'p95_ms': _percentile(buckets, count, 0.95),
+            'p99_ms': _percentile(buckets, count, 0.99),
+            'histogram_ms': buckets,
+        }
+    return summary
+
+
+def reset():
+    names, slots = _names()
+    cache.delete_many([
+        _key(name, field)
+        for name in names
+        for field in list(TOTALS) + ['registered'] + [
+            f'le:{bound}' for bound in list(BUCKETS) + ['inf']
+        ]
+    ] + slots + [NAMES_KEY])
@@ -0,0 +1,189 @@
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils import timezone
+
+from . import metrics, profiling, routers
+
+logger = logging.getLogger('core.metrics')
+
+
+class RequestMetricsMiddleware:
+    """Замеряет запросы и пишет в лог медленные.
+
+    Длительность каждого запроса меряется всегда (это два вызова
+    ``perf_counter``), а SQL-запросы, время шаблонов и миниатюр — только
+    у доли ``METRICS_SAMPLE_RATE`` запросов, и только они попадают
+    в гистограммы. Медленный запрос из выборки пишется в лог вместе
+    с самыми долгими SQL-запросами, вне выборки — только с длительностью.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        for name, path in settings.METRICS_TIMERS:
+            metrics.instrument(path, name)
+
+    def __call__(self, request):
+        if random.random() >= settings.METRICS_SAMPLE_RATE:
+            started = time.perf_counter()
+            response = self.get_response(request)
+            self.log_slow(request, time.perf_counter() - started)
+            return response
+
+        recorded = metrics.start()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(recorded)
+                    )
+                started = time.perf_counter()
+                response = self.get_response(request)
+                total = time.perf_counter() - started
+        finally:
+            metrics.stop()
+        match = request.resolver_match
+        metrics.record(
+            match.view_name if match else 'unresolved', total, recorded
+        )
+        self.log_slow(request, total, recorded)
+        return response
+
+    def log_slow(self, request, total, recorded=None):
+        if total * 1000 < settings.METRICS_SLOW_REQUEST_MS:
+            return
+        if recorded is None:
+            logger.warning(
+                'Медленный запрос %s %s: %.0f мс',
+                request.method, request.get_full_path(), total * 1000,
+            )
+            return
+        top = ''.join(
+            f'\n  {duration * 1000:.1f} мс, {calls} раз: {sql}'
+            for sql, calls, duration in recorded.top_queries(
+                settings.METRICS_SLOW_QUERIES
+            )
+        )
+        logger.warning(
+            'Медленный запрос %s %s: %.0f мс, SQL %d за %.0f мс, '
+            'шаблоны %.0f мс, миниатюры %.0f мс%s',
+            request.method, request.get_full_path(), total * 1000,
+            len(recorded.queries), recorded.db_time * 1000,
+            recorded.timers['template'] * 1000,
+            recorded.timers['thumbnail'] * 1000, top,
+        )
+
+
+class ProfilingMiddleware:
+    """Сохраняет профили медленных и случайно выбранных запросов.
+
+    Включается настройкой ``PROFILING_ENABLED``. Стеки снимаются со всех
+    запросов, а сохраняются профили запросов дольше
+    ``PROFILING_THRESHOLD_MS`` и доли ``PROFILING_SAMPLE_RATE``
+    остальных — вместе с адресом, типом пользователя и замерами
+    ``RequestMetricsMiddleware``, если запрос попал и в его выборку.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sampler = profiling.get_sampler(
+            settings.PROFILING_INTERVAL_MS / 1000
+        )
+
+    def __call__(self, request):
+        samples = self.sampler.start(root_code=self.__call__.__code__)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            total = time.perf_counter() - started
+            self.sampler.stop()
+        if total * 1000 >= settings.PROFILING_THRESHOLD_MS:
+            reason = 'slow'
+        elif random.random() < settings.PROFILING_SAMPLE_RATE:
+            reason = 'sample'
+        else:
+            return response
+        if samples:
+            profiling.save(
+                settings.PROFILING_DIR,
+                self.profile(request, response, total, reason, samples),
+            )
+        return response
+
+    def profile(self, request, response, total, reason, samples):
+        match = request.resolver_match
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated:
+            user_type = 'guest'
+        else:
+            user_type = 'staff' if user.is_staff else 'user'
+        timings = {'total_ms': round(total * 1000, 2)}
+        recorded = metrics.current()
+        if recorded is not None:
+            timings.update(
+                db_ms=round(recorded.db_time * 1000, 2),
+                queries=len(recorded.queries),
+                template_ms=round(recorded.timers['template'] * 1000, 2),
+                thumbnail_ms=round(recorded.timers['thumbnail'] * 1000, 2),
+            )
+        return {
+            'created': timezone.now().isoformat(),
+            'method': request.method,
+            'url': request.get_full_path(),
+            'view': match.view_name if match else 'unresolved',
+            'user': user_type,
+            'status': response.status_code,
+            'reason': reason,
+            'interval_ms': settings.PROFILING_INTERVAL_MS,
+            'timings': timings,
+            'stacks': dict(samples),
+        }
+
+
+class ReplicaMiddleware:
+    """Выбирает базу для чтения на время запроса (см. ``core.routers``).
+
+    Адрес известен только после разбора URL, поэтому реплика выбирается
+    в ``process_view``; запросы до этого (например, сессии) идут
+    в основную базу. После запроса с записью ставится cookie, и следующие
+    ``DB_STICKY_SECONDS`` секунд пользователь читает с основной базы.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DB_REPLICAS:
+            return self.get_response(request)
+        routers.start()
+        try:
+            response = self.get_response(request)
+            if routers.wrote():
+                response.set_cookie(
+                    routers.STICKY_COOKIE,
+                    '1',
+                    max_age=settings.DB_STICKY_SECONDS,
+                    httponly=True,
+                    samesite='Lax',
+                )
+        finally:
+            routers.stop()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            settings.DB_REPLICAS
+            and request.method in ('GET', 'HEAD')
+            and routers.STICKY_COOKIE not in request.COOKIES
+            and request.resolver_match.view_name
+            in settings.DB_REPLICA_VIEWS
+        ):
+            routers.use_replica(random.choice(settings.DB_REPLICAS))
@@ -0,0 +1,134 @@
+"""Профили медленных запросов по выборке стеков.
+
+Фоновый поток раз в ``PROFILING_INTERVAL_MS`` снимает стеки потоков,
+которые сейчас обрабатывают запрос, и считает одинаковые стеки. Такой
+профиль почти не замедляет сам запрос (в отличие от cProfile, который
+перехватывает каждый вызов функции), поэтому его можно снимать со всех
+запросов, а сохранять только медленные или выбранные случайно. Профили
+пишутся в ``PROFILING_DIR`` файлами JSON со стеками в формате collapsed
+(``a;b;c число``), который понимают flamegraph.pl и speedscope; команда
+``collapse_profiles`` складывает их вместе.
+"""
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+_labels = {}
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def label(code):
+    """Имя кадра: путь к файлу от корня импорта и имя функции."""
+    name = _labels.get(code)
+    if name is None:
+        filename = code.co_filename
+        for prefix in sorted(sys.path, key=len, reverse=True):
+            if prefix and filename.startswith(prefix + os.sep):
+                filename = filename[len(prefix) + 1:]
+                break
+        name = _labels[code] = f'{filename}:{code.co_name}'
+    return name
+
+
+def collapse(frame, root_code=None):
+    """Стек от корня к листу через ``;``, начиная с кадра ``root_code``."""
+    names = []
+    while frame is not None:
+        names.append(label(frame.f_code))
+        if frame.f_code is root_code:
+            break
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler:
+    """Снимает стеки зарегистрированных потоков с заданным интервалом."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.active = {}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def start(self, root_code=None):
+        """Начинает собирать стеки текущего потока."""
+        samples = Counter()
+        with self.lock:
+            self.active[threading.get_ident()] = (samples, root_code)
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self.run, name='stack-sampler', daemon=True
+                )
+                self.thread.start()
+        return samples
+
+    def stop(self):
+        with self.lock:
+            samples, _ = self.active.pop(threading.get_ident())
+        return samples
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            with self.lock:
+                if not self.active:
+                    continue
+                frames = sys._current_frames()
+                for thread_id, (samples, root_code) in self.active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[collapse(frame, root_code)] += 1
+            del frames
+
+
+def get_sampler(interval):
+    """Общий для процесса StackSampler: один поток на все запросы."""
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = StackSampler(interval)
+        return _sampler
+
+
+def save(directory, profile):
+    """Сохраняет профиль в ``directory`` и возвращает путь к файлу."""
+    os.makedirs(directory, exist_ok=True)
+    name = '{}-{}-{}.json'.format(
+        time.strftime('%Y%m%d-%H%M%S'),
+        profile['view'].replace(':', '-'),
+        uuid.uuid4().hex[:8],
+    )
+    path = os.path.join(directory, name)
+    temporary = path + '.tmp'
+    with open(temporary, 'w', encoding='utf-8') as stream:
+        json.dump(profile, stream, ensure_ascii=False)
+    os.replace(temporary, path)
+    return path
+
+
+def load(directory):
+    """Сохранённые профили в порядке создания."""
+    if not os.path.isdir(directory):
+        return
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.json'):
+            with open(
+                os.path.join(directory, name), encoding='utf-8'
+            ) as stream:
+                yield json.load(stream)
+
+
+def merge(profiles, root=None):
+    """Складывает стеки профилей. ``root`` — функция, которая возвращает
+    имя корневого кадра для профиля (например, имя адреса)."""
+    stacks = Counter()
+    for profile in profiles:
+        prefix = f'{root(profile)};' if root else ''
+        for stack, count in profile['stacks'].items():
+            stacks[prefix + stack] += count
+    return stacks
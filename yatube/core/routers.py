@@ -0,0 +1,147 @@
+"""Чтение с реплик, запись в основную базу.
+
+Реплики перечислены в ``DB_REPLICAS`` (алиасы из ``DATABASES``, локально
+их задаёт переменная окружения ``YATUBE_DB_REPLICAS``). Решение, откуда
+читать, принимает ``ReplicaMiddleware`` для всего запроса: GET и HEAD
+к адресам из ``DB_REPLICA_VIEWS`` читают со случайной реплики, всё
+остальное — с основной базы. Пользователь, который только что что-то
+записал, получает cookie ``STICKY_COOKIE`` и ещё
+``DB_STICKY_SECONDS`` секунд читает с основной базы, чтобы сразу видеть
+свои изменения, даже если реплика отстаёт. Сессии и пользователи
+(``PRIMARY_APPS``) всегда читаются с основной базы: ``request.user``
+загружается лениво, уже после выбора реплики, а только что созданной
+сессии на реплике ещё нет.
+
+Кэш страниц и ETag считаются по отметкам тегов основной базы, поэтому
+страница, собранная по отставшей реплике, попала бы в кэш под свежим
+ключом. Перед вызовом view декораторы из ``posts.caching`` передают
+в ``ensure_fresh`` время последнего изменения данных страницы, и если
+реплика скопирована раньше, запрос читает с основной базы.
+
+Вне запросов (команды, фоновые потоки) всё читается с основной базы.
+
+Локально реплика — копия файла основной базы, которую обновляет команда
+``sync_replicas`` (``copy_database``). Время начала копирования
+``mark_synced`` записывает в таблицу ``SYNC_TABLE`` самой реплики:
+команда работает в отдельном процессе, и через локальный кэш
+веб-процессы его бы не увидели.
+"""
+import sqlite3
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+STICKY_COOKIE = 'db_primary'
+
+# Приложения, модели которых читаются только с основной базы.
+PRIMARY_APPS = ('auth', 'sessions')
+
+SYNC_TABLE = 'core_replica_sync'
+
+_state = threading.local()
+
+
+def start():
+    """Начало запроса: читать с основной базы, пока не решено иначе."""
+    _state.read_alias = None
+    _state.wrote = False
+
+
+def stop():
+    _state.read_alias = None
+    _state.wrote = False
+
+
+def use_replica(alias):
+    _state.read_alias = alias
+    _state.synced = None
+
+
+def wrote():
+    """Была ли в текущем запросе запись."""
+    return getattr(_state, 'wrote', False)
+
+
+def mark_synced(target, position):
+    """Записывает в файл реплики ``target``, что в ней есть все
+    изменения, сделанные до ``position`` (Unix time)."""
+    connection = sqlite3.connect(target, timeout=30)
+    try:
+        with connection:
+            connection.execute(
+                f'CREATE TABLE IF NOT EXISTS {SYNC_TABLE} (position REAL)'
+            )
+            connection.execute(f'DELETE FROM {SYNC_TABLE}')
+            connection.execute(
+                f'INSERT INTO {SYNC_TABLE} VALUES (?)', (position,)
+            )
+    finally:
+        connection.close()
+
+
+def synced(alias):
+    """Время, до которого реплика ``alias`` содержит все изменения,
+    или None, если оно неизвестно."""
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute(f'SELECT MAX(position) FROM {SYNC_TABLE}')
+            return cursor.fetchone()[0]
+    except DatabaseError:
+        # Таблицы нет: реплику ещё не синхронизировали или копирование
+        # только что её перезаписало.
+        return None
+
+
+def ensure_fresh(changed):
+    """Переключает запрос на основную базу, если его реплика не
+    содержит изменений, сделанных в момент ``changed`` (Unix time).
+    Реплика, о копировании которой ничего не известно, считается
+    отставшей."""
+    alias = getattr(_state, 'read_alias', None)
+    if alias is None:
+        return
+    if _state.synced is None:
+        _state.synced = synced(alias)
+    if _state.synced is None or _state.synced <= changed:
+        _state.read_alias = None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_APPS:
+            return DEFAULT_DB_ALIAS
+        return getattr(_state, 'read_alias', None) or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        # Явно: иначе объект, прочитанный с реплики, сохранялся бы в неё.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DB_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Реплики — копии основной базы, схема приходит вместе с данными.
+        if db in settings.DB_REPLICAS:
+            return False
+        return None
+
+
+def copy_database(source, target, pages=1024):
+    """Копирует SQLite-базу ``source`` в ``target`` через backup API.
+
+    Копия пишется порциями по ``pages`` страниц в сам файл ``target``,
+    поэтому открытые соединения к реплике увидят новые данные со
+    следующей транзакции, а не продолжат читать подменённый файл.
+    """
+    source_connection = sqlite3.connect(source)
+    target_connection = sqlite3.connect(target, timeout=30)
+    try:
+        source_connection.backup(target_connection, pages=pages)
+    finally:
+        target_connection.close()
+        source_connection.close()
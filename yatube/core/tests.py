@@ -1,7 +1,35 @@
-from django.test import TestCase
+import asyncio
+import io
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test import (
+    Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase,
+    override_settings,
+)
+from django.urls import resolve, reverse
 
 from http import HTTPStatus
 
+from core import benchmark, metrics, profiling, routers
+from core.asgi import ASGIHandler
+from core.cache import SQLiteCache
+from core.db.base import DatabaseWrapper, SQLiteCursorWrapper
+from core.middleware import ProfilingMiddleware, ReplicaMiddleware
+from posts import stats
+from posts.models import Comment, Follow, Post, User
+
 
 class ErrorTestClass(TestCase):
     def test_page_not_found(self):
@@ -10,3 +38,654 @@ class ErrorTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class SQLiteCacheTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = SQLiteCache(self.location, {})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_basic_operations(self):
+        """Проверяем запись, чтение, добавление и удаление ключей."""
+        self.cache.set('key', {'value': 1})
+        self.assertEqual(self.cache.get('key'), {'value': 1})
+        self.assertFalse(self.cache.add('key', 'other'))
+        self.assertTrue(self.cache.add('new', 'other'))
+        self.cache.set_many({'a': 1, 'b': 2})
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'missing']), {'a': 1, 'b': 2}
+        )
+        self.cache.delete_many(['a', 'key'])
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.has_key('b'))
+        self.cache.clear()
+        self.assertFalse(self.cache.has_key('b'))
+
+    def test_expiration(self):
+        """Проверяем, что просроченный ключ не возвращается."""
+        self.cache.set('key', 'value', 0.05)
+        self.cache.set('forever', 'value', None)
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'again'))
+        self.assertEqual(self.cache.get('forever'), 'value')
+        self.cache.set('short', 1, 0.01)
+        time.sleep(0.05)
+        with self.assertRaises(ValueError):
+            self.cache.incr('short')
+
+    def test_shared_between_instances(self):
+        """Проверяем, что записи видны другому экземпляру кэша
+        с тем же файлом, как другому процессу."""
+        other = SQLiteCache(self.location, {})
+        self.cache.set('key', 'value')
+        self.assertEqual(other.get('key'), 'value')
+        other.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_incr_is_atomic(self):
+        """Проверяем, что параллельные incr не теряют обновлений."""
+        self.cache.set('counter', 0)
+
+        def increment():
+            cache = SQLiteCache(self.location, {})
+            for _ in range(50):
+                cache.incr('counter')
+
+        threads = [threading.Thread(target=increment) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.cache.get('counter'), 200)
+
+    def test_cull_evicts_least_recently_used(self):
+        """Проверяем, что при переполнении вытесняются давно не
+        читавшиеся ключи."""
+        cache = SQLiteCache(
+            self.location, {'OPTIONS': {'MAX_ENTRIES': 50}}
+        )
+        cache.set('hot', 'value')
+        with mock.patch('core.cache.LRU_RESOLUTION', 0):
+            for i in range(100):
+                cache.set(f'key_{i}', i)
+                cache.get('hot')
+        self.assertEqual(cache.get('hot'), 'value')
+        self.assertIsNone(cache.get('key_0'))
+        count = cache._connection().execute(
+            'SELECT COUNT(*) FROM cache'
+        ).fetchone()[0]
+        self.assertLessEqual(count, 100)
+
+
+def echo_application(environ, start_response):
+    """WSGI-приложение, которое возвращает полученный запрос по частям."""
+    start_response('201 Created', [('Content-Type', 'text/plain')])
+    yield environ['REQUEST_METHOD'].encode()
+    yield ' {PATH_INFO}?{QUERY_STRING} '.format(**environ).encode('latin-1')
+    yield environ['HTTP_COOKIE'].encode()
+    yield b' ' + environ['wsgi.input'].read()
+    yield threading.current_thread().name.encode()
+
+
+class ASGIHandlerTests(SimpleTestCase):
+    def request(self, scope, body_parts):
+        messages = [
+            {'type': 'http.request', 'body': part, 'more_body': True}
+            for part in body_parts[:-1]
+        ] + [{'type': 'http.request', 'body': body_parts[-1]}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        handler = ASGIHandler(echo_application, max_workers=2)
+        asyncio.run(handler(scope, receive, send))
+        handler.executor.shutdown()
+        return sent
+
+    def test_request_runs_in_thread_pool(self):
+        """Проверяем передачу запроса WSGI-приложению и ответа клиенту."""
+        sent = self.request(
+            {
+                'type': 'http',
+                'method': 'POST',
+                'path': '/группа/',
+                'query_string': b'page=2',
+                'headers': [
+                    (b'cookie', b'a=1'),
+                    (b'cookie', b'b=2'),
+                    (b'content-type', b'text/plain'),
+                ],
+            },
+            [b'first ', b'second '],
+        )
+        self.assertEqual(sent[0], {
+            'type': 'http.response.start',
+            'status': 201,
+            'headers': [(b'content-type', b'text/plain')],
+        })
+        body = b''.join(message['body'] for message in sent[1:])
+        self.assertEqual(
+            body,
+            'POST /группа/?page=2 a=1; b=2 first second asgi_0'.encode(),
+        )
+        self.assertFalse(sent[-1].get('more_body', False))
+
+    def test_lifespan(self):
+        """Проверяем ответы на события запуска и остановки сервера."""
+        messages = [
+            {'type': 'lifespan.startup'},
+            {'type': 'lifespan.shutdown'},
+        ]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        asyncio.run(ASGIHandler(echo_application)(
+            {'type': 'lifespan'}, receive, send
+        ))
+        self.assertEqual(
+            sent,
+            ['lifespan.startup.complete', 'lifespan.shutdown.complete'],
+        )
+
+
+class BenchmarkTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        benchmark.seed(
+            users=10, groups=2, posts=30, comments=20, follows=15,
+            batch_size=10,
+        )
+
+    def test_seed_keeps_counters_consistent(self):
+        """Проверяем объём данных и счётчики после заполнения базы."""
+        self.assertEqual(User.objects.count(), 10)
+        self.assertEqual(Post.objects.count(), 30)
+        self.assertEqual(Comment.objects.count(), 20)
+        self.assertEqual(Follow.objects.count(), 16)
+        self.assertTrue(Follow.objects.filter(
+            user__username=benchmark.READER,
+            author__username=benchmark.AUTHOR,
+        ).exists())
+        self.assertFalse(any(stats.reconcile().values()))
+
+    def test_every_url_has_scenario(self):
+        """Проверяем, что прогон покрывает все адреса приложений."""
+        url_names = {name for name, _ in benchmark.url_patterns()}
+        self.assertEqual(
+            {scenario.url_name for scenario in benchmark.scenarios()},
+            url_names,
+        )
+
+    def test_run_and_compare(self):
+        """Проверяем прогон сценариев и сравнение с baseline."""
+        summary = benchmark.summarize(
+            benchmark.run(benchmark.scenarios(), rounds=2, warmup=0)
+        )
+        self.assertEqual(
+            {row['errors'] for row in summary.values()}, {0}
+        )
+        self.assertEqual(benchmark.compare(summary, summary), [])
+        name = benchmark.label(benchmark.Scenario('posts:index'))
+        slower = {name: dict(summary[name], p95=summary[name]['p95'] * 2)}
+        more_queries = {
+            name: dict(summary[name], queries=summary[name]['queries'] + 1)
+        }
+        self.assertEqual(len(benchmark.compare(slower, summary)), 1)
+        self.assertEqual(len(benchmark.compare(more_queries, summary)), 1)
+        self.assertEqual(benchmark.compare(summary, more_queries), [])
+
+
+class RequestMetricsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.post = Post.objects.create(author=cls.staff, text='Текст поста')
+
+    def setUp(self):
+        cache.clear()
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    @override_settings(METRICS_SAMPLE_RATE=1)
+    def test_sampled_requests_are_aggregated(self):
+        """Проверяем гистограмму запросов из выборки и страницу сводки."""
+        for _ in range(2):
+            self.client.get(reverse('posts:index'))
+        self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk,))
+        )
+        summary = metrics.snapshot()
+        self.assertEqual(summary['posts:index']['count'], 2)
+        detail = summary['posts:post_detail']
+        self.assertEqual(detail['count'], 1)
+        self.assertGreater(detail['queries'], 0)
+        self.assertGreater(detail['template_ms'], 0)
+        self.assertEqual(sum(detail['histogram_ms'].values()), 1)
+
+        response = self.staff_client.get(reverse('request_metrics'))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertIn('posts:index', response.json()['urls'])
+        self.staff_client.post(reverse('request_metrics'))
+        self.assertNotIn('posts:index', metrics.snapshot())
+
+    @override_settings(METRICS_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_not_recorded(self):
+        """Проверяем, что запросы вне выборки не попадают в сводку."""
+        self.client.get(reverse('posts:index'))
+        self.assertEqual(metrics.snapshot(), {})
+
+    def test_concurrent_workers_keep_all_names(self):
+        """Проверяем, что параллельные процессы не теряют адреса
+        друг друга."""
+        barrier = threading.Barrier(4)
+
+        def worker(number):
+            barrier.wait()
+            # Немного адресов: locmem по умолчанию хранит до 300 ключей.
+            for index in range(10):
+                metrics.record(
+                    f'view-{number}-{index}', 0.01, metrics.RequestMetrics()
+                )
+
+        threads = [
+            threading.Thread(target=worker, args=(number,))
+            for number in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(metrics.snapshot()), 40)
+        metrics.reset()
+        self.assertEqual(metrics.snapshot(), {})
+        metrics.record('posts:index', 0.01, metrics.RequestMetrics())
+        self.assertEqual(list(metrics.snapshot()), ['posts:index'])
+
+    @override_settings(METRICS_SAMPLE_RATE=1, METRICS_SLOW_REQUEST_MS=0)
+    def test_slow_request_logged_with_queries(self):
+        """Проверяем запись медленного запроса в лог вместе с SQL."""
+        with self.assertLogs('core.metrics', 'WARNING') as logs:
+            self.client.get(
+                reverse('posts:post_detail', args=(self.post.pk,))
+            )
+        self.assertIn('SELECT', logs.output[0])
+
+    def test_endpoint_for_staff_only(self):
+        """Проверяем, что сводку не видят гости и обычные пользователи."""
+        user = User.objects.create_user(username='user')
+        self.client.force_login(user)
+        response = self.client.get(reverse('request_metrics'))
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+
+def slow_view(request):
+    time.sleep(0.05)
+    return HttpResponse('ok')
+
+
+@override_settings(
+    PROFILING_ENABLED=True,
+    PROFILING_THRESHOLD_MS=20,
+    PROFILING_SAMPLE_RATE=0,
+    PROFILING_INTERVAL_MS=1,
+)
+class ProfilingTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def request(self, view):
+        request = RequestFactory().get('/?page=2')
+        request.user = AnonymousUser()
+        request.resolver_match = resolve('/')
+        with self.settings(PROFILING_DIR=self.directory):
+            ProfilingMiddleware(view)(request)
+
+    def test_slow_request_profile_saved(self):
+        """Проверяем, что профиль медленного запроса сохраняется
+        с адресом, типом пользователя и стеками до view."""
+        self.request(slow_view)
+        self.request(lambda request: HttpResponse('ok'))
+        profiles = list(profiling.load(self.directory))
+        self.assertEqual(len(profiles), 1)
+        profile = profiles[0]
+        self.assertEqual(profile['url'], '/?page=2')
+        self.assertEqual(profile['view'], 'posts:index')
+        self.assertEqual(profile['user'], 'guest')
+        self.assertEqual(profile['reason'], 'slow')
+        self.assertGreaterEqual(profile['timings']['total_ms'], 50)
+        stack = max(profile['stacks'], key=profile['stacks'].get)
+        self.assertTrue(stack.startswith('core/middleware.py:__call__;'))
+        self.assertTrue(stack.endswith('core/tests.py:slow_view'))
+
+    def test_collapse_profiles_command(self):
+        """Проверяем сложение профилей в формат collapsed."""
+        self.request(slow_view)
+        self.request(slow_view)
+        output = io.StringIO()
+        call_command(
+            'collapse_profiles', directory=self.directory, by_view=True,
+            stdout=output, stderr=io.StringIO(),
+        )
+        lines = output.getvalue().splitlines()
+        self.assertTrue(lines)
+        for line in lines:
+            stack, count = line.rsplit(' ', 1)
+            self.assertTrue(stack.startswith('posts:index;'))
+            self.assertGreater(int(count), 0)
+
+    @override_settings(PROFILING_ENABLED=False)
+    def test_disabled_by_default(self):
+        """Проверяем, что выключенный профилировщик не подключается."""
+        with self.assertRaises(MiddlewareNotUsed):
+            ProfilingMiddleware(slow_view)
+
+
+class SQLiteBackendTests(SimpleTestCase):
+    databases = {'default'}
+
+    def test_pragmas_applied_on_connect(self):
+        """Проверяем прагмы нового соединения."""
+        with connection.cursor() as cursor:
+            for pragma, expected in (
+                ('synchronous', 1),
+                ('temp_store', 2),
+                # LOCK_TIMEOUT в 5 с на шесть попыток.
+                ('busy_timeout', 833),
+                ('cache_size', -16 * 1024),
+            ):
+                with self.subTest(pragma=pragma):
+                    cursor.execute(f'PRAGMA {pragma}')
+                    self.assertEqual(cursor.fetchone()[0], expected)
+
+    def test_locked_query_retried(self):
+        """Проверяем повтор запроса после 'database is locked'
+        и отсутствие повтора для других ошибок."""
+        cursor = SQLiteCursorWrapper(sqlite3.connect(':memory:'))
+        cursor.retries, cursor.backoff = 3, 0
+        method = mock.Mock(side_effect=[
+            sqlite3.OperationalError('database is locked'),
+            sqlite3.OperationalError('database is locked'),
+            'result',
+        ])
+        self.assertEqual(cursor._retry(method, 'SELECT 1'), 'result')
+        self.assertEqual(method.call_count, 3)
+
+        method = mock.Mock(side_effect=sqlite3.OperationalError('no table'))
+        with self.assertRaises(sqlite3.OperationalError):
+            cursor._retry(method, 'SELECT 1')
+        self.assertEqual(method.call_count, 1)
+
+        method = mock.Mock(
+            side_effect=sqlite3.OperationalError('database is locked')
+        )
+        with self.assertRaises(sqlite3.OperationalError):
+            cursor._retry(method, 'SELECT 1')
+        self.assertEqual(method.call_count, 4)
+
+    def test_retries_share_lock_timeout(self):
+        """Проверяем, что повторы прекращаются по общему сроку, даже
+        если попытки ещё остались."""
+        cursor = SQLiteCursorWrapper(sqlite3.connect(':memory:'))
+        cursor.retries, cursor.backoff, cursor.timeout = 100, 0.02, 0.1
+        method = mock.Mock(
+            side_effect=sqlite3.OperationalError('database is locked')
+        )
+        started = time.monotonic()
+        with self.assertRaises(sqlite3.OperationalError):
+            cursor._retry(method, 'SELECT 1')
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertLess(method.call_count, 10)
+
+    @override_settings(DB_REPLICAS=['replica'])
+    def test_immediate_transactions_only_on_primary(self):
+        """Проверяем, что BEGIN IMMEDIATE берёт только основная база,
+        а реплика начинает обычную транзакцию."""
+        for alias, expected in (
+            ('default', 'BEGIN IMMEDIATE'), ('replica', 'BEGIN')
+        ):
+            with self.subTest(alias=alias):
+                wrapper = DatabaseWrapper(
+                    connection.settings_dict, alias=alias
+                )
+                with mock.patch.object(wrapper, 'cursor') as cursor:
+                    wrapper._start_transaction_under_autocommit()
+                cursor.return_value.execute.assert_called_once_with(
+                    expected
+                )
+
+    def test_write_waits_for_other_writer(self):
+        """Проверяем, что запись дожидается чужой транзакции дольше
+        busy_timeout за счёт повторов, а не падает с 'database is
+        locked'."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        settings_dict = dict(
+            connection.settings_dict,
+            NAME=os.path.join(directory, 'db.sqlite3'),
+            OPTIONS={'PRAGMAS': {'busy_timeout': 20}, 'LOCK_BACKOFF': 0.05},
+        )
+        first = DatabaseWrapper(settings_dict, alias='first')
+        second = DatabaseWrapper(settings_dict, alias='second')
+        first.inc_thread_sharing()
+        self.addCleanup(first.close)
+        self.addCleanup(second.close)
+        first.cursor().execute('CREATE TABLE item (id INTEGER PRIMARY KEY)')
+        first._start_transaction_under_autocommit()
+        first.cursor().execute('INSERT INTO item VALUES (1)')
+
+        def commit():
+            time.sleep(0.2)
+            first.cursor().execute('COMMIT')
+
+        thread = threading.Thread(target=commit)
+        thread.start()
+        cursor = second.cursor()
+        cursor.execute('INSERT INTO item VALUES (2)')
+        thread.join()
+        cursor.execute('SELECT COUNT(*) FROM item')
+        self.assertEqual(cursor.fetchone()[0], 2)
+
+
+@override_settings(DB_REPLICAS=['replica'])
+class ReplicaRoutingTests(SimpleTestCase):
+    def request(self, method, path, cookies=None, write=False):
+        """Запрос через ReplicaMiddleware; возвращает базу, из которой
+        читала view, и ответ."""
+        used = []
+        router = routers.ReplicaRouter()
+
+        def view(request):
+            middleware.process_view(request, view, (), {})
+            used.append(router.db_for_read(Post))
+            if write:
+                router.db_for_write(Post)
+            return HttpResponse('ok')
+
+        middleware = ReplicaMiddleware(view)
+        request = getattr(RequestFactory(), method)(path)
+        request.COOKIES.update(cookies or {})
+        request.resolver_match = resolve(path)
+        response = middleware(request)
+        self.assertEqual(router.db_for_read(Post), 'default')
+        return used[0], response
+
+    def test_read_only_views_use_replica(self):
+        """Проверяем, что GET страниц для чтения идёт на реплику,
+        а запись, POST и страницы с записью — на основную базу."""
+        index = reverse('posts:index')
+        follow = reverse('posts:profile_follow', args=('auth',))
+        for method, path, expected in (
+            ('get', index, 'replica'),
+            ('head', index, 'replica'),
+            ('get', reverse('about:tech'), 'replica'),
+            ('post', index, 'default'),
+            ('get', follow, 'default'),
+            ('post', reverse('posts:post_create'), 'default'),
+        ):
+            with self.subTest(method=method, path=path):
+                self.assertEqual(self.request(method, path)[0], expected)
+
+    def test_read_your_writes(self):
+        """Проверяем, что после записи ставится cookie и с ним чтение
+        идёт с основной базы."""
+        path = reverse('posts:follow_index')
+        database, response = self.request('get', path)
+        self.assertNotIn(routers.STICKY_COOKIE, response.cookies)
+        _, response = self.request(
+            'get', reverse('posts:profile_follow', args=('auth',)),
+            write=True,
+        )
+        cookie = response.cookies[routers.STICKY_COOKIE]
+        self.assertEqual(cookie['max-age'], 10)
+        database, _ = self.request(
+            'get', path, cookies={routers.STICKY_COOKIE: cookie.value}
+        )
+        self.assertEqual(database, 'default')
+
+    @override_settings(DB_REPLICAS=[])
+    def test_without_replicas(self):
+        """Проверяем, что без реплик всё идёт в основную базу."""
+        database, response = self.request(
+            'get', reverse('posts:index'), write=True
+        )
+        self.assertEqual(database, 'default')
+        self.assertNotIn(routers.STICKY_COOKIE, response.cookies)
+
+    def test_writes_and_migrations_go_to_primary(self):
+        """Проверяем, что объект, прочитанный с реплики, сохраняется
+        в основную базу, а миграции к реплике не применяются."""
+        router = routers.ReplicaRouter()
+        post = Post(text='Тестовый пост')
+        post._state.db = 'replica'
+        self.assertEqual(router.db_for_write(Post, instance=post), 'default')
+        user = User(username='auth')
+        user._state.db = 'default'
+        self.assertTrue(router.allow_relation(post, user))
+        self.assertFalse(router.allow_migrate('replica', 'posts'))
+        self.assertIsNone(router.allow_migrate('default', 'posts'))
+
+    def test_file_copied_replica(self):
+        """Проверяем локальную реплику: открытое к ней соединение видит
+        старые данные до синхронизации и новые — после."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        primary = os.path.join(directory, 'primary.sqlite3')
+        replica = os.path.join(directory, 'replica.sqlite3')
+        writer = sqlite3.connect(primary, isolation_level=None)
+        self.addCleanup(writer.close)
+        writer.execute('PRAGMA journal_mode=WAL')
+        writer.execute('CREATE TABLE item (id INTEGER PRIMARY KEY)')
+        writer.execute('INSERT INTO item VALUES (1)')
+        routers.copy_database(primary, replica)
+        reader = sqlite3.connect(replica)
+        self.addCleanup(reader.close)
+        count = 'SELECT COUNT(*) FROM item'
+        self.assertEqual(reader.execute(count).fetchone()[0], 1)
+        writer.execute('INSERT INTO item VALUES (2)')
+        self.assertEqual(reader.execute(count).fetchone()[0], 1)
+        routers.copy_database(primary, replica)
+        self.assertEqual(reader.execute(count).fetchone()[0], 2)
+        self.assertEqual(
+            reader.execute('PRAGMA journal_mode').fetchone()[0], 'wal'
+        )
+
+
+@override_settings(DB_REPLICAS=['replica'])
+class ReplicaPagesTests(TransactionTestCase):
+    """Страницы, которые по-настоящему читают с реплики — копии тестовой
+    базы в отдельном файле."""
+
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        connections.databases['replica'] = dict(
+            connections.databases['default'],
+            NAME=os.path.join(cls.directory, 'replica.sqlite3'),
+        )
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections.databases['replica']
+        del connections._connections.replica
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+
+    def sync(self):
+        position = time.time()
+        path = connections['replica'].settings_dict['NAME']
+        target = sqlite3.connect(path)
+        try:
+            connection.connection.backup(target)
+        finally:
+            target.close()
+        routers.mark_synced(path, position)
+
+    def test_stale_replica_not_cached(self):
+        """Проверяем, что страницу после изменения, которого нет на
+        реплике, собирает основная база и в кэш попадает свежая копия."""
+        Post.objects.create(author=self.author, text='Старый пост')
+        self.sync()
+        Post.objects.create(author=self.author, text='Новый пост')
+        for _ in range(2):
+            response = self.client.get(reverse('posts:index'))
+            self.assertContains(response, 'Новый пост')
+
+    def test_fresh_replica_used(self):
+        """Проверяем, что реплика, скопированная после последнего
+        изменения, обслуживает страницу."""
+        post = Post.objects.create(author=self.author, text='Текст поста')
+        url = reverse('posts:post_detail', args=(post.pk,))
+        self.client.force_login(self.author)
+        # Отметки тегов, которых нет в кэше, получают текущее время.
+        self.client.get(url)
+        self.sync()
+        with connections['replica'].cursor() as cursor:
+            cursor.execute(
+                'UPDATE posts_post SET text_html = %s WHERE id = %s',
+                ['<p>Текст с реплики</p>', post.pk],
+            )
+        response = self.client.get(url)
+        self.assertContains(response, 'Текст с реплики')
+        self.assertTrue(response.has_header('ETag'))
+
+    def test_session_read_from_primary(self):
+        """Проверяем, что сессия, которой ещё нет на реплике, читается
+        с основной базы и пользователь остаётся авторизованным."""
+        self.client.get(reverse('posts:index'))
+        self.sync()
+        self.client.force_login(self.author)
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn('sessionid', response.cookies)
+        self.assertTrue(response.context['user'].is_authenticated)
+
+    def test_sync_position_shared_through_replica(self):
+        """Проверяем, что время синхронизации берётся из самой
+        реплики, а не из кэша процесса."""
+        self.sync()
+        cache.clear()
+        self.assertIsNotNone(routers.synced('replica'))
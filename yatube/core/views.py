@@ -1,5 +1,10 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
 from django.shortcuts import render
 
+from . import metrics
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -15,3 +20,17 @@ def server_error(request):
 
 def permission_denied(request, exception):
     return render(request, 'core/403.html', status=403)
+
+
+@staff_member_required
+def request_metrics(request):
+    """Гистограммы длительности запросов по адресам; POST их сбрасывает."""
+    if request.method == 'POST':
+        metrics.reset()
+    return JsonResponse(
+        {
+            'sample_rate': settings.METRICS_SAMPLE_RATE,
+            'urls': metrics.snapshot(),
+        },
+        json_dumps_params={'ensure_ascii': False, 'indent': 2},
+    )
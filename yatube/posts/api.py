@@ -0,0 +1,180 @@
+"""JSON-версии лент для мобильного клиента.
+
+Ленты выбираются теми же querysets и паджинатором, что и HTML-страницы,
+но через ``values()``: объекты моделей не создаются, шаблоны не рендерятся.
+Все ответы снабжены ETag и Last-Modified (``conditional_page``), так что
+клиент, опрашивающий ленту, получает ``304 Not Modified`` без обращения
+к базе, пока лента не изменилась.
+"""
+from functools import wraps
+
+from django.core.files.storage import default_storage
+from django.http import JsonResponse
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+
+from . import caching, counters, timeline
+from .caching import conditional_page
+from .models import Comment, Group, Post, User
+from .utils import comment_page, pag
+
+POST_FIELDS = (
+    'id', 'text', 'pub_date', 'author__username', 'group__slug', 'image',
+)
+COMMENT_FIELDS = ('id', 'text', 'created', 'author__username')
+RENAMED = {'author__username': 'author', 'group__slug': 'group'}
+
+
+def _row(row):
+    row = {RENAMED.get(key, key): value for key, value in row.items()}
+    if 'image' in row:
+        row['image'] = default_storage.url(row['image']) if row[
+            'image'
+        ] else None
+    return row
+
+
+def _json(data, status=200, private=False):
+    response = JsonResponse(
+        data, status=status, json_dumps_params={'ensure_ascii': False}
+    )
+    # Клиент хранит ответ, но перед использованием проверяет его по ETag.
+    patch_cache_control(response, no_cache=True, private=private)
+    return response
+
+
+def _not_found():
+    return _json({'detail': 'Не найдено'}, status=404)
+
+
+def login_required(view_func):
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return _json({'detail': 'Требуется авторизация'}, status=401)
+        return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+def _feed(request, post_list, feed=None, private=False):
+    return _page(
+        request, pag(request, post_list.values(*POST_FIELDS), feed=feed),
+        private,
+    )
+
+
+def _page(request, page_obj, private=False):
+    data = {'results': [_row(row) for row in page_obj]}
+    if getattr(page_obj, 'is_keyset', False):
+        pages = {
+            'next': page_obj.next_cursor,
+            'previous': page_obj.previous_cursor,
+        }
+        query = 'cursor'
+    else:
+        data['count'] = page_obj.paginator.count
+        pages = {
+            'next': page_obj.has_next() and page_obj.next_page_number(),
+            'previous': (
+                page_obj.has_previous() and page_obj.previous_page_number()
+            ),
+        }
+        query = 'page'
+    for name, value in pages.items():
+        data[name] = request.build_absolute_uri(
+            f'{request.path}?{query}={value}'
+        ) if value else None
+    return _json(data, private=private)
+
+
+@conditional_page(caching.INDEX_TAG)
+def index(request):
+    return _feed(request, Post.objects.for_listing(), feed=counters.INDEX)
+
+
+@conditional_page('group:{slug}')
+def group_posts(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True
+    ).first()
+    if group_id is None:
+        return _not_found()
+    return _feed(
+        request,
+        Post.objects.filter(group_id=group_id).for_listing(),
+        feed=counters.group_feed(group_id),
+    )
+
+
+@conditional_page('author:{username}')
+def profile(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True
+    ).first()
+    if author_id is None:
+        return _not_found()
+    return _feed(
+        request,
+        Post.objects.filter(author_id=author_id).for_listing(),
+        feed=counters.author_feed(author_id),
+    )
+
+
+def _follow_state(request):
+    return timeline.freshness(request.user)
+
+
+@login_required
+@conditional_page(extra=_follow_state)
+def follow_index(request):
+    return _page(
+        request,
+        timeline.page(
+            request,
+            request.user,
+            Post.objects.for_listing().values(*POST_FIELDS),
+        ),
+        private=True,
+    )
+
+
+@conditional_page('post:{post_id}')
+def post_detail(request, post_id):
+    post = Post.objects.for_listing().filter(pk=post_id).values(
+        *POST_FIELDS, 'comments_count'
+    ).first()
+    if post is None:
+        return _not_found()
+    post = _row(post)
+    comments = _comments(post_id)
+    post['comments'] = [_row(row) for row in comments]
+    post['comments_next'] = _comments_url(request, post_id, comments)
+    return _json(post)
+
+
+def _comments(post_id, cursor=None):
+    return comment_page(
+        Comment.objects.filter(post_id=post_id).values(*COMMENT_FIELDS),
+        cursor,
+    )
+
+
+def _comments_url(request, post_id, comments):
+    if not comments.has_next():
+        return None
+    return request.build_absolute_uri(
+        reverse('posts:api_post_comments', kwargs={'post_id': post_id})
+        + f'?cursor={comments.next_cursor}'
+    )
+
+
+@conditional_page('post:{post_id}')
+def post_comments(request, post_id):
+    """Следующая порция комментариев поста по курсору ``?cursor=``."""
+    comments = _comments(post_id, request.GET.get('cursor'))
+    if not comments and not Post.objects.filter(pk=post_id).exists():
+        return _not_found()
+    return _json({
+        'results': [_row(row) for row in comments],
+        'next': _comments_url(request, post_id, comments),
+    })
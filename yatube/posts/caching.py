@@ -0,0 +1,204 @@
+import calendar
+import hashlib
+import time
+from datetime import datetime
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from core import routers
+
+POST_CARD_FRAGMENT = 'post_card'
+
+
+def post_card_keys(post_id, version, author_id, group_id):
+    """Ключи всех вариантов карточки поста в includes/content.html.
+
+    Карточка зависит от того, показана ли она на странице автора
+    и на странице группы, поэтому у одной версии четыре варианта.
+    """
+    return [
+        make_template_fragment_key(
+            POST_CARD_FRAGMENT, [post_id, version, author, group]
+        )
+        for author in ('', author_id)
+        for group in ('', group_id if group_id is not None else '')
+    ]
+
+
+def forget_post_card(post_id, version, author_id, group_id):
+    cache.delete_many(post_card_keys(post_id, version, author_id, group_id))
+
+
+ALL_TAG = 'all'
+
+INDEX_TAG = 'index'
+
+
+def post_tag(post_id):
+    return f'post:{post_id}'
+
+
+def group_tag(slug):
+    return f'group:{slug}'
+
+
+def author_tag(username):
+    return f'author:{username}'
+
+
+def _tag_key(tag):
+    return 'posts:tag:' + hashlib.md5(tag.encode()).hexdigest()
+
+
+def tag_stamps(tags):
+    """Отметки времени последнего изменения для тегов страниц.
+
+    Отсутствующие в кэше теги получают текущее время, чтобы после
+    вытеснения тега не ожила страница, закэшированная до изменения.
+    """
+    keys = {_tag_key(tag): tag for tag in tags}
+    stamps = cache.get_many(keys)
+    missing = {key: time.time() for key in keys if key not in stamps}
+    for key, stamp in missing.items():
+        cache.add(key, stamp, None)
+    if missing:
+        stamps.update(cache.get_many(missing))
+    return {keys[key]: stamp for key, stamp in stamps.items()}
+
+
+def purge(tags):
+    """Сбрасывает все закэшированные страницы с указанными тегами."""
+    now = time.time()
+    cache.set_many({_tag_key(tag): now for tag in tags}, None)
+
+
+def _changed(stamps, values):
+    """Время последнего изменения данных страницы: отметки тегов
+    и даты или отметки из ``extra``."""
+    return max(list(stamps.values()) + [
+        value.timestamp() if isinstance(value, datetime) else value
+        for value in values
+        if isinstance(value, (datetime, float))
+    ])
+
+
+def anonymous_cache_page(*tag_templates, extra=None):
+    """Кэширует страницу для анонимных посетителей.
+
+    Теги задаются шаблонами, в которые подставляются аргументы view,
+    например ``'group:{slug}'``; тег ``ALL_TAG`` есть у всех страниц.
+    Ключ страницы включает отметки тегов, поэтому ``purge`` сразу делает
+    устаревшие копии недостижимыми. Как и у ``conditional_page``,
+    ``extra(request, **kwargs)`` добавляет в ключ значения, от которых
+    страница зависит помимо тегов.
+    Авторизованным пользователям кэш никогда не отдаётся: в их страницах
+    есть CSRF-токен и персональная шапка. Страница, которой не нашлось
+    в кэше, читается с реплики, только если та не отстала от отметок
+    (``core.routers.ensure_fresh``).
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if (
+                request.method not in ('GET', 'HEAD')
+                or request.user.is_authenticated
+            ):
+                return view_func(request, *args, **kwargs)
+            tags = [ALL_TAG] + [
+                template.format(**kwargs) for template in tag_templates
+            ]
+            stamps = tag_stamps(tags)
+            # extra тоже читает базу.
+            routers.ensure_fresh(max(stamps.values()))
+            values = list(extra(request, **kwargs)) if extra else []
+            raw_key = '|'.join([
+                request.path,
+                request.GET.get('page', ''),
+                request.GET.get('cursor', ''),
+            ] + [f'{tag}={stamps[tag]!r}' for tag in tags] + [
+                repr(value) for value in values
+            ])
+            key = 'posts:page:' + hashlib.md5(raw_key.encode()).hexdigest()
+            response = cache.get(key)
+            if response is not None:
+                return response
+            routers.ensure_fresh(_changed(stamps, values))
+            response = view_func(request, *args, **kwargs)
+            if response.status_code == 200 and not response.cookies:
+                cache.set(key, response, settings.POSTS_PAGE_CACHE_TTL)
+            return response
+        return wrapper
+    return decorator
+
+
+def conditional_page(*tag_templates, extra=None):
+    """Отвечает ``304 Not Modified``, если страница не менялась.
+
+    ETag и Last-Modified считаются до вызова view по отметкам тегов
+    (те же шаблоны, что у ``anonymous_cache_page``): сигналы обновляют их
+    при любом изменении постов, комментариев, групп и подписок, поэтому
+    проверка не обращается к базе. Если содержимое страницы зависит от
+    чего-то ещё, ``extra(request, **kwargs)`` возвращает список значений
+    для ETag; даты из него учитываются и в Last-Modified.
+
+    Как и в ``anonymous_cache_page``, view читает с реплики, только если
+    та не отстала от отметок, иначе ETag описывал бы другие данные.
+
+    Если view не задал Cache-Control сам, страницы гостей разрешено
+    хранить общим кэшам (CDN) на ``POSTS_HTTP_MAX_AGE`` секунд, а страницы
+    пользователей — только браузеру с проверкой перед показом.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+            tags = [ALL_TAG] + [
+                template.format(**kwargs) for template in tag_templates
+            ]
+            stamps = tag_stamps(tags)
+            # extra тоже читает базу.
+            routers.ensure_fresh(max(stamps.values()))
+            values = list(extra(request, **kwargs)) if extra else []
+            modified = [
+                calendar.timegm(value.utctimetuple())
+                for value in values if isinstance(value, datetime)
+            ] + [int(stamp) for stamp in stamps.values()]
+            last_modified = max(modified)
+            raw_etag = repr((
+                request.get_full_path(),
+                request.user.pk,
+                sorted(stamps.items()),
+                values,
+            ))
+            etag = quote_etag(hashlib.md5(raw_etag.encode()).hexdigest())
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if response is None:
+                routers.ensure_fresh(_changed(stamps, values))
+                response = view_func(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                if not response.has_header('ETag'):
+                    response['ETag'] = etag
+                if not response.has_header('Last-Modified'):
+                    response['Last-Modified'] = http_date(last_modified)
+                if not response.has_header('Cache-Control'):
+                    if request.user.is_authenticated:
+                        patch_cache_control(
+                            response, private=True, no_cache=True
+                        )
+                    else:
+                        patch_cache_control(
+                            response,
+                            public=True,
+                            max_age=settings.POSTS_HTTP_MAX_AGE,
+                        )
+            return response
+        return wrapper
+    return decorator
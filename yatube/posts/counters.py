@@ -0,0 +1,103 @@
+"""Счётчики постов в лентах.
+
+Количество постов в ленте нужно паджинатору только для ссылок на страницы,
+поэтому оно хранится в кэше и поддерживается инкрементально сигналами
+создания и удаления постов, а не считается ``COUNT(*)`` на каждый запрос.
+Значения приблизительные: расхождения исправляются по истечении TTL.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+GENERATION_KEY = 'posts:count:generation'
+# Отдельное поколение для лент подписок: пост автора с тысячами
+# подписчиков сбрасывает их все одним инкрементом вместо инкремента
+# на каждого подписчика.
+FOLLOW_GENERATION_KEY = 'posts:count:follow-generation'
+
+INDEX = 'index'
+
+
+def group_feed(group_id):
+    return f'group:{group_id}'
+
+
+def author_feed(author_id):
+    return f'author:{author_id}'
+
+
+def follow_feed(user_id):
+    return f'follow:{user_id}'
+
+
+def post_feeds(post):
+    """Ленты, в которые попадает пост (кроме лент подписчиков)."""
+    feeds = [INDEX, author_feed(post.author_id)]
+    if post.group_id is not None:
+        feeds.append(group_feed(post.group_id))
+    return feeds
+
+
+def _new_generation():
+    return int(time.time() * 1000)
+
+
+def _generations():
+    generations = cache.get_many([GENERATION_KEY, FOLLOW_GENERATION_KEY])
+    for key in (GENERATION_KEY, FOLLOW_GENERATION_KEY):
+        if key not in generations:
+            cache.add(key, _new_generation(), None)
+            generations[key] = cache.get(key)
+    return generations
+
+
+def _key(feed, generations=None):
+    if generations is None:
+        generations = _generations()
+    generation = generations[GENERATION_KEY]
+    if feed.startswith('follow:'):
+        generation = f'{generation}.{generations[FOLLOW_GENERATION_KEY]}'
+    return f'posts:count:{generation}:{feed}'
+
+
+def get_count(feed, queryset):
+    key = _key(feed)
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.add(key, count, settings.POSTS_COUNT_CACHE_TTL)
+    return count
+
+
+def change(feeds, delta):
+    generations = _generations()
+    for feed in feeds:
+        try:
+            cache.incr(_key(feed, generations), delta)
+        except ValueError:
+            # Счётчика нет в кэше: он будет посчитан при первом чтении.
+            pass
+
+
+def forget(feeds):
+    generations = _generations()
+    cache.delete_many([_key(feed, generations) for feed in feeds])
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_generation(), None)
+
+
+def forget_all():
+    """Сбрасывает все счётчики, например после массовой вставки."""
+    _bump(GENERATION_KEY)
+
+
+def forget_follow_feeds():
+    """Сбрасывает счётчики всех лент подписок, например после поста
+    автора, у которого больше TIMELINE_CELEBRITY_FOLLOWERS подписчиков."""
+    _bump(FOLLOW_GENERATION_KEY)
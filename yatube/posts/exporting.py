@@ -0,0 +1,134 @@
+"""Потоковая выгрузка постов, комментариев и подписок.
+
+Таблица читается пачками по первичному ключу (``id > последний``), и каждая
+пачка — отдельный короткий запрос, так что память не растёт с размером
+таблицы, а глубокие страницы не требуют OFFSET. Строки сразу превращаются
+в JSONL или CSV и при желании сжимаются gzip на лету. Формат постов
+совпадает с тем, что принимает команда ``import_posts``.
+"""
+import csv
+import json
+import zlib
+
+from .models import Comment, Follow, Post
+
+# Имя выгрузки: модель и пары (имя столбца, поле для values_list).
+EXPORTS = {
+    'posts': (Post, (
+        ('id', 'id'),
+        ('author', 'author__username'),
+        ('group', 'group__slug'),
+        ('text', 'text'),
+        ('pub_date', 'pub_date'),
+        ('image', 'image'),
+    )),
+    'comments': (Comment, (
+        ('id', 'id'),
+        ('post', 'post_id'),
+        ('author', 'author__username'),
+        ('text', 'text'),
+        ('created', 'created'),
+    )),
+    'follows': (Follow, (
+        ('id', 'id'),
+        ('user', 'user__username'),
+        ('author', 'author__username'),
+    )),
+}
+FORMATS = ('jsonl', 'csv')
+CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+# Сжатая выгрузка отдаётся как файл .gz, а не как Content-Encoding:
+# иначе браузер распакует её и сохранит под именем с .gz.
+GZIP_CONTENT_TYPE = 'application/gzip'
+
+
+def rows(name, batch_size=2000):
+    """Строки выгрузки пачками по ``batch_size`` в порядке id."""
+    model, columns = EXPORTS[name]
+    fields = [field for _, field in columns]
+    last_id = 0
+    while True:
+        batch = model.objects.filter(pk__gt=last_id).order_by(
+            'pk'
+        ).values_list(*fields)[:batch_size]
+        count = 0
+        for row in batch.iterator(chunk_size=batch_size):
+            count += 1
+            last_id = row[0]
+            yield row
+        if count < batch_size:
+            return
+
+
+def _value(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def jsonl_lines(header, rows):
+    for row in rows:
+        yield json.dumps(
+            dict(zip(header, map(_value, row))), ensure_ascii=False
+        ) + '\n'
+
+
+class _Line:
+    """Файл для csv.writer, который возвращает записанную строку."""
+
+    def write(self, line):
+        return line
+
+
+def csv_lines(header, rows):
+    writer = csv.writer(_Line())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(
+            ['' if value is None else _value(value) for value in row]
+        )
+
+
+def encode(lines, buffer_size=64 * 1024):
+    """Склеивает строки в куски байтов примерно по ``buffer_size``."""
+    buffer, size = [], 0
+    for line in lines:
+        data = line.encode('utf-8')
+        buffer.append(data)
+        size += len(data)
+        if size >= buffer_size:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def gzip_chunks(chunks, level=6):
+    """Сжимает поток кусков в формат gzip, не накапливая его в памяти."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export(name, file_format='jsonl', compress=False, batch_size=2000):
+    """Выгрузка ``name`` как поток кусков байтов."""
+    header = [column for column, _ in EXPORTS[name][1]]
+    lines = (jsonl_lines if file_format == 'jsonl' else csv_lines)(
+        header, rows(name, batch_size)
+    )
+    chunks = encode(lines)
+    return gzip_chunks(chunks) if compress else chunks
+
+
+def content_type(file_format, compress=False):
+    return GZIP_CONTENT_TYPE if compress else CONTENT_TYPES[file_format]
+
+
+def filename(name, file_format, compress=False):
+    return f'{name}.{file_format}' + ('.gz' if compress else '')
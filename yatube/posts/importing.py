@@ -0,0 +1,43 @@
+"""Вставка пачки новых постов вместе с производными данными.
+
+``bulk_create`` не отправляет сигналы, поэтому поисковый индекс, ленты
+подписок и счётчики, которые при ``save()`` обновляют сигналы, здесь
+обновляются явно. Так вставляют посты команда ``import_posts`` и засев
+базы для ``benchmark``.
+"""
+from . import search, stats, timeline
+from .models import Post
+
+
+def create_posts(posts):
+    """Вставляет посты и обновляет индекс, ленты и счётчики.
+
+    Вызывается внутри ``transaction.atomic()``: SQLite не возвращает id
+    вставленных строк, и они восстанавливаются как строки после
+    последнего id до вставки. Явно заданные даты публикации сохраняются,
+    хотя ``auto_now_add`` заменяет их текущим временем и в ``bulk_create``.
+    """
+    if not posts:
+        return posts
+    last_id = Post.objects.order_by('-pk').values_list(
+        'pk', flat=True
+    ).first() or 0
+    pub_dates = [post.pub_date for post in posts]
+    Post.objects.bulk_create(posts)
+    if posts[0].pk is None:
+        ids = Post.objects.filter(pk__gt=last_id).order_by(
+            'pk'
+        ).values_list('pk', flat=True)
+        for post, pk in zip(posts, ids):
+            post.pk = pk
+    dated = []
+    for post, pub_date in zip(posts, pub_dates):
+        if pub_date is not None:
+            post.pub_date = pub_date
+            dated.append(post)
+    if dated:
+        Post.objects.bulk_update(dated, ('pub_date',))
+    search.index_posts([(post.pk, post.text) for post in posts])
+    timeline.fan_out_many(posts)
+    stats.add_posts(posts)
+    return posts
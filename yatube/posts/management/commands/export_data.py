@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import exporting
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает посты, комментарии или подписки в JSONL или CSV '
+        'потоком, не загружая таблицу в память'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=sorted(exporting.EXPORTS))
+        parser.add_argument(
+            '--format', choices=exporting.FORMATS, default='jsonl',
+        )
+        parser.add_argument(
+            '--gzip', action='store_true', help='Сжимать выгрузку gzip',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=2000,
+            help='Сколько строк читать из базы за один запрос',
+        )
+        parser.add_argument(
+            '-o', '--output',
+            help='Файл для выгрузки (по умолчанию — стандартный вывод, '
+                 'для --gzip файл обязателен)',
+        )
+
+    def handle(self, *args, **options):
+        chunks = exporting.export(
+            options['name'],
+            options['format'],
+            compress=options['gzip'],
+            batch_size=options['batch_size'],
+        )
+        if options['output']:
+            with open(options['output'], 'wb') as stream:
+                for chunk in chunks:
+                    stream.write(chunk)
+            return
+        if options['gzip']:
+            raise CommandError('Сжатую выгрузку укажите в файл: -o')
+        # Куски кончаются на границе строк и декодируются целиком.
+        for chunk in chunks:
+            self.stdout.write(chunk.decode('utf-8'), ending='')
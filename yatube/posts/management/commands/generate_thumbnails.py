@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт недостающие миниатюры картинок постов и записывает '
+        'их имена в посты'
+    )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').only('pk', 'thumbnails')
+        created = 0
+        for post in posts.iterator():
+            if all(
+                geometry in post.thumbnail_names
+                for geometry, _ in settings.POST_THUMBNAILS
+            ):
+                continue
+            thumbnails.generate(post.pk)
+            created += 1
+            if created % 100 == 0:
+                self.stdout.write(f'Обработано постов: {created}')
+        self.stdout.write(
+            self.style.SUCCESS(f'Миниатюры созданы для постов: {created}')
+        )
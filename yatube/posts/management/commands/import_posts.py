@@ -0,0 +1,270 @@
+import csv
+import json
+import os
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts import caching, counters, importing
+from posts.models import Group, Post, User
+
+FORMATS = ('jsonl', 'csv')
+
+
+class Source:
+    """Записи файла JSONL или CSV, читаемые потоком.
+
+    ``offset`` — смещение в байтах сразу после последней прочитанной
+    записи: с него чтение продолжается после перезапуска.
+    """
+
+    def __init__(self, path, file_format, offset=0, header=None):
+        self.path = path
+        self.format = file_format
+        self.offset = offset
+        self.header = header
+
+    def __iter__(self):
+        with open(self.path, 'rb') as stream:
+            stream.seek(self.offset)
+            lines = (
+                line.decode('utf-8')
+                for line in iter(stream.readline, b'')
+            )
+            if self.format == 'jsonl':
+                records = self._jsonl(lines)
+            else:
+                records = self._csv(lines)
+            for record in records:
+                self.offset = stream.tell()
+                yield record
+
+    def _jsonl(self, lines):
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as error:
+                raise CommandError(
+                    f'Ошибка JSON после байта {self.offset}: {error}'
+                )
+
+    def _csv(self, lines):
+        reader = csv.reader(lines)
+        if self.header is None:
+            self.header = [
+                name.lstrip('\ufeff').strip() for name in next(reader, [])
+            ]
+        for row in reader:
+            yield dict(zip(self.header, row))
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует посты из файла JSONL или CSV с полями author, text, '
+        'group, pub_date, image. Посты вставляются пачками; счётчики, '
+        'поисковый индекс и ленты подписок обновляются вместе с ними'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл .jsonl или .csv')
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='Формат файла (по умолчанию — по расширению)',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=2000,
+            help='Сколько постов вставлять в одной транзакции',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл, в котором после каждой пачки запоминается позиция '
+                 'в исходном файле; при повторном запуске импорт '
+                 'продолжается с неё',
+        )
+        parser.add_argument(
+            '--create-missing', action='store_true',
+            help='Создавать неизвестных авторов и группы вместо того, '
+                 'чтобы пропускать их посты',
+        )
+
+    def handle(self, *args, **options):
+        path = os.path.abspath(options['path'])
+        if not os.path.isfile(path):
+            raise CommandError(f'Файл не найден: {path}')
+        file_format = options['format'] or os.path.splitext(
+            path
+        )[1].lstrip('.').lower()
+        if file_format not in FORMATS:
+            raise CommandError(
+                'Не удалось определить формат файла, укажите --format'
+            )
+        self.batch_size = options['batch_size']
+        self.create_missing = options['create_missing']
+        self.checkpoint_path = options['checkpoint']
+        checkpoint = self.load_checkpoint(path)
+        self.imported = checkpoint.get('imported', 0)
+        self.skipped = checkpoint.get('skipped', 0)
+        self.authors = {}
+        self.groups = {}
+        source = Source(
+            path,
+            file_format,
+            offset=checkpoint.get('offset', 0),
+            header=checkpoint.get('header'),
+        )
+
+        started = time.monotonic()
+        imported_before = self.imported
+        batch = []
+        for record in source:
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                self.import_batch(batch)
+                self.save_checkpoint(path, source)
+                self.report(started, imported_before)
+                batch = []
+        if batch:
+            self.import_batch(batch)
+        self.save_checkpoint(path, source)
+        # Страницы могли закэшироваться между пачками.
+        counters.forget_all()
+        caching.purge([caching.ALL_TAG])
+        self.report(started, imported_before)
+        self.stdout.write(self.style.SUCCESS(
+            f'Импорт завершён: импортировано {self.imported}, '
+            f'пропущено {self.skipped}'
+        ))
+
+    def load_checkpoint(self, path):
+        if not self.checkpoint_path or not os.path.exists(
+            self.checkpoint_path
+        ):
+            return {}
+        with open(self.checkpoint_path, encoding='utf-8') as stream:
+            checkpoint = json.load(stream)
+        if checkpoint.get('path') != path:
+            raise CommandError(
+                f'Контрольная точка {self.checkpoint_path} относится '
+                f'к другому файлу: {checkpoint.get("path")}'
+            )
+        self.stdout.write(
+            f'Продолжаем с байта {checkpoint["offset"]}, '
+            f'уже импортировано {checkpoint["imported"]}'
+        )
+        return checkpoint
+
+    def save_checkpoint(self, path, source):
+        if not self.checkpoint_path:
+            return
+        temporary = self.checkpoint_path + '.tmp'
+        with open(temporary, 'w', encoding='utf-8') as stream:
+            json.dump({
+                'path': path,
+                'offset': source.offset,
+                'header': source.header,
+                'imported': self.imported,
+                'skipped': self.skipped,
+            }, stream)
+        os.replace(temporary, self.checkpoint_path)
+
+    def report(self, started, imported_before):
+        elapsed = time.monotonic() - started
+        rate = (self.imported - imported_before) / elapsed if elapsed else 0
+        self.stdout.write(
+            f'Импортировано {self.imported}, пропущено {self.skipped} '
+            f'({rate:.0f} постов/с)'
+        )
+
+    def resolve(self, batch):
+        """Дополняет словари авторов и групп именами из пачки.
+
+        Неизвестные имена запоминаются со значением None, чтобы не искать
+        их в базе в каждой пачке.
+        """
+        usernames = {
+            record.get('author') for record in batch
+        } - self.authors.keys() - {None, ''}
+        if usernames:
+            self.authors.update(User.objects.filter(
+                username__in=usernames
+            ).values_list('username', 'pk'))
+            missing = usernames - self.authors.keys()
+            if missing and self.create_missing:
+                User.objects.bulk_create([
+                    User(username=username, password=make_password(None))
+                    for username in missing
+                ])
+                self.authors.update(User.objects.filter(
+                    username__in=missing
+                ).values_list('username', 'pk'))
+            else:
+                self.authors.update(dict.fromkeys(missing))
+        slugs = {
+            record.get('group') for record in batch
+        } - self.groups.keys() - {None, ''}
+        if slugs:
+            self.groups.update(
+                Group.objects.filter(slug__in=slugs).values_list('slug', 'pk')
+            )
+            missing = slugs - self.groups.keys()
+            if missing and self.create_missing:
+                Group.objects.bulk_create([
+                    Group(title=slug, slug=slug, description='')
+                    for slug in missing
+                ])
+                self.groups.update(Group.objects.filter(
+                    slug__in=missing
+                ).values_list('slug', 'pk'))
+            else:
+                self.groups.update(dict.fromkeys(missing))
+
+    def build_post(self, record):
+        author_id = self.authors.get(record.get('author'))
+        text = record.get('text')
+        group = record.get('group')
+        if author_id is None or not text or (
+            group and self.groups.get(group) is None
+        ):
+            return None
+        # Без даты её проставит auto_now_add при вставке.
+        pub_date = None
+        if record.get('pub_date'):
+            try:
+                pub_date = parse_datetime(record['pub_date'])
+            except (ValueError, TypeError):
+                # Похоже на дату, но такой даты нет (2020-13-45)
+                # или это вовсе не строка.
+                return None
+            if pub_date is None:
+                return None
+            if timezone.is_naive(pub_date):
+                pub_date = timezone.make_aware(pub_date)
+        return Post(
+            author_id=author_id,
+            group_id=self.groups.get(group),
+            text=text,
+            pub_date=pub_date,
+            image=record.get('image') or '',
+        )
+
+    def import_batch(self, batch):
+        with transaction.atomic():
+            # Строка JSONL может оказаться списком или числом: такая
+            # запись пропускается, как и запись без автора.
+            records = [record for record in batch if isinstance(record, dict)]
+            self.resolve(records)
+            posts = [
+                post for post in map(self.build_post, records)
+                if post is not None
+            ]
+            self.skipped += len(batch) - len(posts)
+            if not posts:
+                return
+            importing.create_posts(posts)
+        self.imported += len(posts)
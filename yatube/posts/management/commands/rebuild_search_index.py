@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Заново строит поисковый индекс FTS5 по всем постам'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько постов индексировать за один запрос',
+        )
+
+    def handle(self, *args, **options):
+        if not search.fts_available():
+            self.stdout.write(
+                'Таблицы FTS5 нет: на PostgreSQL индекс строится самой '
+                'базой, на SQLite без FTS5 поиск идёт через LIKE'
+            )
+            return
+        total = search.rebuild_index(
+            Post.objects.all(), batch_size=options['batch_size']
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'Проиндексировано постов: {total}')
+        )
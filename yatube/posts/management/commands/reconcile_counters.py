@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts import stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счётчики постов, комментариев и подписок, '
+        'разошедшиеся с данными'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько недостающих строк счётчиков создавать за запрос',
+        )
+
+    def handle(self, *args, **options):
+        repaired = stats.reconcile(batch_size=options['batch_size'])
+        for counter, rows in repaired.items():
+            self.stdout.write(f'{counter}: исправлено строк {rows}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Всего исправлено строк: {sum(repaired.values())}'
+        ))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from posts import caching, rendering
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает HTML текста и выдержки постов, например после '
+        'изменения правил в posts/rendering.py или записи в базу в обход '
+        'модели'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько постов обрабатывать за один запрос',
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        for changed in rendering.backfill(
+            Post.objects.all(), batch_size=options['batch_size']
+        ):
+            for post in changed:
+                caching.forget_post_card(
+                    post.pk, post.version, post.author_id, post.group_id
+                )
+            total += len(changed)
+        if total:
+            caching.purge([caching.ALL_TAG])
+        self.stdout.write(
+            self.style.SUCCESS(f'Обновлено постов: {total}')
+        )
@@ -0,0 +1,195 @@
+import re
+from functools import lru_cache
+
+from django.db import OperationalError, migrations
+
+FTS_TABLE = 'posts_post_fts'
+PG_INDEX = 'post_text_search_idx'
+BATCH_SIZE = 1000
+
+# Копия стеммера из posts.search на момент миграции: миграция не должна
+# зависеть от того, как модуль поиска изменится позже.
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE = (
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+    'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+    'ая', 'яя', 'ою', 'ею',
+)
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE = ('ся', 'сь')
+VERB = (
+    ('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+     'ют', 'ны', 'ть', 'ешь', 'нно'),
+    ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+     'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+     'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'),
+)
+NOUN = (
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и',
+    'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам', 'ом', 'о',
+    'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия', 'ья', 'я',
+)
+SUPERLATIVE = ('ейше', 'ейш')
+DERIVATIONAL = ('ость', 'ост')
+
+WORD_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile('[а-я]')
+
+
+def _region(word, start=0):
+    """Начало области после первой пары «гласная, согласная»."""
+    for i in range(start + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            return i + 1
+    return len(word)
+
+
+def _strip(word, rv, endings, preceded=False):
+    """Отрезает самое длинное окончание, целиком лежащее в RV.
+
+    Для окончаний первой группы (``preceded``) перед ним в RV должна
+    стоять «а» или «я», которая остаётся в основе.
+    """
+    for ending in sorted(endings, key=len, reverse=True):
+        if not word.endswith(ending):
+            continue
+        start = len(word) - len(ending)
+        if start < rv:
+            continue
+        if preceded and (start - 1 < rv or word[start - 1] not in 'ая'):
+            continue
+        return word[:start]
+    return None
+
+
+def _strip_grouped(word, rv, groups):
+    first, second = groups
+    candidates = [
+        stem for stem in (
+            _strip(word, rv, first, preceded=True),
+            _strip(word, rv, second),
+        ) if stem is not None
+    ]
+    return min(candidates, key=len) if candidates else None
+
+
+@lru_cache(maxsize=100000)
+def stem(word):
+    """Основа русского слова по алгоритму Snowball."""
+    word = word.lower().replace('ё', 'е')
+    rv = next(
+        (i + 1 for i, letter in enumerate(word) if letter in VOWELS),
+        len(word)
+    )
+    r2 = _region(word, _region(word))
+
+    stemmed = _strip_grouped(word, rv, PERFECTIVE_GERUND)
+    if stemmed is None:
+        word = _strip(word, rv, REFLEXIVE) or word
+        adjective = _strip(word, rv, ADJECTIVE)
+        if adjective is not None:
+            stemmed = _strip_grouped(adjective, rv, PARTICIPLE) or adjective
+        else:
+            stemmed = _strip_grouped(word, rv, VERB)
+            if stemmed is None:
+                stemmed = _strip(word, rv, NOUN)
+    word = word if stemmed is None else stemmed
+
+    if word.endswith('и') and len(word) - 1 >= rv:
+        word = word[:-1]
+
+    derivational = _strip(word, max(rv, r2), DERIVATIONAL)
+    if derivational is not None:
+        word = derivational
+
+    if word.endswith('нн') and len(word) - 2 >= rv:
+        word = word[:-1]
+    else:
+        superlative = _strip(word, rv, SUPERLATIVE)
+        if superlative is not None:
+            word = superlative
+            if word.endswith('нн') and len(word) - 2 >= rv:
+                word = word[:-1]
+        elif word.endswith('ь') and len(word) - 1 >= rv:
+            word = word[:-1]
+    return word
+
+
+def terms(text):
+    """Слова текста, русские слова приведены к основе."""
+    result = []
+    for word in WORD_RE.findall(text.lower().replace('ё', 'е')):
+        result.append(stem(word) if CYRILLIC_RE.search(word) else word)
+    return result
+
+
+def index_posts(apps, schema_editor):
+    """Индексирует существующие посты пачками по id через соединение
+    схемы, а не через соединение по умолчанию."""
+    Post = apps.get_model('posts', 'Post')
+    posts = Post.objects.using(schema_editor.connection.alias)
+    last_id = 0
+    with schema_editor.connection.cursor() as cursor:
+        while True:
+            batch = list(
+                posts.filter(pk__gt=last_id).order_by('pk').values_list(
+                    'pk', 'text'
+                )[:BATCH_SIZE]
+            )
+            if not batch:
+                return
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, body) VALUES (%s, %s)',
+                [(post_id, ' '.join(terms(text))) for post_id, text in batch]
+            )
+            last_id = batch[-1][0]
+
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute(
+            f'CREATE INDEX {PG_INDEX} ON posts_post USING GIN '
+            "(to_tsvector('russian'::regconfig, COALESCE(text, '')))"
+        )
+        return
+    if connection.vendor != 'sqlite':
+        return
+    try:
+        # В body хранятся основы слов текста поста, rowid равен id поста.
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5('
+            "body, tokenize='unicode61 remove_diacritics 0')"
+        )
+    except OperationalError:
+        # SQLite собран без FTS5: поиск работает через LIKE.
+        return
+    index_posts(apps, schema_editor)
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {PG_INDEX}')
+    elif connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_post_thumbnails'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:32
+
+from django.db import migrations, models
+from django.template.defaultfilters import linebreaksbr
+from django.utils.text import Truncator
+
+# Копия правил posts.rendering на момент миграции: миграция не должна
+# меняться вместе с живым модулем.
+EXCERPT_LENGTH = 300
+
+
+def render_html(text):
+    return str(linebreaksbr(text, autoescape=True))
+
+
+def make_excerpt(text):
+    return Truncator(' '.join(text.split())).chars(EXCERPT_LENGTH)
+
+
+def render_posts(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    posts = Post.objects.only('pk', 'text').order_by('pk')
+    last_pk = 0
+    while True:
+        batch = list(posts.filter(pk__gt=last_pk)[:1000])
+        if not batch:
+            return
+        last_pk = batch[-1].pk
+        for post in batch:
+            post.text_html = render_html(post.text)
+            post.excerpt = make_excerpt(post.text)
+        Post.objects.bulk_update(batch, ('text_html', 'excerpt'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, help_text='Показывается в лентах вместо полного текста', max_length=300, verbose_name='Начало текста'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='text_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='Текст поста в HTML'),
+        ),
+        migrations.RunPython(render_posts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:57
+
+from django.db import migrations, models
+from django.db.models.functions import Length
+
+# Длина выдержки из posts.rendering на момент миграции.
+EXCERPT_LENGTH = 300
+
+
+def mark_truncated(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    # Пробелы схлопываются в выдержке, поэтому обрезаны могут быть только
+    # тексты длиннее выдержки.
+    posts = Post.objects.annotate(length=Length('text')).filter(
+        length__gt=EXCERPT_LENGTH
+    ).only('pk', 'text')
+    truncated = [
+        post.pk for post in posts.iterator()
+        if len(' '.join(post.text.split())) > EXCERPT_LENGTH
+    ]
+    for start in range(0, len(truncated), 500):
+        Post.objects.filter(pk__in=truncated[start:start + 500]).update(
+            excerpt_truncated=True
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_post_text_html'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt_truncated',
+            field=models.BooleanField(default=False, editable=False, help_text='В карточке нужна ссылка на пост', verbose_name='Выдержка короче текста'),
+        ),
+        migrations.RunPython(mark_truncated, migrations.RunPython.noop),
+    ]
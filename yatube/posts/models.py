@@ -1,15 +1,70 @@
+import json
+
 from django.db import models
 from django.contrib.auth import get_user_model
 
+from . import caching, counters, rendering
+
 User = get_user_model()
 
 SYM_NUM = 15
 
 
+# Поля, которые нужны карточке поста в includes/content.html.
+LISTING_FIELDS = (
+    'id', 'pub_date', 'image', 'thumbnails', 'excerpt', 'excerpt_truncated',
+    'version', 'author__username', 'author__first_name', 'author__last_name',
+    'group__slug', 'group__title',
+)
+
+
+class PostQuerySet(models.QuerySet):
+    def for_listing(self):
+        """Посты для карточек лент: автор и группа одним запросом.
+
+        Полный текст и его HTML не загружаются: карточке достаточно
+        выдержки, а строки длинных постов в основном из текста и состоят.
+        """
+        return self.select_related('author', 'group').only(*LISTING_FIELDS)
+
+    def for_detail(self):
+        """Пост для отдельной страницы со счётчиками его автора."""
+        return self.select_related('author', 'group', 'author__stats')
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for post in objs:
+            post.render()
+        posts = super().bulk_create(objs, *args, **kwargs)
+        # bulk_create не отправляет сигналы: счётчики лент пересчитаются,
+        # а закэшированные страницы устареют.
+        counters.forget_all()
+        caching.purge([caching.ALL_TAG])
+        return posts
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name='Текст поста',
         help_text='Введите текст поста',)
+    text_html = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name='Текст поста в HTML',
+    )
+    excerpt = models.CharField(
+        max_length=rendering.EXCERPT_LENGTH,
+        blank=True,
+        editable=False,
+        verbose_name='Начало текста',
+        help_text='Показывается в лентах вместо полного текста',
+    )
+    excerpt_truncated = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name='Выдержка короче текста',
+        help_text='В карточке нужна ссылка на пост',
+    )
     pub_date = models.DateTimeField(
         auto_now_add=True,
         verbose_name='Дата публикации',
@@ -35,15 +90,72 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True,
     )
+    thumbnails = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name='Миниатюры',
+        help_text='Имена файлов готовых миниатюр по размерам, в JSON',
+    )
+    version = models.PositiveIntegerField(
+        default=1,
+        editable=False,
+        verbose_name='Версия',
+        help_text='Увеличивается при изменении текста, группы или картинки',
+    )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число комментариев',
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        # Индексы по возрастанию: СУБД читает их в обратном порядке, и вместе
+        # с неявно добавленным id они покрывают сортировку (-pub_date, -id).
+        indexes = (
+            models.Index(fields=('pub_date',), name='post_pub_date_idx'),
+            models.Index(
+                fields=('group', 'pub_date'),
+                name='post_group_pub_date_idx',
+            ),
+            models.Index(
+                fields=('author', 'pub_date'),
+                name='post_author_pub_date_idx',
+            ),
+        )
 
     def __str__(self):
         return self.text[:SYM_NUM]
 
+    def save(self, *args, **kwargs):
+        if 'text' not in self.get_deferred_fields():
+            self.render()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'text' in update_fields:
+                kwargs['update_fields'] = {
+                    *update_fields, *rendering.RENDERED_FIELDS
+                }
+        super().save(*args, **kwargs)
+
+    def render(self):
+        """Пересчитывает ``text_html``, ``excerpt``
+        и ``excerpt_truncated`` по ``text``."""
+        self.text_html = rendering.render_html(self.text)
+        self.excerpt = rendering.make_excerpt(self.text)
+        self.excerpt_truncated = rendering.is_truncated(self.text)
+
+    @property
+    def thumbnail_names(self):
+        try:
+            names = json.loads(self.thumbnails)
+        except ValueError:
+            return {}
+        return names if isinstance(names, dict) else {}
+
 
 class Group(models.Model):
     title = models.CharField(
@@ -63,6 +175,11 @@ class Group(models.Model):
         verbose_name='Описание группы',
         help_text='Введите описание группы',
     )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число постов',
+    )
 
     def __str__(self):
         return self.title
@@ -93,6 +210,12 @@ class Comment(models.Model):
         ordering = ('-created',)
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = (
+            models.Index(
+                fields=('post', 'created'),
+                name='comment_post_created_idx',
+            ),
+        )
 
     def __str__(self):
         return self.text[:SYM_NUM]
@@ -116,6 +239,80 @@ class Follow(models.Model):
         ordering = ('author',)
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
+        indexes = (
+            models.Index(
+                fields=('user', 'author'),
+                name='follow_user_author_idx',
+            ),
+        )
 
     def __str__(self):
         return f'Подписка на {self.author}'
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подписчик',
+    )
+    post = models.ForeignKey(
+        'Post',
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост',
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        ordering = ('-pub_date',)
+        verbose_name = 'Запись ленты подписок'
+        verbose_name_plural = 'Записи ленты подписок'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'post'),
+                name='unique_timeline_entry',
+            ),
+        )
+        # Покрывает выборку страниц ленты по ключу (pub_date, post_id)
+        # в обе стороны, см. posts.timeline.
+        indexes = (
+            models.Index(
+                fields=('user', 'pub_date', 'post'),
+                name='timeline_user_pub_date_post',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.post} в ленте {self.user}'
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, которые нельзя хранить в auth.User."""
+    user = models.OneToOneField(
+        User,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name='stats',
+        verbose_name='Пользователь',
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число постов',
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число подписчиков',
+    )
+    following_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число подписок',
+    )
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+    def __str__(self):
+        return f'Счётчики {self.user}'
@@ -0,0 +1,73 @@
+"""HTML текста поста и короткая выдержка для карточек.
+
+Считаются один раз при сохранении поста (``Post.save``, ``bulk_create``)
+и хранятся в ``Post.text_html``, ``Post.excerpt`` и
+``Post.excerpt_truncated``, чтобы страницы не
+обрабатывали текст на каждом запросе. Если правила ниже меняются, уже
+сохранённые посты пересчитывает команда ``render_posts``.
+"""
+from django.template.defaultfilters import linebreaksbr
+from django.utils.text import Truncator
+
+EXCERPT_LENGTH = 300
+
+ELLIPSIS = '…'
+
+# Поля поста, которые считаются по тексту.
+RENDERED_FIELDS = ('text_html', 'excerpt', 'excerpt_truncated')
+
+
+def render_html(text):
+    """Текст с экранированным HTML и переводами строк в ``<br>``."""
+    return str(linebreaksbr(text, autoescape=True))
+
+
+def make_excerpt(text):
+    """Начало текста одной строкой, не длиннее ``EXCERPT_LENGTH``."""
+    return Truncator(' '.join(text.split())).chars(
+        EXCERPT_LENGTH, truncate=ELLIPSIS
+    )
+
+
+def is_truncated(text):
+    """Не поместился ли текст в выдержку целиком. Решает длина, а не
+    многоточие в конце: им может заканчиваться и короткий текст."""
+    return len(' '.join(text.split())) > EXCERPT_LENGTH
+
+
+def backfill(posts, batch_size=1000):
+    """Пересчитывает HTML, выдержки и ``excerpt_truncated`` постов
+    из ``posts`` пачками по ``batch_size`` и сохраняет только
+    изменившиеся.
+
+    Выдаёт список изменённых постов после каждой пачки. Работает и
+    с историческими моделями миграций.
+    """
+    posts = posts.only(
+        'pk', 'text', 'text_html', 'excerpt', 'excerpt_truncated',
+        'version', 'author_id', 'group_id',
+    ).order_by('pk')
+    last_pk = None
+    while True:
+        batch = posts if last_pk is None else posts.filter(pk__gt=last_pk)
+        batch = list(batch[:batch_size])
+        if not batch:
+            return
+        last_pk = batch[-1].pk
+        changed = []
+        for post in batch:
+            rendered = (
+                render_html(post.text),
+                make_excerpt(post.text),
+                is_truncated(post.text),
+            )
+            if (
+                post.text_html, post.excerpt, post.excerpt_truncated
+            ) != rendered:
+                (
+                    post.text_html, post.excerpt, post.excerpt_truncated
+                ) = rendered
+                changed.append(post)
+        if changed:
+            type(post).objects.bulk_update(changed, RENDERED_FIELDS)
+        yield changed
@@ -0,0 +1,291 @@
+"""Полнотекстовый поиск по постам.
+
+На SQLite посты индексируются в виртуальной таблице FTS5 ``posts_post_fts``
+(её создаёт миграция), которая обновляется сигналами сохранения
+и удаления постов. В FTS5 нет русского стемминга, поэтому в индекс
+и в запрос попадают основы слов, полученные алгоритмом Snowball.
+На PostgreSQL используется ``to_tsvector('russian', text)`` с GIN-индексом.
+"""
+import re
+from functools import lru_cache
+
+from django.db import connection
+
+FTS_TABLE = 'posts_post_fts'
+
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE = (
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+    'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+    'ая', 'яя', 'ою', 'ею',
+)
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE = ('ся', 'сь')
+VERB = (
+    ('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+     'ют', 'ны', 'ть', 'ешь', 'нно'),
+    ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+     'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+     'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'),
+)
+NOUN = (
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и',
+    'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам', 'ом', 'о',
+    'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия', 'ья', 'я',
+)
+SUPERLATIVE = ('ейше', 'ейш')
+DERIVATIONAL = ('ость', 'ост')
+
+WORD_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile('[а-я]')
+
+
+def _region(word, start=0):
+    """Начало области после первой пары «гласная, согласная»."""
+    for i in range(start + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            return i + 1
+    return len(word)
+
+
+def _strip(word, rv, endings, preceded=False):
+    """Отрезает самое длинное окончание, целиком лежащее в RV.
+
+    Для окончаний первой группы (``preceded``) перед ним в RV должна
+    стоять «а» или «я», которая остаётся в основе.
+    """
+    for ending in sorted(endings, key=len, reverse=True):
+        if not word.endswith(ending):
+            continue
+        start = len(word) - len(ending)
+        if start < rv:
+            continue
+        if preceded and (start - 1 < rv or word[start - 1] not in 'ая'):
+            continue
+        return word[:start]
+    return None
+
+
+def _strip_grouped(word, rv, groups):
+    first, second = groups
+    candidates = [
+        stem for stem in (
+            _strip(word, rv, first, preceded=True),
+            _strip(word, rv, second),
+        ) if stem is not None
+    ]
+    return min(candidates, key=len) if candidates else None
+
+
+@lru_cache(maxsize=100000)
+def stem(word):
+    """Основа русского слова по алгоритму Snowball."""
+    word = word.lower().replace('ё', 'е')
+    rv = next(
+        (i + 1 for i, letter in enumerate(word) if letter in VOWELS),
+        len(word)
+    )
+    r2 = _region(word, _region(word))
+
+    stemmed = _strip_grouped(word, rv, PERFECTIVE_GERUND)
+    if stemmed is None:
+        word = _strip(word, rv, REFLEXIVE) or word
+        adjective = _strip(word, rv, ADJECTIVE)
+        if adjective is not None:
+            stemmed = _strip_grouped(adjective, rv, PARTICIPLE) or adjective
+        else:
+            stemmed = _strip_grouped(word, rv, VERB)
+            if stemmed is None:
+                stemmed = _strip(word, rv, NOUN)
+    word = word if stemmed is None else stemmed
+
+    if word.endswith('и') and len(word) - 1 >= rv:
+        word = word[:-1]
+
+    derivational = _strip(word, max(rv, r2), DERIVATIONAL)
+    if derivational is not None:
+        word = derivational
+
+    if word.endswith('нн') and len(word) - 2 >= rv:
+        word = word[:-1]
+    else:
+        superlative = _strip(word, rv, SUPERLATIVE)
+        if superlative is not None:
+            word = superlative
+            if word.endswith('нн') and len(word) - 2 >= rv:
+                word = word[:-1]
+        elif word.endswith('ь') and len(word) - 1 >= rv:
+            word = word[:-1]
+    return word
+
+
+def terms(text):
+    """Слова текста, русские слова приведены к основе."""
+    result = []
+    for word in WORD_RE.findall(text.lower().replace('ё', 'е')):
+        result.append(stem(word) if CYRILLIC_RE.search(word) else word)
+    return result
+
+
+def match_expression(query):
+    """Запрос FTS5: все слова запроса, каждое как префикс основы."""
+    return ' '.join('"%s"*' % term for term in terms(query))
+
+
+_fts_tables = {}
+
+
+def forget_fts_tables():
+    """Забывает, в каких базах есть таблица FTS5 (после миграций)."""
+    _fts_tables.clear()
+
+
+def fts_available():
+    """Есть ли в базе таблица FTS5 (проверяется один раз на базу)."""
+    if connection.vendor != 'sqlite':
+        return False
+    name = connection.settings_dict['NAME']
+    if name not in _fts_tables:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' "
+                "AND name = %s", [FTS_TABLE]
+            )
+            _fts_tables[name] = cursor.fetchone() is not None
+    return _fts_tables[name]
+
+
+def index_posts(posts):
+    """Добавляет или обновляет посты в поисковом индексе SQLite.
+
+    ``posts`` — пары (id, текст).
+    """
+    if not fts_available():
+        return
+    rows = [(post_id, ' '.join(terms(text))) for post_id, text in posts]
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+            [(post_id,) for post_id, _ in rows]
+        )
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, body) VALUES (%s, %s)', rows
+        )
+
+
+def remove_post(post_id):
+    if fts_available():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+
+
+def rebuild_index(queryset, batch_size=1000):
+    """Строит индекс заново по постам queryset, пачками по id.
+
+    Возвращает число проиндексированных постов.
+    """
+    if not fts_available():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    total, last_id = 0, 0
+    while True:
+        batch = list(
+            queryset.filter(pk__gt=last_id).order_by('pk').values_list(
+                'pk', 'text'
+            )[:batch_size]
+        )
+        if not batch:
+            return total
+        index_posts(batch)
+        total += len(batch)
+        last_id = batch[-1][0]
+
+
+class SearchResults:
+    """Ранжированные результаты поиска FTS5 для ``Paginator``.
+
+    Страница выбирается из индекса по ``LIMIT/OFFSET`` в порядке bm25,
+    после чего посты страницы загружаются одним запросом.
+    """
+
+    def __init__(self, queryset, query):
+        self.queryset = queryset
+        self.match = match_expression(query)
+
+    def count(self):
+        if not self.match:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s',
+                [self.match]
+            )
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            raise TypeError('SearchResults поддерживает только срезы')
+        if not self.match:
+            return []
+        start = item.start or 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY rank LIMIT %s OFFSET %s',
+                [self.match, item.stop - start, start]
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        posts = self.queryset.in_bulk(ids)
+        return [posts[post_id] for post_id in ids if post_id in posts]
+
+
+def search(queryset, query):
+    """Посты из queryset, подходящие под запрос, по убыванию релевантности."""
+    if fts_available():
+        return SearchResults(queryset, query)
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import (
+            SearchQuery, SearchRank, SearchVector
+        )
+        vector = SearchVector('text', config='russian')
+        search_query = SearchQuery(query, config='russian')
+        return queryset.annotate(
+            rank=SearchRank(vector, search_query)
+        ).filter(rank__gt=0).order_by('-rank', '-pub_date')
+    return queryset.filter(text__icontains=query)
+
+
+def filter_queryset(queryset, query):
+    """Сужает queryset до подходящих под запрос постов без ранжирования."""
+    if fts_available():
+        match = match_expression(query)
+        if not match:
+            return queryset
+        return queryset.extra(
+            where=[
+                f'posts_post.id IN (SELECT rowid FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s)'
+            ],
+            params=[match],
+        )
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery, SearchVector
+        return queryset.annotate(
+            search=SearchVector('text', config='russian')
+        ).filter(search=SearchQuery(query, config='russian'))
+    return queryset.filter(text__icontains=query)
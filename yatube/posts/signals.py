@@ -0,0 +1,283 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import (
+    post_delete, post_migrate, post_save, pre_save
+)
+from django.dispatch import receiver
+
+from . import caching, counters, search, stats, thumbnails, timeline
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+# Поля, которые видны на страницах с постами: имя в карточке и ссылка
+# на профиль, название и ссылка группы.
+USER_PAGE_FIELDS = ('username', 'first_name', 'last_name')
+GROUP_PAGE_FIELDS = ('slug', 'title')
+
+
+def purge_post_pages_of(posts, tags=()):
+    """Сбрасывает карточки постов из ``posts``, их страницы, страницы их
+    авторов и групп и главную вместе с тегами ``tags``."""
+    tags = {caching.INDEX_TAG, *tags}
+    cards = []
+    for post_id, version, author_id, group_id, username, slug in (
+        posts.values_list(
+            'pk', 'version', 'author_id', 'group_id', 'author__username',
+            'group__slug',
+        ).iterator()
+    ):
+        cards += caching.post_card_keys(post_id, version, author_id, group_id)
+        tags.add(caching.post_tag(post_id))
+        tags.add(caching.author_tag(username))
+        if slug:
+            tags.add(caching.group_tag(slug))
+    cache.delete_many(cards)
+    caching.purge(tags)
+
+
+def change_follower_feeds(followers, delta):
+    """Меняет счётчики лент подписчиков автора.
+
+    ``followers`` равен None, если подписчиков больше
+    TIMELINE_CELEBRITY_FOLLOWERS: тогда вместо инкремента на каждого
+    подписчика сбрасываются сразу все счётчики лент подписок.
+    """
+    if followers is None:
+        counters.forget_follow_feeds()
+        return
+    counters.change(
+        [counters.follow_feed(user_id) for user_id in followers], delta
+    )
+
+
+def author_followers(author_id):
+    limit = settings.TIMELINE_CELEBRITY_FOLLOWERS
+    followers = list(
+        Follow.objects.filter(author_id=author_id).values_list(
+            'user_id', flat=True
+        )[:limit + 1]
+    )
+    return None if len(followers) > limit else followers
+
+
+@receiver(pre_save, sender=Post)
+def track_post_changes(sender, instance, **kwargs):
+    if instance._state.adding:
+        return
+    old = Post.objects.filter(pk=instance.pk).values(
+        'text', 'group_id', 'group__slug', 'image', 'version'
+    ).first()
+    if old is None:
+        return
+    instance._old_text = old['text']
+    instance._old_group_id = old['group_id']
+    instance._old_group_slug = old['group__slug']
+    instance._old_image = old['image']
+    instance._old_version = old['version']
+    if old['image'] != instance.image.name:
+        instance.thumbnails = ''
+    if (
+        old['text'] != instance.text
+        or old['group_id'] != instance.group_id
+        or old['image'] != instance.image.name
+    ):
+        instance.version = old['version'] + 1
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, **kwargs):
+    if created:
+        counters.change(counters.post_feeds(instance), 1)
+        change_follower_feeds(timeline.fan_out(instance), 1)
+        return
+    old_group_id = getattr(instance, '_old_group_id', instance.group_id)
+    if old_group_id != instance.group_id:
+        if old_group_id is not None:
+            counters.change([counters.group_feed(old_group_id)], -1)
+        if instance.group_id is not None:
+            counters.change([counters.group_feed(instance.group_id)], 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.change(counters.post_feeds(instance), -1)
+    change_follower_feeds(author_followers(instance.author_id), -1)
+
+
+@receiver(post_save, sender=Post)
+def update_saved_post_stats(sender, instance, created, **kwargs):
+    if created:
+        stats.change_user(instance.author_id, 'posts_count', 1)
+        stats.change_group_posts(instance.group_id, 1)
+        return
+    old_group_id = getattr(instance, '_old_group_id', instance.group_id)
+    if old_group_id != instance.group_id:
+        stats.change_group_posts(old_group_id, -1)
+        stats.change_group_posts(instance.group_id, 1)
+
+
+@receiver(post_delete, sender=Post)
+def update_deleted_post_stats(sender, instance, **kwargs):
+    stats.change_user(instance.author_id, 'posts_count', -1)
+    stats.change_group_posts(instance.group_id, -1)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def forget_stale_post_card(sender, instance, created=False, **kwargs):
+    if not created:
+        caching.forget_post_card(
+            instance.pk,
+            getattr(instance, '_old_version', instance.version),
+            instance.author_id,
+            getattr(instance, '_old_group_id', instance.group_id),
+        )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def purge_post_pages(sender, instance, **kwargs):
+    tags = [
+        caching.INDEX_TAG,
+        caching.post_tag(instance.pk),
+        caching.author_tag(instance.author.username),
+    ]
+    if instance.group_id is not None:
+        tags.append(caching.group_tag(instance.group.slug))
+    old_group_slug = getattr(instance, '_old_group_slug', None)
+    if old_group_slug is not None:
+        tags.append(caching.group_tag(old_group_slug))
+    caching.purge(tags)
+
+
+@receiver(post_save, sender=Post)
+def schedule_thumbnails(sender, instance, created, **kwargs):
+    old_image = getattr(instance, '_old_image', None)
+    if instance.image and (created or old_image != instance.image.name):
+        thumbnails.schedule(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, created, **kwargs):
+    if created or getattr(instance, '_old_text', None) != instance.text:
+        search.index_posts([(instance.pk, instance.text)])
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.remove_post(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, created, **kwargs):
+    if created:
+        stats.change_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    stats.change_comments(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def purge_comment_pages(sender, instance, **kwargs):
+    caching.purge([caching.post_tag(instance.post_id)])
+
+
+@receiver(pre_save, sender=Group)
+def remember_group_slug(sender, instance, **kwargs):
+    instance._old_page_fields = None
+    if not instance._state.adding:
+        instance._old_page_fields = Group.objects.filter(
+            pk=instance.pk
+        ).values_list(*GROUP_PAGE_FIELDS).first()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def purge_group_pages(sender, instance, **kwargs):
+    old = getattr(instance, '_old_page_fields', None)
+    slugs = {instance.slug, old[0] if old else None}
+    tags = [caching.group_tag(slug) for slug in slugs if slug]
+    new = tuple(getattr(instance, field) for field in GROUP_PAGE_FIELDS)
+    if old is not None and old != new:
+        # Название и ссылка группы есть и на страницах её постов.
+        purge_post_pages_of(instance.posts.all(), tags)
+    else:
+        caching.purge(tags)
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, **kwargs):
+    if created:
+        UserStats.objects.create(user=instance)
+
+
+@receiver(pre_save, sender=User)
+def remember_user_names(sender, instance, update_fields=None, **kwargs):
+    instance._old_page_fields = None
+    # Вход сохраняет только last_login: имени не трогает, запрос не нужен.
+    if instance._state.adding or (
+        update_fields is not None
+        and not set(update_fields) & set(USER_PAGE_FIELDS)
+    ):
+        return
+    instance._old_page_fields = User.objects.filter(
+        pk=instance.pk
+    ).values_list(*USER_PAGE_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def purge_user_pages(sender, instance, **kwargs):
+    old = getattr(instance, '_old_page_fields', None)
+    new = tuple(getattr(instance, field) for field in USER_PAGE_FIELDS)
+    if old is None or old == new:
+        return
+    # Имя автора есть в карточках и на страницах его постов, а имя
+    # пользователя — в адресе профиля.
+    purge_post_pages_of(
+        Post.objects.filter(author=instance),
+        {caching.author_tag(old[0]), caching.author_tag(instance.username)},
+    )
+
+
+@receiver(post_save, sender=Follow)
+def count_saved_follow(sender, instance, created, **kwargs):
+    if created:
+        stats.change_user(instance.author_id, 'followers_count', 1)
+        stats.change_user(instance.user_id, 'following_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    stats.change_user(instance.author_id, 'followers_count', -1)
+    stats.change_user(instance.user_id, 'following_count', -1)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def purge_follow_pages(sender, instance, **kwargs):
+    caching.purge([
+        caching.author_tag(instance.user.username),
+        caching.author_tag(instance.author.username),
+    ])
+
+
+@receiver(post_save, sender=Follow)
+def add_followed_posts(sender, instance, created, **kwargs):
+    if created:
+        timeline.add_author(instance.user_id, instance.author_id)
+    counters.forget([counters.follow_feed(instance.user_id)])
+
+
+@receiver(post_delete, sender=Follow)
+def remove_followed_posts(sender, instance, **kwargs):
+    timeline.remove_author(instance.user_id, instance.author_id)
+    counters.forget([counters.follow_feed(instance.user_id)])
+
+
+@receiver(post_migrate)
+def forget_search_tables(sender, **kwargs):
+    # Миграция 0012 создаёт и удаляет таблицу FTS5 в обход posts.search.
+    search.forget_fts_tables()
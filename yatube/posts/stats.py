@@ -0,0 +1,146 @@
+"""Денормализованные счётчики в строках Post, Group и UserStats.
+
+В отличие от приблизительных счётчиков лент из ``counters`` эти числа
+показываются на страницах, поэтому хранятся в базе и меняются атомарно
+выражениями ``F()`` в той же транзакции, что и само изменение. Расхождения
+(после bulk_create, правки базы вручную) исправляет ``reconcile``
+и команда ``reconcile_counters``.
+"""
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import (
+    Case, Count, F, IntegerField, OuterRef, Subquery, Value, When
+)
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+# (модель, поле счётчика, что считаем, поле связи с моделью)
+COUNTERS = (
+    (Post, 'comments_count', Comment, 'post'),
+    (Group, 'posts_count', Post, 'group'),
+    (UserStats, 'posts_count', Post, 'author'),
+    (UserStats, 'followers_count', Follow, 'author'),
+    (UserStats, 'following_count', Follow, 'user'),
+)
+
+
+def _change(queryset, field, delta):
+    if delta < 0:
+        # Счётчик не уходит в минус, даже если он уже разошёлся с данными.
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def change_comments(post_id, delta):
+    _change(Post.objects.filter(pk=post_id), 'comments_count', delta)
+
+
+def change_group_posts(group_id, delta):
+    if group_id is not None:
+        _change(Group.objects.filter(pk=group_id), 'posts_count', delta)
+
+
+def change_user(user_id, field, delta):
+    updated = _change(UserStats.objects.filter(pk=user_id), field, delta)
+    if not updated and delta > 0:
+        create_user_stats(user_id)
+
+
+def _add_many(queryset, field, deltas, chunk_size=500):
+    """Прибавляет к счётчикам строк разные значения одним UPDATE
+    на ``chunk_size`` строк."""
+    deltas = list(deltas.items())
+    for start in range(0, len(deltas), chunk_size):
+        chunk = dict(deltas[start:start + chunk_size])
+        queryset.filter(pk__in=chunk).update(**{field: F(field) + Case(
+            *[When(pk=pk, then=Value(delta)) for pk, delta in chunk.items()],
+            default=Value(0),
+            output_field=IntegerField(),
+        )})
+
+
+def add_posts(posts):
+    """Учитывает пачку новых постов, созданных без сигналов."""
+    by_author, by_group = Counter(), Counter()
+    for post in posts:
+        by_author[post.author_id] += 1
+        if post.group_id is not None:
+            by_group[post.group_id] += 1
+    existing = set(UserStats.objects.filter(
+        pk__in=by_author
+    ).values_list('pk', flat=True))
+    _add_many(UserStats.objects.all(), 'posts_count', {
+        author_id: delta for author_id, delta in by_author.items()
+        if author_id in existing
+    })
+    missing = by_author.keys() - existing
+    if missing:
+        # Авторы, созданные без сигналов: их счётчики считаются по базе,
+        # где новые посты уже есть.
+        UserStats.objects.bulk_create(
+            [UserStats(user_id=user_id) for user_id in missing],
+            ignore_conflicts=True,
+        )
+        UserStats.objects.filter(pk__in=missing).update(
+            **{
+                field: actual_count(source, lookup)
+                for model, field, source, lookup in COUNTERS
+                if model is UserStats
+            }
+        )
+    _add_many(Group.objects.all(), 'posts_count', by_group)
+
+
+def create_user_stats(user_id):
+    """Создаёт счётчики пользователя, которых ещё нет, по данным базы."""
+    if UserStats.objects.filter(pk=user_id).exists():
+        return
+    try:
+        with transaction.atomic():
+            UserStats.objects.create(
+                user_id=user_id,
+                posts_count=Post.objects.filter(author_id=user_id).count(),
+                followers_count=Follow.objects.filter(
+                    author_id=user_id
+                ).count(),
+                following_count=Follow.objects.filter(
+                    user_id=user_id
+                ).count(),
+            )
+    except IntegrityError:
+        # Строку уже создал параллельный запрос.
+        pass
+
+
+def actual_count(source, lookup):
+    """Подзапрос: сколько строк source ссылаются на строку через lookup."""
+    counts = source.objects.filter(
+        **{lookup: OuterRef('pk')}
+    ).order_by().values(lookup).annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def reconcile(batch_size=1000):
+    """Пересчитывает разошедшиеся счётчики одним UPDATE на счётчик.
+
+    Возвращает число исправленных строк для каждого счётчика.
+    """
+    missing = User.objects.filter(stats__isnull=True).values_list(
+        'pk', flat=True
+    )
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=user_id) for user_id in missing],
+        batch_size=batch_size,
+    )
+    repaired = {}
+    for model, field, source, lookup in COUNTERS:
+        actual = actual_count(source, lookup)
+        drifted = model.objects.annotate(actual=actual).exclude(
+            **{field: F('actual')}
+        ).values('pk')
+        repaired[f'{model.__name__}.{field}'] = model.objects.filter(
+            pk__in=drifted
+        ).update(**{field: actual})
+    return repaired
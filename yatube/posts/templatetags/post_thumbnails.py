@@ -0,0 +1,18 @@
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(post, geometry, **options):
+    """Готовая миниатюра картинки поста.
+
+    Если миниатюра ещё не создана, ставит её в очередь и возвращает
+    None: шаблон в этом случае показывает исходную картинку.
+    """
+    thumbnail = thumbnails.post_thumbnail(post, geometry, **options)
+    if thumbnail is None and post.image:
+        thumbnails.schedule(post.pk)
+    return thumbnail
@@ -0,0 +1,163 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост',
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(ApiTests.reader)
+
+    def expected_post(self):
+        return {
+            'id': self.post.pk,
+            'text': 'Тестовый пост',
+            'author': 'auth',
+            'group': 'test-slug',
+            'image': None,
+        }
+
+    def test_feeds(self):
+        """Проверяем содержимое JSON-лент."""
+        urls = {
+            'index': reverse('posts:api_index'),
+            'group_list': reverse(
+                'posts:api_group_list', kwargs={'slug': 'test-slug'}
+            ),
+            'profile': reverse(
+                'posts:api_profile', kwargs={'username': 'auth'}
+            ),
+        }
+        for name, url in urls.items():
+            with self.subTest(name=name):
+                data = self.guest_client.get(url).json()
+                self.assertEqual(data['count'], 1)
+                self.assertIsNone(data['next'])
+                post = data['results'][0]
+                self.assertIn('pub_date', post)
+                del post['pub_date']
+                self.assertEqual(post, self.expected_post())
+
+    def test_follow_feed(self):
+        """Проверяем ленту подписок."""
+        url = reverse('posts:api_follow_index')
+        self.assertEqual(self.guest_client.get(url).status_code, 401)
+        response = self.reader_client.get(url)
+        self.assertEqual(
+            [post['id'] for post in response.json()['results']],
+            [self.post.pk],
+        )
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_post_detail(self):
+        """Проверяем JSON поста с комментариями."""
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий'
+        )
+        data = self.guest_client.get(
+            reverse('posts:api_post_detail', kwargs={'post_id': self.post.pk})
+        ).json()
+        self.assertEqual(data['comments_count'], 1)
+        self.assertEqual(
+            [(comment['author'], comment['text'])
+             for comment in data['comments']],
+            [('reader', 'Комментарий')],
+        )
+
+    def test_not_found(self):
+        """Проверяем JSON-ответ 404."""
+        urls = (
+            reverse('posts:api_post_detail', kwargs={'post_id': 0}),
+            reverse('posts:api_group_list', kwargs={'slug': 'missing'}),
+            reverse('posts:api_profile', kwargs={'username': 'missing'}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertIn('detail', response.json())
+
+    def assertNotModified(self, url, change):
+        """Ответ 304 без запросов к базе, пока change() не изменит ленту."""
+        etag = self.guest_client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        change()
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_conditional_get(self):
+        """Проверяем 304 Not Modified и смену ETag при изменениях."""
+        post_url = reverse(
+            'posts:api_post_detail', kwargs={'post_id': self.post.pk}
+        )
+        self.assertNotModified(
+            reverse('posts:api_index'),
+            lambda: Post.objects.create(author=self.reader, text='Новый'),
+        )
+        self.assertNotModified(
+            post_url,
+            lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text='Комментарий'
+            ),
+        )
+
+    def test_follow_feed_conditional_get(self):
+        """Проверяем смену ETag ленты подписок при новом посте автора,
+        правке его поста и отписке."""
+        url = reverse('posts:api_follow_index')
+
+        def post_edit():
+            self.post.text = 'Исправленный пост'
+            self.post.save()
+
+        for change in (
+            lambda: Post.objects.create(author=self.user, text='Новый пост'),
+            post_edit,
+            lambda: Follow.objects.filter(user=self.reader).delete(),
+        ):
+            etag = self.reader_client.get(url)['ETag']
+            self.assertEqual(
+                self.reader_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                ).status_code,
+                304,
+            )
+            change()
+            self.assertEqual(
+                self.reader_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                ).status_code,
+                200,
+            )
+
+    def test_if_modified_since(self):
+        """Проверяем ответ на If-Modified-Since."""
+        url = reverse('posts:api_index')
+        last_modified = self.guest_client.get(url)['Last-Modified']
+        response = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, 304)
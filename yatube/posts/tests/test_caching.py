@@ -0,0 +1,343 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.caching import post_card_keys
+from posts.models import Follow, Group, Post, User
+
+
+class PostCardCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.group_url = reverse(
+            'posts:group_list', kwargs={'slug': cls.group.slug}
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.post = Post.objects.create(
+            author=PostCardCacheTests.user,
+            text='Тестовый пост',
+            group=PostCardCacheTests.group,
+        )
+
+    def card_keys(self, post):
+        return post_card_keys(
+            post.pk, post.version, post.author_id, post.group_id
+        )
+
+    def test_card_served_from_cache(self):
+        """Проверяем, что карточка поста берётся из кэша."""
+        self.guest_client.get(self.group_url)
+        Post.objects.filter(pk=self.post.pk).update(text='Без сигналов')
+        response = self.guest_client.get(self.group_url)
+        self.assertContains(response, 'Тестовый пост')
+        self.assertNotContains(response, 'Без сигналов')
+
+    def test_edit_bumps_version(self):
+        """Проверяем, что правка поста обновляет карточку."""
+        self.guest_client.get(self.group_url)
+        old_keys = self.card_keys(self.post)
+        self.assertTrue(cache.get_many(old_keys))
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        self.assertEqual(self.post.version, 2)
+        self.assertFalse(cache.get_many(old_keys))
+        response = self.guest_client.get(self.group_url)
+        self.assertContains(response, 'Исправленный пост')
+
+    def test_save_without_changes_keeps_version(self):
+        """Проверяем, что сохранение без изменений не сбрасывает кэш."""
+        self.post.save()
+        self.assertEqual(self.post.version, 1)
+
+    def test_delete_forgets_cards(self):
+        """Проверяем, что удаление поста удаляет его карточки из кэша."""
+        self.guest_client.get(self.group_url)
+        self.guest_client.get(
+            reverse('posts:profile', kwargs={'username': self.user.username})
+        )
+        keys = self.card_keys(self.post)
+        self.assertEqual(len(cache.get_many(keys)), 2)
+        self.post.delete()
+        self.assertFalse(cache.get_many(keys))
+
+    def test_renames_forget_cards(self):
+        """Проверяем, что карточки показывают новое имя автора и новую
+        ссылку группы."""
+        index_url = reverse('posts:index')
+        self.guest_client.get(index_url)
+        keys = self.card_keys(self.post)
+        self.assertTrue(cache.get_many(keys))
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = 'Лев'
+        user.last_name = 'Толстой'
+        user.save()
+        self.assertFalse(cache.get_many(keys))
+        self.assertContains(self.guest_client.get(index_url), 'Лев Толстой')
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'new-slug'
+        group.save()
+        self.assertContains(
+            self.guest_client.get(index_url),
+            reverse('posts:group_list', kwargs={'slug': 'new-slug'}),
+        )
+
+
+class AnonymousPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост',
+            group=cls.group,
+        )
+        cls.urls = {
+            'index': reverse('posts:index'),
+            'group_list': reverse(
+                'posts:group_list', kwargs={'slug': cls.group.slug}
+            ),
+            'profile': reverse(
+                'posts:profile', kwargs={'username': cls.user.username}
+            ),
+            'post_detail': reverse(
+                'posts:post_detail', kwargs={'post_id': cls.post.pk}
+            ),
+        }
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(AnonymousPageCacheTests.user)
+
+    def test_guest_pages_served_from_cache(self):
+        """Проверяем, что повторный запрос гостя не обращается к БД."""
+        for name, url in self.urls.items():
+            with self.subTest(name=name):
+                self.guest_client.get(url)
+                with self.assertNumQueries(0):
+                    response = self.guest_client.get(url)
+                self.assertContains(response, 'Тестовый пост')
+
+    def test_renames_refresh_cached_pages(self):
+        """Проверяем, что закэшированные страницы гостя показывают новое
+        имя автора и новую ссылку группы."""
+        names = ('index', 'group_list', 'profile', 'post_detail')
+        for name in names:
+            self.guest_client.get(self.urls[name])
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = 'Лев'
+        user.last_name = 'Толстой'
+        user.save()
+        for name in names:
+            with self.subTest(name=name):
+                self.assertContains(
+                    self.guest_client.get(self.urls[name]), 'Лев Толстой'
+                )
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'new-slug'
+        group.save()
+        group_url = reverse('posts:group_list', kwargs={'slug': 'new-slug'})
+        for name in ('index', 'profile', 'post_detail'):
+            with self.subTest(name=name):
+                self.assertContains(
+                    self.guest_client.get(self.urls[name]), group_url
+                )
+
+    def test_authorized_pages_not_cached(self):
+        """Проверяем, что авторизованный пользователь не получает
+        закэшированную страницу."""
+        for name, url in self.urls.items():
+            with self.subTest(name=name):
+                self.guest_client.get(url)
+                response = self.authorized_client.get(url)
+                self.assertIsNotNone(response.context)
+                self.assertContains(response, 'Выйти')
+
+    def test_new_post_purges_feeds(self):
+        """Проверяем, что новый пост сбрасывает ленты, в которые попал,
+        и страницы постов автора с числом его постов, но не трогает
+        страницу поста другого автора."""
+        other_url = reverse('posts:post_detail', kwargs={
+            'post_id': Post.objects.create(
+                author=User.objects.create_user(username='other'),
+                text='Чужой пост',
+            ).pk,
+        })
+        for url in [*self.urls.values(), other_url]:
+            self.guest_client.get(url)
+        Post.objects.create(
+            author=self.user, text='Свежий пост', group=self.group
+        )
+        for name in ('index', 'group_list', 'profile'):
+            with self.subTest(name=name):
+                response = self.guest_client.get(self.urls[name])
+                self.assertContains(response, 'Свежий пост')
+        response = self.guest_client.get(self.urls['post_detail'])
+        self.assertEqual(response.context['post'].author.stats.posts_count, 2)
+        with self.assertNumQueries(0):
+            self.guest_client.get(other_url)
+
+    def test_comment_purges_post_detail(self):
+        """Проверяем, что комментарий сбрасывает страницу поста."""
+        self.guest_client.get(self.urls['post_detail'])
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            {'text': 'Новый комментарий'}
+        )
+        response = self.guest_client.get(self.urls['post_detail'])
+        self.assertContains(response, 'Новый комментарий')
+
+    def test_pages_cached_separately(self):
+        """Проверяем, что номер страницы входит в ключ кэша."""
+        self.guest_client.get(self.urls['index'])
+        response = self.guest_client.get(self.urls['index'], {'page': 2})
+        self.assertIsNotNone(response.context)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост',
+            group=cls.group,
+        )
+        cls.urls = {
+            'index': reverse('posts:index'),
+            'group_list': reverse(
+                'posts:group_list', kwargs={'slug': cls.group.slug}
+            ),
+            'profile': reverse(
+                'posts:profile', kwargs={'username': cls.user.username}
+            ),
+            'post_detail': reverse(
+                'posts:post_detail', kwargs={'post_id': cls.post.pk}
+            ),
+        }
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(ConditionalGetTests.user)
+
+    def test_not_modified_without_queries(self):
+        """Проверяем ответ 304 гостю без обращения к БД."""
+        for name, url in self.urls.items():
+            with self.subTest(name=name):
+                response = self.guest_client.get(url)
+                self.assertEqual(
+                    response['Cache-Control'], 'public, max-age=0'
+                )
+                with self.assertNumQueries(0):
+                    response = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag']
+                    )
+                self.assertEqual(response.status_code, 304)
+
+    def test_changes_modify_etag(self):
+        """Проверяем, что новый пост автора меняет ETag всех его страниц."""
+        etags = {
+            name: self.guest_client.get(url)['ETag']
+            for name, url in self.urls.items()
+        }
+        Post.objects.create(
+            author=self.user, text='Свежий пост', group=self.group
+        )
+        for name, url in self.urls.items():
+            with self.subTest(name=name):
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[name]
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_renames_modify_etag(self):
+        """Проверяем, что смена имени автора и названия группы меняет
+        ETag всех страниц, где они видны."""
+        user = User.objects.get(pk=self.user.pk)
+        group = Group.objects.get(pk=self.group.pk)
+        for obj, field, value in (
+            (user, 'first_name', 'Новое имя'),
+            (group, 'title', 'Новое название'),
+        ):
+            etags = {
+                name: self.guest_client.get(url)['ETag']
+                for name, url in self.urls.items()
+            }
+            setattr(obj, field, value)
+            obj.save()
+            for name, url in self.urls.items():
+                with self.subTest(field=field, name=name):
+                    response = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=etags[name]
+                    )
+                    self.assertEqual(response.status_code, 200)
+
+    def test_login_keeps_etag(self):
+        """Проверяем, что вход пользователя (запись last_login) не
+        сбрасывает страницы его постов."""
+        url = self.urls['post_detail']
+        etag = self.guest_client.get(url)['ETag']
+        Client().force_login(self.user)
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_authorized_pages_are_private(self):
+        """Проверяем заголовки страниц авторизованного пользователя."""
+        for name, url in self.urls.items():
+            with self.subTest(name=name):
+                guest_etag = self.guest_client.get(url)['ETag']
+                response = self.authorized_client.get(url)
+                self.assertEqual(
+                    response['Cache-Control'], 'private, no-cache'
+                )
+                self.assertNotEqual(response['ETag'], guest_etag)
+                response = self.authorized_client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag']
+                )
+                self.assertEqual(response.status_code, 304)
+
+    def test_follow_index(self):
+        """Проверяем, что пост автора из подписок меняет ETag ленты."""
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=self.user)
+        client = Client()
+        client.force_login(reader)
+        url = reverse('posts:follow_index')
+        etag = client.get(url)['ETag']
+        self.assertEqual(
+            client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        Post.objects.create(author=self.user, text='Свежий пост')
+        self.assertEqual(
+            client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200
+        )
+        etag = client.get(url)['ETag']
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Исправленный пост')
@@ -0,0 +1,102 @@
+import re
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Post, User
+
+CURSOR = re.compile(r'\?cursor=([\w-]+)')
+
+
+@override_settings(COMMENTS_PER_PAGE=3)
+class CommentsPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+        Comment.objects.bulk_create([
+            Comment(post=cls.post, author=cls.user, text=f'Комментарий {i}')
+            for i in range(8)
+        ])
+        cls.newest_first = list(
+            Comment.objects.filter(post=cls.post).order_by(
+                '-created', '-id'
+            ).values_list('pk', flat=True)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_post_detail_shows_first_page(self):
+        """Проверяем, что на странице поста только первая порция
+        комментариев и ссылка на следующую."""
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk,))
+        )
+        comments = response.context['comments']
+        self.assertEqual(
+            [comment.pk for comment in comments], self.newest_first[:3]
+        )
+        self.assertIn(comments[0], comments)
+        self.assertContains(
+            response, reverse('posts:post_comments', args=(self.post.pk,))
+        )
+
+    def test_post_detail_queries_do_not_grow(self):
+        """Проверяем, что число запросов не зависит от числа
+        комментариев: авторы выбираются тем же запросом."""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        with CaptureQueriesContext(connection) as before:
+            self.client.get(url)
+        Comment.objects.bulk_create([
+            Comment(post=self.post, author=User.objects.create_user(
+                username=f'user{i}'
+            ), text='Ещё комментарий')
+            for i in range(5)
+        ])
+        cache.clear()
+        with CaptureQueriesContext(connection) as after:
+            self.client.get(url)
+        self.assertEqual(len(after), len(before))
+
+    def test_load_more_fragments(self):
+        """Проверяем, что порции по курсору покрывают все комментарии
+        по одному разу, а у последней нет кнопки «Показать ещё»."""
+        url = reverse('posts:post_comments', args=(self.post.pk,))
+        seen = []
+        response = self.client.get(url)
+        while True:
+            self.assertTemplateUsed(
+                response, 'posts/includes/comments.html'
+            )
+            self.assertTemplateNotUsed(response, 'base.html')
+            seen += [comment.pk for comment in response.context['comments']]
+            match = CURSOR.search(response.content.decode())
+            if match is None:
+                break
+            response = self.client.get(url, {'cursor': match.group(1)})
+        self.assertEqual(seen, self.newest_first)
+
+    def test_load_more_json(self):
+        """Проверяем JSON-порции комментариев."""
+        data = self.client.get(
+            reverse('posts:api_post_detail', args=(self.post.pk,))
+        ).json()
+        seen = [comment['id'] for comment in data['comments']]
+        next_url = data['comments_next']
+        while next_url:
+            data = self.client.get(next_url).json()
+            seen += [comment['id'] for comment in data['results']]
+            next_url = data['next']
+        self.assertEqual(seen, self.newest_first)
+
+    def test_missing_post(self):
+        """Проверяем 404 для комментариев несуществующего поста."""
+        for name in ('posts:post_comments', 'posts:api_post_comments'):
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name, args=(0,)))
+                self.assertEqual(response.status_code, 404)
@@ -0,0 +1,122 @@
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import counters
+from posts.models import Follow, Group, Post, User
+
+
+class FeedCountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.follower = User.objects.create_user(username='follower')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.group_2 = Group.objects.create(
+            title='Тестовая группа_2',
+            slug='test-slug-2',
+            description='Тестовое описание_2',
+        )
+        Follow.objects.create(user=cls.follower, author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def feed_counts(self):
+        return {
+            counters.INDEX: counters.get_count(
+                counters.INDEX, Post.objects.all()
+            ),
+            counters.group_feed(self.group.pk): counters.get_count(
+                counters.group_feed(self.group.pk), self.group.posts.all()
+            ),
+            counters.author_feed(self.user.pk): counters.get_count(
+                counters.author_feed(self.user.pk), self.user.posts.all()
+            ),
+            counters.follow_feed(self.follower.pk): counters.get_count(
+                counters.follow_feed(self.follower.pk),
+                Post.objects.filter(author__following__user=self.follower)
+            ),
+        }
+
+    def test_counters_follow_post_create_and_delete(self):
+        """Проверяем, что счётчики лент меняются без запросов COUNT."""
+        self.assertEqual(set(self.feed_counts().values()), {0})
+        post = Post.objects.create(
+            author=self.user, text='Тестовый пост', group=self.group
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(set(self.feed_counts().values()), {1})
+        post.delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(set(self.feed_counts().values()), {0})
+
+    def test_group_change_moves_count(self):
+        """Проверяем перенос поста в другую группу."""
+        post = Post.objects.create(
+            author=self.user, text='Тестовый пост', group=self.group
+        )
+        group_2_feed = counters.group_feed(self.group_2.pk)
+        counters.get_count(group_2_feed, self.group_2.posts.all())
+        self.feed_counts()
+        post.group = self.group_2
+        post.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.feed_counts()[counters.group_feed(self.group.pk)], 0
+            )
+            self.assertEqual(
+                counters.get_count(group_2_feed, self.group_2.posts.all()), 1
+            )
+
+    def test_bulk_create_resets_counters(self):
+        """Проверяем, что массовая вставка сбрасывает счётчики."""
+        self.feed_counts()
+        Post.objects.bulk_create([
+            Post(author=self.user, text='Тестовый пост', group=self.group)
+            for _ in range(3)
+        ])
+        self.assertEqual(set(self.feed_counts().values()), {3})
+
+    def test_paginator_uses_cached_count(self):
+        """Проверяем, что повторный показ ленты не выполняет COUNT."""
+        Post.objects.bulk_create([
+            Post(author=self.user, text='Тестовый пост')
+            for _ in range(settings.POSTS_PER_PAGE + 1)
+        ])
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertEqual(response.context['page_obj'].paginator.num_pages, 2)
+        Post.objects.filter(author=self.user).update(text='Новый текст')
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                counters.get_count(counters.INDEX, Post.objects.all()),
+                settings.POSTS_PER_PAGE + 1
+            )
+
+    def test_celebrity_post_resets_follow_feeds_at_once(self):
+        """Проверяем, что пост знаменитости сбрасывает ленты подписок
+        одним инкрементом поколения, не трогая счётчик каждого
+        подписчика."""
+        self.feed_counts()
+        follow_feed = counters.follow_feed(self.follower.pk)
+        with override_settings(TIMELINE_CELEBRITY_FOLLOWERS=0):
+            with mock.patch.object(
+                counters, 'change', wraps=counters.change
+            ) as change:
+                post = Post.objects.create(author=self.user, text='Пост')
+                post.delete()
+        changed = {
+            feed for call in change.call_args_list for feed in call[0][0]
+        }
+        self.assertNotIn(follow_feed, changed)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.feed_counts()[follow_feed], 0)
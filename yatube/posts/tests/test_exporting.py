@@ -0,0 +1,132 @@
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.management import CommandError, call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import exporting
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.user,
+                text=f'Пост {i}, "с кавычками"\nи переносом',
+                group=cls.group if i % 2 else None,
+            )
+            for i in range(5)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.staff, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.staff, author=cls.user)
+
+    def setUp(self):
+        self.staff_client = Client()
+        self.staff_client.force_login(ExportTests.staff)
+
+    def read(self, data, file_format):
+        text = data.decode('utf-8')
+        if file_format == 'csv':
+            return list(csv.DictReader(io.StringIO(text)))
+        return [json.loads(line) for line in text.splitlines()]
+
+    def test_export_in_small_batches(self):
+        """Проверяем, что пачки по id выгружают все строки по порядку."""
+        for file_format in exporting.FORMATS:
+            with self.subTest(file_format=file_format):
+                records = self.read(
+                    b''.join(exporting.export(
+                        'posts', file_format, batch_size=2
+                    )),
+                    file_format,
+                )
+                self.assertEqual(
+                    [str(record['id']) for record in records],
+                    [str(post.pk) for post in self.posts],
+                )
+                self.assertEqual(records[0]['text'], self.posts[0].text)
+                self.assertEqual(records[0]['author'], 'auth')
+                self.assertEqual(records[1]['group'], 'test-slug')
+
+    def test_gzip(self):
+        """Проверяем сжатие выгрузки на лету."""
+        data = b''.join(exporting.export('follows', compress=True))
+        self.assertEqual(
+            self.read(gzip.decompress(data), 'jsonl'),
+            [{'id': Follow.objects.get().pk, 'user': 'staff',
+              'author': 'auth'}],
+        )
+
+    def test_export_command(self):
+        """Проверяем команду export_data."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'comments.csv.gz')
+        call_command(
+            'export_data', 'comments', '--format', 'csv', '--gzip',
+            '-o', path,
+        )
+        with gzip.open(path, 'rb') as stream:
+            records = self.read(stream.read(), 'csv')
+        self.assertEqual(records[0]['text'], 'Комментарий')
+        self.assertEqual(records[0]['post'], str(self.posts[0].pk))
+
+        output = io.StringIO()
+        call_command('export_data', 'follows', stdout=output)
+        self.assertEqual(
+            self.read(output.getvalue().encode(), 'jsonl'),
+            [{'id': Follow.objects.get().pk, 'user': 'staff',
+              'author': 'auth'}],
+        )
+        with self.assertRaises(CommandError):
+            call_command('export_data', 'follows', '--gzip', stdout=output)
+
+    def test_export_view(self):
+        """Проверяем потоковую выгрузку для сотрудников."""
+        url = reverse('posts:export_data', kwargs={'name': 'posts'})
+        response = self.staff_client.get(url, {'format': 'csv', 'gzip': '1'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(
+            response['Content-Disposition'],
+            'attachment; filename="posts.csv.gz"',
+        )
+        records = self.read(
+            gzip.decompress(b''.join(response.streaming_content)), 'csv'
+        )
+        self.assertEqual(len(records), len(self.posts))
+
+    def test_export_view_access(self):
+        """Проверяем, что выгрузка доступна только сотрудникам."""
+        url = reverse('posts:export_data', kwargs={'name': 'posts'})
+        user_client = Client()
+        user_client.force_login(self.user)
+        self.assertRedirects(
+            Client().get(url), reverse('users:login') + '?next=' + url
+        )
+        self.assertEqual(user_client.get(url).status_code, 403)
+        self.assertEqual(
+            self.staff_client.get(
+                reverse('posts:export_data', kwargs={'name': 'users'})
+            ).status_code,
+            404,
+        )
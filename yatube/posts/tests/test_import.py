@@ -0,0 +1,162 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from posts import search
+from posts.models import Follow, Group, Post, TimelineEntry, User, UserStats
+
+
+class ImportPostsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'a', encoding='utf-8') as stream:
+            stream.write(content)
+        return path
+
+    def write_jsonl(self, name, records):
+        return self.write(name, ''.join(
+            json.dumps(record, ensure_ascii=False) + '\n'
+            for record in records
+        ))
+
+    def import_posts(self, *args):
+        call_command('import_posts', *args, stdout=StringIO())
+
+    def test_import_jsonl(self):
+        """Проверяем импорт JSONL вместе с производными данными."""
+        path = self.write_jsonl('posts.jsonl', [
+            {'author': 'auth', 'text': 'Котики гуляли', 'group': 'test-slug',
+             'pub_date': '2020-01-02T03:04:05'},
+            {'author': 'auth', 'text': 'Собаки спали'},
+            {'author': 'nobody', 'text': 'Пост неизвестного автора'},
+            {'author': 'auth', 'text': 'Пост неизвестной группы',
+             'group': 'missing'},
+        ])
+        self.import_posts(path, '--batch-size', '3')
+
+        self.assertEqual(Post.objects.count(), 2)
+        post = Post.objects.get(text='Котики гуляли')
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(post.pub_date.year, 2020)
+        self.assertEqual(
+            set(TimelineEntry.objects.values_list('user', 'post')),
+            {(self.reader.pk, pk) for pk in Post.objects.values_list(
+                'pk', flat=True
+            )},
+        )
+        self.assertEqual(UserStats.objects.get(user=self.user).posts_count, 2)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(
+            list(search.search(Post.objects.all(), 'котик')[:10]), [post]
+        )
+
+    def test_invalid_pub_date_skipped(self):
+        """Проверяем, что запись с несуществующей датой пропускается,
+        а остальные импортируются."""
+        path = self.write_jsonl('posts.jsonl', [
+            {'author': 'auth', 'text': 'Плохая дата',
+             'pub_date': '2020-13-45T00:00:00'},
+            {'author': 'auth', 'text': 'Не строка', 'pub_date': 2020},
+            {'author': 'auth', 'text': 'Хорошая дата',
+             'pub_date': '2020-01-02T03:04:05'},
+        ])
+        output = StringIO()
+        call_command('import_posts', path, stdout=output)
+        self.assertEqual(
+            list(Post.objects.values_list('text', flat=True)),
+            ['Хорошая дата'],
+        )
+        self.assertIn('пропущено 2', output.getvalue())
+
+    def test_non_object_records_skipped(self):
+        """Проверяем, что строки JSONL, которые не объекты, пропускаются."""
+        path = self.write_jsonl('posts.jsonl', [
+            ['auth', 'Список'],
+            42,
+            {'author': 'auth', 'text': 'Объект'},
+        ])
+        output = StringIO()
+        call_command('import_posts', path, stdout=output)
+        self.assertEqual(
+            list(Post.objects.values_list('text', flat=True)), ['Объект']
+        )
+        self.assertIn('пропущено 2', output.getvalue())
+
+    def test_undated_records_not_updated(self):
+        """Проверяем, что даты постов без pub_date не перезаписываются
+        отдельным UPDATE."""
+        path = self.write_jsonl('posts.jsonl', [
+            {'author': 'auth', 'text': 'Без даты'},
+        ])
+        with mock.patch.object(
+            Post.objects, 'bulk_update', wraps=Post.objects.bulk_update
+        ) as bulk_update:
+            self.import_posts(path)
+        bulk_update.assert_not_called()
+        self.assertIsNotNone(Post.objects.get().pub_date)
+
+    def test_create_missing(self):
+        """Проверяем создание неизвестных авторов и групп."""
+        path = self.write_jsonl('posts.jsonl', [
+            {'author': 'newbie', 'text': 'Первый пост', 'group': 'new-slug'},
+        ])
+        self.import_posts(path, '--create-missing')
+        post = Post.objects.get()
+        self.assertEqual(post.author.username, 'newbie')
+        self.assertEqual(post.group.slug, 'new-slug')
+        self.assertFalse(post.author.has_usable_password())
+        self.assertEqual(post.author.stats.posts_count, 1)
+
+    def test_import_csv_resumes_from_checkpoint(self):
+        """Проверяем импорт CSV и продолжение с контрольной точки."""
+        path = self.write(
+            'posts.csv',
+            'author,text,group\n'
+            'auth,"Многострочный\nпост",test-slug\n'
+            'auth,Второй пост,\n'
+        )
+        checkpoint = os.path.join(self.directory, 'checkpoint.json')
+        self.import_posts(path, '--checkpoint', checkpoint)
+        self.assertEqual(
+            set(Post.objects.values_list('text', flat=True)),
+            {'Многострочный\nпост', 'Второй пост'},
+        )
+
+        self.write('posts.csv', 'auth,Третий пост,\n')
+        self.import_posts(path, '--checkpoint', checkpoint)
+        self.import_posts(path, '--checkpoint', checkpoint)
+        self.assertEqual(Post.objects.count(), 3)
+        with open(checkpoint, encoding='utf-8') as stream:
+            self.assertEqual(json.load(stream)['imported'], 3)
+
+    def test_checkpoint_of_other_file(self):
+        """Проверяем отказ продолжать импорт другого файла."""
+        checkpoint = os.path.join(self.directory, 'checkpoint.json')
+        first = self.write_jsonl('first.jsonl', [])
+        second = self.write_jsonl('second.jsonl', [])
+        self.import_posts(first, '--checkpoint', checkpoint)
+        with self.assertRaises(CommandError):
+            self.import_posts(second, '--checkpoint', checkpoint)
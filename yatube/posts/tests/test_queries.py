@@ -0,0 +1,119 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ViewQueryCountTests(TestCase):
+    """Число запросов страницы не зависит от числа постов на ней."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост',
+            group=cls.group,
+        )
+        cls.urls = {
+            'index': reverse('posts:index'),
+            'group_list': reverse(
+                'posts:group_list', kwargs={'slug': cls.group.slug}
+            ),
+            'profile': reverse(
+                'posts:profile', kwargs={'username': cls.user.username}
+            ),
+            'post_detail': reverse(
+                'posts:post_detail', kwargs={'post_id': cls.post.pk}
+            ),
+            'follow_index': reverse('posts:follow_index'),
+        }
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(ViewQueryCountTests.reader)
+
+    def fill_pages(self):
+        """Добавляет посты разных авторов и комментарии разных
+        пользователей, чтобы страницы были заполнены целиком."""
+        for i in range(settings.POSTS_PER_PAGE * 2):
+            author = User.objects.create_user(username=f'author_{i}')
+            Post.objects.create(
+                author=self.user if i % 2 else author,
+                text=f'Тестовый пост {i}',
+                group=Group.objects.create(
+                    title=f'Группа {i}', slug=f'group-{i}', description='-'
+                ) if i % 3 else self.group,
+            )
+            Comment.objects.create(
+                post=self.post, author=author, text=f'Комментарий {i}'
+            )
+
+    def assertQueriesPerView(self, client, expected):
+        for name, num in expected.items():
+            with self.subTest(name=name):
+                cache.clear()
+                with self.assertNumQueries(num):
+                    client.get(self.urls[name])
+
+    def test_guest_query_counts(self):
+        """Проверяем число запросов страниц для гостя."""
+        expected = {
+            'index': 2,
+            'group_list': 3,
+            'profile': 3,
+            'post_detail': 3,
+        }
+        self.assertQueriesPerView(self.guest_client, expected)
+        self.fill_pages()
+        self.assertQueriesPerView(self.guest_client, expected)
+
+    def test_authorized_query_counts(self):
+        """Проверяем число запросов страниц для авторизованного
+        пользователя."""
+        expected = {
+            'index': 4,
+            'group_list': 5,
+            'profile': 6,
+            'post_detail': 5,
+            # Ключи записей ленты по индексу, затем посты по id.
+            'follow_index': 7,
+        }
+        self.assertQueriesPerView(self.reader_client, expected)
+        self.fill_pages()
+        self.assertQueriesPerView(self.reader_client, expected)
+
+    def test_listings_do_not_load_post_text(self):
+        """Проверяем, что ленты не выбирают из базы полный текст постов
+        и его HTML, а страница поста выбирает."""
+        for name, client in (
+            ('index', self.guest_client),
+            ('group_list', self.guest_client),
+            ('profile', self.guest_client),
+            ('follow_index', self.reader_client),
+            ('post_detail', self.guest_client),
+        ):
+            with self.subTest(name=name):
+                cache.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    client.get(self.urls[name])
+                sql = ' '.join(query['sql'] for query in queries)
+                self.assertIn('"posts_post"."excerpt"', sql)
+                for column in ('text', 'text_html'):
+                    self.assertEqual(
+                        f'"posts_post"."{column}"' in sql,
+                        name == 'post_detail',
+                    )
@@ -0,0 +1,167 @@
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import timeline
+from posts.models import Comment, Follow, Group, Post, TimelineEntry, User
+from posts.utils import KeysetPaginator
+
+LISTED_TABLES = (
+    Post._meta.db_table,
+    Comment._meta.db_table,
+    Follow._meta.db_table,
+    'posts_timelineentry',
+)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN для SQLite')
+class QueryPlanTests(TestCase):
+    """Запросы лент не должны сканировать таблицы целиком
+    и сортировать результат во временном B-дереве."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.follower = User.objects.create_user(username='follower')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост',
+            group=cls.group,
+        )
+        Follow.objects.create(user=cls.follower, author=cls.user)
+
+    def explain(self, queryset):
+        return self.explain_sql(*queryset.query.sql_with_params())
+
+    def explain_sql(self, sql, params=()):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertIndexedPlan(self, queryset):
+        self.assertIndexedSteps(self.explain(queryset))
+
+    def assertIndexedSteps(self, plan):
+        for step in plan:
+            self.assertNotIn('TEMP B-TREE', step, plan)
+            for table in LISTED_TABLES:
+                self.assertNotEqual(step, f'SCAN {table}', plan)
+
+    def listings(self):
+        """Querysets, которые выполняют страницы лент."""
+        return {
+            'index': Post.objects.for_listing(),
+            'group_list': self.group.posts.for_listing(),
+            'profile': self.user.posts.for_listing(),
+            'follow_index': timeline.entries(self.follower),
+            'follow_index_posts': Post.objects.for_listing().filter(
+                pk__in=[self.post.pk]
+            ),
+            'post_detail_comments': Comment.objects.filter(
+                post=self.post
+            ).select_related('author'),
+            'profile_following': Follow.objects.filter(
+                user=self.follower, author=self.user
+            ),
+        }
+
+    def test_listing_pages_use_indexes(self):
+        """Проверяем планы запросов страниц лент."""
+        for name, queryset in self.listings().items():
+            with self.subTest(name=name):
+                self.assertIndexedPlan(queryset[:10])
+
+    def test_deep_offset_pages_use_indexes(self):
+        """Проверяем планы запросов глубоких страниц (OFFSET)."""
+        for name, queryset in self.listings().items():
+            with self.subTest(name=name):
+                self.assertIndexedPlan(queryset[5000:5010])
+
+    def test_keyset_pages_use_indexes(self):
+        """Проверяем планы запросов keyset-страниц."""
+        entry = TimelineEntry.objects.get(user=self.follower, post=self.post)
+        querysets = {
+            'index': (Post.objects.for_listing(), ('pub_date', 'id')),
+            'group_list': (
+                self.group.posts.for_listing(), ('pub_date', 'id')
+            ),
+            'profile': (self.user.posts.for_listing(), ('pub_date', 'id')),
+            'follow_index': (
+                timeline.entries(self.follower), timeline.ENTRY_KEYS
+            ),
+        }
+        for name, (queryset, keys) in querysets.items():
+            with self.subTest(name=name):
+                paginator = KeysetPaginator(queryset, 10, keys=keys)
+                values = [entry.pub_date, self.post.pk]
+                for forward in (True, False):
+                    self.assertIndexedPlan(
+                        queryset.filter(
+                            paginator._seek_filter(values, forward)
+                        ).order_by(*paginator._ordering(forward))[:11]
+                    )
+
+    def test_views_use_indexes(self):
+        """Проверяем планы всех запросов, которые выполняют первая
+        и вторая страницы лент в обоих режимах паджинации."""
+        Post.objects.bulk_create(
+            Post(author=self.user, group=self.group, text=f'Пост {number}')
+            for number in range(15)
+        )
+        timeline.rebuild(self.follower)
+        reader = Client()
+        reader.force_login(self.follower)
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.user.username,)),
+            reverse('posts:follow_index'),
+            reverse('posts:post_detail', args=(self.post.pk,)),
+        )
+        for keyset in (False, True):
+            for url in urls:
+                cache.clear()
+                with override_settings(
+                    POSTS_KEYSET_PAGINATION=keyset
+                ), CaptureQueriesContext(connection) as queries:
+                    page_obj = reader.get(url).context.get('page_obj')
+                    if page_obj is not None and page_obj.has_next():
+                        reader.get(url, (
+                            {'cursor': page_obj.next_cursor} if keyset
+                            else {'page': 2}
+                        ))
+                for query in queries:
+                    sql = query['sql']
+                    if not sql.startswith('SELECT') or not any(
+                        f'"{table}"' in sql for table in LISTED_TABLES
+                    ):
+                        continue
+                    with self.subTest(keyset=keyset, url=url, sql=sql):
+                        self.assertIndexedSteps(self.explain_sql(sql))
+
+    def test_comment_keyset_pages_use_indexes(self):
+        """Проверяем планы запросов порций комментариев."""
+        comment = Comment.objects.create(
+            post=self.post, author=self.user, text='Комментарий'
+        )
+        queryset = Comment.objects.filter(post=self.post).select_related(
+            'author'
+        )
+        paginator = KeysetPaginator(queryset, 20, keys=('created', 'id'))
+        for forward in (True, False):
+            with self.subTest(forward=forward):
+                self.assertIndexedPlan(
+                    queryset.filter(paginator._seek_filter(
+                        [comment.created, comment.pk], forward
+                    )).order_by(*paginator._ordering(forward))[:21]
+                )
@@ -0,0 +1,104 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Post, User
+from posts.rendering import EXCERPT_LENGTH
+
+TEXT = 'Первая <b>строка</b>\nвторая   строка'
+LONG_TEXT = 'слово ' * 1000
+
+
+class PostRenderingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text=TEXT)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        self.post = Post.objects.get(pk=self.post.pk)
+
+    def test_rendered_on_save(self):
+        """Проверяем HTML и выдержку, посчитанные при сохранении."""
+        self.assertEqual(
+            self.post.text_html,
+            'Первая &lt;b&gt;строка&lt;/b&gt;<br>вторая   строка',
+        )
+        self.assertEqual(
+            self.post.excerpt, 'Первая <b>строка</b> вторая строка'
+        )
+        long_post = Post.objects.create(author=self.user, text=LONG_TEXT)
+        self.assertEqual(len(long_post.excerpt), EXCERPT_LENGTH)
+        self.assertTrue(long_post.excerpt.endswith('…'))
+
+    def test_rendered_on_edit_and_bulk_create(self):
+        """Проверяем пересчёт при правке через форму и при bulk_create."""
+        self.client.post(
+            reverse('posts:post_edit', args=(self.post.pk,)),
+            {'text': 'Новый\nтекст'},
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.text_html, 'Новый<br>текст')
+        self.assertEqual(self.post.excerpt, 'Новый текст')
+        post, = Post.objects.bulk_create(
+            [Post(author=self.user, text='a\nb')]
+        )
+        self.assertEqual(post.text_html, 'a<br>b')
+        self.assertEqual(
+            Post.objects.filter(text_html='a<br>b', excerpt='a b').count(), 1
+        )
+
+    def test_templates_use_stored_html(self):
+        """Проверяем, что лента показывает выдержку, а страница поста —
+        сохранённый HTML."""
+        long_post = Post.objects.create(author=self.user, text=LONG_TEXT)
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, long_post.excerpt)
+        self.assertNotContains(response, LONG_TEXT.strip())
+        self.assertContains(response, 'читать дальше', count=1)
+        self.assertTrue(long_post.excerpt_truncated)
+        self.assertFalse(self.post.excerpt_truncated)
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk,))
+        )
+        self.assertContains(response, self.post.text_html, html=False)
+
+    def test_short_text_with_ellipsis_not_truncated(self):
+        """Проверяем, что короткий текст с многоточием в конце не
+        считается обрезанным, а длинный — считается и после bulk_create
+        и render_posts."""
+        short_post = Post.objects.create(author=self.user, text='Ну что ж…')
+        self.assertFalse(short_post.excerpt_truncated)
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'читать дальше')
+        long_post, = Post.objects.bulk_create(
+            [Post(author=self.user, text=LONG_TEXT)]
+        )
+        self.assertTrue(long_post.excerpt_truncated)
+        Post.objects.update(excerpt_truncated=False)
+        call_command('render_posts', stdout=StringIO())
+        self.assertEqual(
+            list(Post.objects.filter(excerpt_truncated=True).values_list(
+                'text', flat=True
+            )),
+            [LONG_TEXT],
+        )
+
+    def test_render_posts_command(self):
+        """Проверяем, что команда заполняет устаревшие поля и не трогает
+        актуальные."""
+        Post.objects.filter(pk=self.post.pk).update(text_html='', excerpt='')
+        output = StringIO()
+        call_command('render_posts', batch_size=1, stdout=output)
+        self.assertIn('Обновлено постов: 1', output.getvalue())
+        self.post.refresh_from_db()
+        self.assertIn('<br>', self.post.text_html)
+        output = StringIO()
+        call_command('render_posts', stdout=output)
+        self.assertIn('Обновлено постов: 0', output.getvalue())
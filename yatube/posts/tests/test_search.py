@@ -0,0 +1,98 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, SimpleTestCase, TestCase
+from django.urls import reverse
+
+from posts import search
+from posts.admin import PostAdmin
+from posts.models import Post
+
+User = get_user_model()
+
+
+class StemTests(SimpleTestCase):
+    def test_word_forms_share_stem(self):
+        """Проверяем, что формы слова сводятся к одной основе."""
+        groups = (
+            ('котики', 'котиков', 'котиками', 'котик'),
+            ('красивая', 'красивые', 'красивого'),
+            ('гулял', 'гуляли', 'гулять'),
+        )
+        for words in groups:
+            with self.subTest(words=words):
+                self.assertEqual(len({search.stem(word) for word in words}), 1)
+
+    def test_terms(self):
+        """Проверяем разбиение текста на слова."""
+        self.assertEqual(
+            search.terms('Ёжики и Django!'), ['ежик', 'и', 'django']
+        )
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.cats = Post.objects.create(
+            author=cls.user, text='Котики гуляли по крыше'
+        )
+        cls.dogs = Post.objects.create(
+            author=cls.user, text='Собаки охраняют дом'
+        )
+        cls.many_cats = Post.objects.create(
+            author=cls.user, text='Котик, котики и ещё котиков много'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def found(self, query):
+        response = self.client.get(
+            reverse('posts:post_search'), {'q': query}
+        )
+        return list(response.context['page_obj'])
+
+    def test_search_finds_word_forms_ranked(self):
+        """Проверяем поиск по формам слова и ранжирование."""
+        self.assertEqual(
+            self.found('котиками'), [self.many_cats, self.cats]
+        )
+
+    def test_search_requires_all_words(self):
+        """Проверяем, что находятся посты со всеми словами запроса."""
+        self.assertEqual(self.found('котики крыша'), [self.cats])
+        self.assertEqual(self.found('слоны'), [])
+
+    def test_index_follows_changes(self):
+        """Проверяем обновление индекса при изменении и удалении поста."""
+        post = Post.objects.get(pk=self.dogs.pk)
+        post.text = 'Котики охраняют дом'
+        post.save()
+        self.assertIn(post, self.found('кот'))
+        self.assertEqual(self.found('собака'), [])
+        post.delete()
+        self.assertNotIn(self.dogs, self.found('кот'))
+
+    def test_empty_query(self):
+        """Проверяем страницу поиска без запроса."""
+        response = self.client.get(reverse('posts:post_search'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.context['page_obj'])
+
+    def test_admin_search(self):
+        """Проверяем поиск постов в админке."""
+        admin = PostAdmin(Post, None)
+        queryset, use_distinct = admin.get_search_results(
+            None, Post.objects.all(), 'собаки'
+        )
+        self.assertEqual(list(queryset), [self.dogs])
+        self.assertFalse(use_distinct)
+
+    def test_rebuild_index(self):
+        """Проверяем перестроение индекса."""
+        if not search.fts_available():
+            self.skipTest('SQLite без FTS5')
+        self.assertEqual(search.rebuild_index(Post.objects.all()), 3)
+        self.assertEqual(self.found('собака'), [self.dogs])
@@ -0,0 +1,130 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import stats
+from posts.models import Comment, Follow, Group, Post, User, UserStats
+
+
+class StatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(StatsTests.user)
+        self.reader_client = Client()
+        self.reader_client.force_login(StatsTests.reader)
+
+    def user_stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_post_counters(self):
+        """Проверяем счётчики постов автора и группы."""
+        self.client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Тестовый пост', 'group': self.group.pk},
+        )
+        post = Post.objects.get()
+        self.assertEqual(self.user_stats(self.user).posts_count, 1)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+
+        self.client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.pk}),
+            data={'text': 'Тестовый пост', 'group': self.other_group.pk},
+        )
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.other_group.posts_count, 1)
+
+        Post.objects.filter(pk=post.pk).delete()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.user_stats(self.user).posts_count, 0)
+        self.assertEqual(self.other_group.posts_count, 0)
+
+    def test_comment_counter(self):
+        """Проверяем счётчик комментариев поста."""
+        post = Post.objects.create(author=self.user, text='Тестовый пост')
+        self.reader_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': post.pk}),
+            data={'text': 'Комментарий'},
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        Comment.objects.get().delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+    def test_follow_counters(self):
+        """Проверяем счётчики подписчиков и подписок."""
+        url = reverse('posts:profile_follow', kwargs={'username': 'auth'})
+        self.reader_client.get(url)
+        self.reader_client.get(url)
+        self.assertEqual(self.user_stats(self.user).followers_count, 1)
+        self.assertEqual(self.user_stats(self.reader).following_count, 1)
+        self.reader_client.get(
+            reverse('posts:profile_unfollow', kwargs={'username': 'auth'})
+        )
+        self.assertEqual(self.user_stats(self.user).followers_count, 0)
+        self.assertEqual(self.user_stats(self.reader).following_count, 0)
+
+    def test_missing_stats_are_created(self):
+        """Проверяем создание строки счётчиков, если её нет."""
+        UserStats.objects.filter(user=self.user).delete()
+        Post.objects.create(author=self.user, text='Тестовый пост')
+        Follow.objects.create(user=self.reader, author=self.user)
+        user_stats = self.user_stats(self.user)
+        self.assertEqual(user_stats.posts_count, 1)
+        self.assertEqual(user_stats.followers_count, 1)
+
+    def test_reconcile(self):
+        """Проверяем исправление разошедшихся счётчиков."""
+        post = Post.objects.create(
+            author=self.user, text='Тестовый пост', group=self.group
+        )
+        Comment.objects.create(post=post, author=self.reader, text='-')
+        Follow.objects.create(user=self.reader, author=self.user)
+        Post.objects.filter(pk=post.pk).update(comments_count=7)
+        Group.objects.update(posts_count=0)
+        UserStats.objects.filter(user=self.reader).delete()
+        UserStats.objects.filter(user=self.user).update(
+            posts_count=3, followers_count=0
+        )
+
+        repaired = stats.reconcile()
+
+        self.assertEqual(repaired['Post.comments_count'], 1)
+        self.assertEqual(repaired['Group.posts_count'], 1)
+        self.assertEqual(repaired['UserStats.posts_count'], 1)
+        self.assertEqual(repaired['UserStats.following_count'], 1)
+        post.refresh_from_db()
+        self.group.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(self.user_stats(self.user).posts_count, 1)
+        self.assertEqual(self.user_stats(self.user).followers_count, 1)
+        self.assertEqual(self.user_stats(self.reader).following_count, 1)
+        self.assertEqual(stats.reconcile(), dict.fromkeys(repaired, 0))
+
+    def test_reconcile_command(self):
+        """Проверяем команду reconcile_counters."""
+        UserStats.objects.update(posts_count=5)
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertEqual(self.user_stats(self.user).posts_count, 0)
@@ -0,0 +1,127 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import thumbnails
+from posts.models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+GEOMETRY, OPTIONS = settings.POST_THUMBNAILS[0]
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x01\x00'
+            b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+            b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+            b'\x00\x00\x01\x00\x01\x00\x00\x02'
+            b'\x02\x4c\x01\x00\x3b'
+        )
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.post = Post.objects.create(
+            author=ThumbnailTests.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                name='small.gif',
+                content=ThumbnailTests.small_gif,
+                content_type='image/gif'
+            ),
+        )
+
+    def test_generate_creates_thumbnails(self):
+        """Проверяем, что фоновая задача создаёт миниатюру
+        и обновляет версию поста."""
+        self.assertIsNone(
+            thumbnails.lookup(self.post.image, GEOMETRY, **OPTIONS)
+        )
+        thumbnails.generate(self.post.pk)
+        self.assertIsNotNone(
+            thumbnails.lookup(self.post.image, GEOMETRY, **OPTIONS)
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.version, 2)
+
+    def test_generate_stores_thumbnail_names(self):
+        """Проверяем, что имена миниатюр записываются в пост,
+        а смена картинки их сбрасывает."""
+        thumbnails.generate(self.post.pk)
+        self.post.refresh_from_db()
+        thumbnail = thumbnails.lookup(self.post.image, GEOMETRY, **OPTIONS)
+        self.assertEqual(
+            self.post.thumbnail_names, {GEOMETRY: thumbnail.name}
+        )
+        self.post.image = SimpleUploadedFile(
+            name='other.gif',
+            content=ThumbnailTests.small_gif,
+            content_type='image/gif'
+        )
+        self.post.save()
+        self.assertEqual(self.post.thumbnail_names, {})
+
+    def test_listing_skips_thumbnail_store(self):
+        """Проверяем, что лента не обращается к хранилищу sorl,
+        если имена миниатюр записаны в постах."""
+        thumbnails.generate(self.post.pk)
+        with mock.patch('posts.thumbnails.lookup') as lookup:
+            response = self.guest_client.get(reverse('posts:index'))
+        lookup.assert_not_called()
+        self.assertContains(
+            response, self.post.image.storage.url(
+                Post.objects.get(pk=self.post.pk).thumbnail_names[GEOMETRY]
+            )
+        )
+
+    def test_page_does_not_process_images(self):
+        """Проверяем, что страница не создаёт миниатюру сама,
+        а показывает исходную картинку и ставит задачу в очередь."""
+        with mock.patch('posts.thumbnails.get_thumbnail') as get_thumbnail, \
+                mock.patch('posts.thumbnails.schedule') as schedule:
+            response = self.guest_client.get(
+                reverse('posts:post_detail', args=(self.post.pk,))
+            )
+        get_thumbnail.assert_not_called()
+        schedule.assert_called_with(self.post.pk)
+        self.assertContains(response, self.post.image.url)
+
+    def test_page_uses_ready_thumbnail(self):
+        """Проверяем, что готовая миниатюра попадает на страницу."""
+        thumbnails.generate(self.post.pk)
+        thumbnail = thumbnails.lookup(self.post.image, GEOMETRY, **OPTIONS)
+        response = self.guest_client.get(
+            reverse('posts:post_detail', args=(self.post.pk,))
+        )
+        self.assertContains(response, thumbnail.url)
+
+    def test_command_generates_missing_thumbnails(self):
+        """Проверяем команду создания недостающих миниатюр."""
+        out = StringIO()
+        call_command('generate_thumbnails', stdout=out)
+        self.assertIn('1', out.getvalue())
+        self.assertIsNotNone(
+            thumbnails.lookup(self.post.image, GEOMETRY, **OPTIONS)
+        )
+        out = StringIO()
+        call_command('generate_thumbnails', stdout=out)
+        self.assertIn('0', out.getvalue())
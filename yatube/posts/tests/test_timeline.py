@@ -0,0 +1,114 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import timeline
+from posts.models import Follow, Post, TimelineEntry, User
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.follower = User.objects.create_user(username='follower')
+        cls.old_post = Post.objects.create(
+            author=cls.author,
+            text='Пост до подписки',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.follower_client = Client()
+        self.follower_client.force_login(TimelineTests.follower)
+
+    def test_follow_and_unfollow_update_timeline(self):
+        """Проверяем, что подписка добавляет посты автора в ленту,
+        а отписка убирает их."""
+        self.follower_client.get(
+            reverse('posts:profile_follow', args=(self.author.username,))
+        )
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user=self.follower, post=self.old_post
+            ).exists()
+        )
+        self.follower_client.get(
+            reverse('posts:profile_unfollow', args=(self.author.username,))
+        )
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.follower).exists()
+        )
+
+    def test_new_post_fanned_out_to_followers(self):
+        """Проверяем, что новый пост попадает в ленты подписчиков."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        author_client = Client()
+        author_client.force_login(self.author)
+        author_client.post(
+            reverse('posts:post_create'), {'text': 'Новый пост'}
+        )
+        response = self.follower_client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            [post.text for post in response.context['page_obj']],
+            ['Новый пост', self.old_post.text]
+        )
+
+    @override_settings(TIMELINE_CELEBRITY_FOLLOWERS=0)
+    def test_celebrity_posts_merged_on_read(self):
+        """Проверяем, что посты популярных авторов не раскладываются
+        по лентам, но видны в ленте подписок."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        post = Post.objects.create(author=self.author, text='Для всех')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(
+            list(timeline.feed(self.follower)),
+            [post, self.old_post]
+        )
+
+    def test_pages_with_equal_dates(self):
+        """Проверяем, что страницы ленты с одинаковыми датами постов не
+        повторяют и не теряют посты ни по курсорам, ни по номерам."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Пост {number}')
+            for number in range(25)
+        )
+        timeline.rebuild(self.follower)
+        date = self.old_post.pub_date
+        Post.objects.update(pub_date=date)
+        TimelineEntry.objects.update(pub_date=date)
+        expected = list(
+            Post.objects.order_by('-id').values_list('id', flat=True)
+        )
+        url = reverse('posts:follow_index')
+        with override_settings(POSTS_KEYSET_PAGINATION=True):
+            seen, cursor = [], ''
+            while cursor is not None:
+                page_obj = self.follower_client.get(
+                    url, {'cursor': cursor}
+                ).context['page_obj']
+                seen += [post.pk for post in page_obj]
+                cursor = page_obj.next_cursor
+        self.assertEqual(seen, expected)
+        seen = []
+        for number in (1, 2, 3):
+            page_obj = self.follower_client.get(
+                url, {'page': number}
+            ).context['page_obj']
+            seen += [post.pk for post in page_obj]
+        self.assertEqual(seen, expected)
+
+    def test_backfill_command_rebuilds_timeline(self):
+        """Проверяем, что команда восстанавливает ленту подписок."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        new_post = Post.objects.create(author=self.author, text='Новый пост')
+        TimelineEntry.objects.all().delete()
+        call_command('backfill_timeline', stdout=StringIO())
+        self.assertEqual(
+            list(timeline.feed(self.follower)),
+            [new_post, self.old_post]
+        )
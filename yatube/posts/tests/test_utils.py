@@ -0,0 +1,133 @@
+import base64
+import json
+
+from django.conf import settings
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Group, Post, User
+from posts.utils import KeysetPaginator
+
+
+class KeysetPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.NUM_POSTS = 25
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create([
+            Post(
+                author=cls.user,
+                text=f'Тестовый пост {i}',
+                group=cls.group,
+            ) for i in range(cls.NUM_POSTS)
+        ])
+        # Половина постов с одинаковой датой: порядок решает id.
+        Post.objects.filter(
+            pk__in=Post.objects.values_list('pk', flat=True)[:12]
+        ).update(pub_date=timezone.now())
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.expected = list(Post.objects.order_by('-pub_date', '-id'))
+
+    def walk_forward(self, paginator):
+        page = paginator.get_page(None)
+        pages = [page]
+        while page.has_next():
+            page = paginator.get_page(page.next_cursor)
+            pages.append(page)
+        return pages
+
+    def test_keyset_pages_cover_all_posts_in_order(self):
+        """Проверяем, что курсоры проходят все посты без пропусков
+        и повторов."""
+        paginator = KeysetPaginator(Post.objects.all(), 10)
+        pages = self.walk_forward(paginator)
+        self.assertEqual(
+            [post for page in pages for post in page],
+            self.expected
+        )
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertFalse(pages[0].has_previous())
+
+    def test_keyset_previous_cursor_returns_previous_page(self):
+        """Проверяем переход назад по курсору."""
+        paginator = KeysetPaginator(Post.objects.all(), 10)
+        pages = self.walk_forward(paginator)
+        for number in range(len(pages) - 1, 0, -1):
+            with self.subTest(number=number):
+                page = paginator.get_page(pages[number].previous_cursor)
+                self.assertEqual(list(page), list(pages[number - 1]))
+
+    def test_keyset_invalid_cursor_returns_first_page(self):
+        """Проверяем, что испорченный курсор ведёт на первую страницу."""
+        paginator = KeysetPaginator(Post.objects.all(), 10)
+        for cursor in ('garbage', 'WyJ4IiwxXQ', '%%%'):
+            with self.subTest(cursor=cursor):
+                page = paginator.get_page(cursor)
+                self.assertEqual(list(page), self.expected[:10])
+
+    def test_keyset_tampered_cursor_values(self):
+        """Проверяем, что курсор с подменёнными значениями ключей ведёт
+        на первую страницу, а не к ошибке сервера."""
+        paginator = KeysetPaginator(Post.objects.all(), 10)
+        date = self.expected[5].pub_date.isoformat()
+        for values in (
+            ['n', date, 'abc'],
+            ['n', 'notadate', 1],
+            ['n', None, 1],
+            ['p', date, [1]],
+            ['n', date, 10 ** 30],
+            ['n', date, -10 ** 30],
+        ):
+            cursor = base64.urlsafe_b64encode(
+                json.dumps(values).encode()
+            ).decode().rstrip('=')
+            with self.subTest(values=values):
+                page = paginator.get_page(cursor)
+                self.assertEqual(list(page), self.expected[:10])
+            for url in (
+                reverse('posts:api_index'),
+                reverse('posts:post_comments', args=(self.expected[0].pk,)),
+                reverse(
+                    'posts:api_post_comments', args=(self.expected[0].pk,)
+                ),
+            ):
+                with self.subTest(values=values, url=url):
+                    response = self.guest_client.get(url, {'cursor': cursor})
+                    self.assertEqual(response.status_code, 200)
+
+    @override_settings(POSTS_KEYSET_PAGINATION=True)
+    def test_index_keyset_navigation(self):
+        """Проверяем навигацию по главной странице в keyset-режиме."""
+        response = self.guest_client.get(reverse('posts:index'))
+        page_obj = response.context['page_obj']
+        self.assertTrue(page_obj.is_keyset)
+        self.assertEqual(len(page_obj), settings.POSTS_PER_PAGE)
+        self.assertContains(response, f'?cursor={page_obj.next_cursor}')
+        response = self.guest_client.get(
+            reverse('posts:index'), {'cursor': page_obj.next_cursor}
+        )
+        self.assertEqual(
+            list(response.context['page_obj']),
+            self.expected[settings.POSTS_PER_PAGE:settings.POSTS_PER_PAGE * 2]
+        )
+
+    @override_settings(POSTS_KEYSET_PAGINATION=True)
+    def test_page_number_still_supported_in_keyset_mode(self):
+        """Проверяем, что ссылки ?page=N продолжают работать."""
+        response = self.guest_client.get(
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            {'page': 3}
+        )
+        self.assertEqual(
+            len(response.context['page_obj']),
+            self.NUM_POSTS - settings.POSTS_PER_PAGE * 2
+        )
@@ -0,0 +1,134 @@
+"""Фоновая подготовка миниатюр картинок постов.
+
+``{% thumbnail %}`` создаёт миниатюру при первом показе, и первый
+посетитель ждёт, пока Pillow декодирует и масштабирует картинку. Здесь
+миниатюры всех размеров из ``POST_THUMBNAILS`` создаются пулом потоков
+сразу после сохранения поста, а шаблоны только ищут готовую миниатюру.
+"""
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from . import caching
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.POST_THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+        return _executor
+
+
+def thumbnail_name(file_, geometry, options):
+    """Имя файла миниатюры, под которым её сохраняет sorl-thumbnail."""
+    backend = default.backend
+    source = ImageFile(file_)
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    return backend._get_thumbnail_filename(source, geometry, options)
+
+
+def post_thumbnail(post, geometry, **options):
+    """Миниатюра картинки поста без обращения к хранилищу sorl.
+
+    Имена готовых миниатюр записываются в ``Post.thumbnails`` при их
+    создании, так что страница из десяти постов не делает десяти запросов
+    к key-value хранилищу. Для постов без записанных имён (созданных до
+    появления поля) миниатюра ищется в хранилище.
+    """
+    name = post.thumbnail_names.get(geometry)
+    if name:
+        return ImageFile(name, default.storage)
+    return lookup(post.image, geometry, **options)
+
+
+def lookup(file_, geometry, **options):
+    """Готовая миниатюра или None, если она ещё не создана.
+
+    В отличие от ``get_thumbnail`` никогда не обрабатывает картинку.
+    """
+    if not file_:
+        return None
+    thumbnail = ImageFile(
+        thumbnail_name(file_, geometry, options), default.storage
+    )
+    return default.kvstore.get(thumbnail)
+
+
+def generate(post_id):
+    """Создаёт все миниатюры поста и сбрасывает кэш его страниц."""
+    post = Post.objects.select_related('author', 'group').filter(
+        pk=post_id
+    ).first()
+    if post is None or not post.image:
+        return
+    names = {
+        geometry: get_thumbnail(post.image, geometry, **options).name
+        for geometry, options in settings.POST_THUMBNAILS
+    }
+    Post.objects.filter(pk=post.pk, image=post.image.name).update(
+        thumbnails=json.dumps(names),
+        version=F('version') + 1,
+    )
+    caching.forget_post_card(
+        post.pk, post.version, post.author_id, post.group_id
+    )
+    tags = [
+        caching.INDEX_TAG,
+        caching.post_tag(post.pk),
+        caching.author_tag(post.author.username),
+    ]
+    if post.group is not None:
+        tags.append(caching.group_tag(post.group.slug))
+    caching.purge(tags)
+
+
+def _run(post_id):
+    try:
+        generate(post_id)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры поста %s', post_id)
+    finally:
+        with _lock:
+            _pending.discard(post_id)
+        connections.close_all()
+
+
+def _submit(post_id):
+    with _lock:
+        if post_id in _pending:
+            return
+        _pending.add(post_id)
+    _get_executor().submit(_run, post_id)
+
+
+def schedule(post_id):
+    """Ставит создание миниатюр в очередь после фиксации транзакции."""
+    transaction.on_commit(lambda: _submit(post_id))
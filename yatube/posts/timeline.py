@@ -0,0 +1,199 @@
+"""Лента подписок с разветвлением при записи (fan-out on write).
+
+Новый пост сразу раскладывается по лентам подписчиков автора в таблицу
+``TimelineEntry``. Страница ленты (``page``) выбирается из этой таблицы
+по ключу ``(pub_date, post_id)`` одним проходом по индексу
+``(user, pub_date, post)`` без сортировки, а сами посты догружаются по id.
+Посты авторов с очень большим числом подписчиков не раскладываются:
+такие авторы подмешиваются в ленту при чтении, и тогда страница
+выбирается из постов с сортировкой.
+"""
+import hashlib
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Q
+
+from . import caching, counters
+from .models import Follow, Post, TimelineEntry
+from .utils import pag
+
+CELEBRITIES_KEY = 'posts:timeline:celebrities'
+
+# Ключ страниц ленты: уникален в пределах ленты одного пользователя.
+ENTRY_KEYS = ('pub_date', 'post_id')
+
+
+def celebrity_ids():
+    """Авторы, посты которых не раскладываются по лентам."""
+    ids = cache.get(CELEBRITIES_KEY)
+    if ids is None:
+        ids = set(
+            Follow.objects.values('author').annotate(
+                followers=Count('id')
+            ).filter(
+                followers__gt=settings.TIMELINE_CELEBRITY_FOLLOWERS
+            ).values_list('author', flat=True)
+        )
+        cache.set(
+            CELEBRITIES_KEY, ids, settings.TIMELINE_CELEBRITIES_CACHE_TTL
+        )
+    return ids
+
+
+def followed_celebrities(user):
+    ids = celebrity_ids()
+    if not ids:
+        return []
+    return list(
+        Follow.objects.filter(user=user, author_id__in=ids).values_list(
+            'author_id', flat=True
+        )
+    )
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора.
+
+    Возвращает id подписчиков или None, если автор — знаменитость
+    и пост в их ленты не раскладывался.
+    """
+    limit = settings.TIMELINE_CELEBRITY_FOLLOWERS
+    followers = list(
+        Follow.objects.filter(author_id=post.author_id).values_list(
+            'user_id', flat=True
+        )[:limit + 1]
+    )
+    if len(followers) > limit:
+        cache.delete(CELEBRITIES_KEY)
+        return None
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in followers
+        ],
+        ignore_conflicts=True,
+    )
+    return followers
+
+
+def fan_out_many(posts):
+    """Раскладывает пачку новых постов (например, импортированных)
+    по лентам подписчиков их авторов."""
+    celebrities = celebrity_ids()
+    followers = {}
+    for author_id, user_id in Follow.objects.filter(
+        author_id__in={post.author_id for post in posts}
+    ).exclude(author_id__in=celebrities).values_list('author_id', 'user_id'):
+        followers.setdefault(author_id, []).append(user_id)
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for post in posts
+            for user_id in followers.get(post.author_id, ())
+        ],
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def add_author(user_id, author_id, limit=None):
+    """Добавляет в ленту подписчика последние посты автора."""
+    if author_id in celebrity_ids():
+        return
+    if limit is None:
+        limit = settings.TIMELINE_FOLLOW_BACKFILL
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date'
+    ).values_list('id', 'pub_date')
+    if limit:
+        posts = posts[:limit]
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+            for post_id, pub_date in posts
+        ],
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def remove_author(user_id, author_id):
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def rebuild(user, limit=None):
+    """Пересобирает ленту пользователя по его текущим подпискам."""
+    TimelineEntry.objects.filter(user=user).delete()
+    for author_id in Follow.objects.filter(user=user).values_list(
+        'author_id', flat=True
+    ):
+        add_author(user.pk, author_id, limit)
+
+
+def freshness(user):
+    """Значения для ETag ленты подписок.
+
+    Любой новый, изменённый или удалённый пост сбрасывает тег страниц
+    своего автора, а подписка и отписка — ещё и тег самого подписчика.
+    Поэтому лента не менялась, пока не менялись отметки тегов её
+    читателя и всех авторов, на которых он подписан. Самая поздняя из
+    отметок идёт в Last-Modified.
+    """
+    usernames = [user.username] + list(
+        Follow.objects.filter(user=user).values_list(
+            'author__username', flat=True
+        )
+    )
+    stamps = caching.tag_stamps(
+        [caching.author_tag(username) for username in usernames]
+    )
+    return [
+        datetime.fromtimestamp(max(stamps.values()), timezone.utc),
+        hashlib.md5(repr(sorted(stamps.items())).encode()).hexdigest(),
+    ]
+
+
+def entries(user):
+    """Ключи записей ленты подписок пользователя, от новых к старым."""
+    return TimelineEntry.objects.filter(user=user).order_by(
+        *(f'-{key}' for key in ENTRY_KEYS)
+    ).values(*ENTRY_KEYS)
+
+
+def feed(user, posts=None):
+    """Посты ленты подписок пользователя из ``posts`` (по умолчанию
+    все посты), от новых к старым."""
+    if posts is None:
+        posts = Post.objects.all()
+    celebrities = followed_celebrities(user)
+    if celebrities:
+        return posts.filter(
+            Q(timeline_entries__user=user) | Q(author_id__in=celebrities)
+        ).distinct().order_by('-pub_date', '-id')
+    # F(): иначе сортировка по внешнему ключу развернулась бы
+    # в сортировку Post.Meta.ordering.
+    return posts.filter(timeline_entries__user=user).order_by(
+        F('timeline_entries__pub_date').desc(),
+        F('timeline_entries__post_id').desc(),
+    )
+
+
+def page(request, user, posts):
+    """Страница ленты подписок пользователя для запроса: постами из
+    ``posts`` (queryset объектов или ``values()``), как у ``pag``."""
+    feed_name = counters.follow_feed(user.pk)
+    if followed_celebrities(user):
+        return pag(request, feed(user, posts), feed=feed_name)
+    page_obj = pag(request, entries(user), keys=ENTRY_KEYS, feed=feed_name)
+    ids = [entry['post_id'] for entry in page_obj.object_list]
+    by_id = {
+        post['id'] if isinstance(post, dict) else post.pk: post
+        for post in posts.filter(pk__in=ids).order_by()
+    }
+    # Пост мог быть удалён между двумя запросами.
+    page_obj.object_list = [by_id[pk] for pk in ids if pk in by_id]
+    return page_obj
@@ -1,8 +1,205 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
 from django.conf import settings
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from . import counters
+
+FORWARD = 'n'
+BACKWARD = 'p'
+
+# Целые в курсоре должны помещаться в INTEGER базы (64 бита со знаком).
+MIN_INTEGER = -2 ** 63
+MAX_INTEGER = 2 ** 63 - 1
+
+
+class KeysetPage(Page):
+    """Страница keyset-паджинатора.
+
+    Вместо номера страницы хранит непрозрачные курсоры на соседние
+    страницы, поэтому не требует ни COUNT(*), ни OFFSET.
+    """
+    is_keyset = True
+
+    def __init__(self, object_list, paginator, next_cursor, previous_cursor):
+        super().__init__(object_list, 1, paginator)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<Keyset page>'
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class KeysetPaginator(Paginator):
+    """Паджинатор по ключу (seek-метод).
+
+    Страница выбирается условием ``(pub_date, id) < (курсор)`` по индексу,
+    поэтому время выборки не зависит от глубины страницы.
+    """
+
+    def __init__(self, object_list, per_page, keys=('pub_date', 'id'),
+                 descending=True):
+        super().__init__(object_list, per_page)
+        self.keys = keys
+        self.descending = descending
+
+    def encode_cursor(self, direction, obj):
+        values = [
+            value.isoformat() if isinstance(value, datetime) else value
+            for value in self._key_values(obj)
+        ]
+        raw = json.dumps([direction] + values, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
 
+    def decode_cursor(self, cursor):
+        padded = cursor + '=' * (-len(cursor) % 4)
+        direction, *values = json.loads(base64.urlsafe_b64decode(padded))
+        if direction not in (FORWARD, BACKWARD):
+            raise ValueError(direction)
+        if len(values) != len(self.keys):
+            raise ValueError(values)
+        model = self.object_list.model
+        values = [
+            model._meta.get_field(key).to_python(value)
+            for key, value in zip(self.keys, values)
+        ]
+        if None in values or any(
+            isinstance(value, int) and not MIN_INTEGER <= value <= MAX_INTEGER
+            for value in values
+        ):
+            # Иначе OverflowError при передаче числа в SQLite.
+            raise ValueError(values)
+        return direction, values
 
-def pag(request, post_list):
-    paginator = Paginator(post_list, settings.POSTS_PER_PAGE)
+    def get_page(self, cursor):
+        direction, values = None, None
+        if cursor:
+            try:
+                direction, values = self.decode_cursor(cursor)
+            except (
+                ValueError, TypeError, binascii.Error, ValidationError
+            ):
+                pass
+        forward = direction != BACKWARD
+        queryset = self.object_list
+        if values is not None:
+            queryset = queryset.filter(self._seek_filter(values, forward))
+        rows = list(
+            queryset.order_by(*self._ordering(forward))[:self.per_page + 1]
+        )
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if forward:
+            next_cursor = (
+                self.encode_cursor(FORWARD, rows[-1]) if has_more else None
+            )
+            previous_cursor = None
+            if values is not None:
+                previous_cursor = self.encode_cursor(
+                    BACKWARD, rows[0] if rows else dict(zip(self.keys, values))
+                )
+            return KeysetPage(rows, self, next_cursor, previous_cursor)
+        if not rows:
+            return self.get_page(None)
+        rows.reverse()
+        previous_cursor = (
+            self.encode_cursor(BACKWARD, rows[0]) if has_more else None
+        )
+        next_cursor = self.encode_cursor(FORWARD, rows[-1])
+        return KeysetPage(rows, self, next_cursor, previous_cursor)
+
+    def _key_values(self, obj):
+        if isinstance(obj, dict):
+            return [obj[key] for key in self.keys]
+        return [getattr(obj, key) for key in self.keys]
+
+    def _ordering(self, forward):
+        prefix = '-' if forward == self.descending else ''
+        return [prefix + key for key in self.keys]
+
+    def _seek_filter(self, values, forward):
+        # (a, b) < (x, y) записано как a <= x AND (a < x OR a = x AND b < y):
+        # первое условие даёт СУБД диапазон по индексу на первом ключе.
+        lookup = 'lt' if forward == self.descending else 'gt'
+        condition = Q()
+        for i, key in enumerate(self.keys):
+            condition |= Q(
+                **dict(zip(self.keys[:i], values[:i])),
+                **{f'{key}__{lookup}': values[i]},
+            )
+        return Q(**{f'{self.keys[0]}__{lookup}e': values[0]}) & condition
+
+
+class CachedCountPaginator(Paginator):
+    """Паджинатор, берущий размер ленты из кэшированных счётчиков.
+
+    Счётчик приблизительный, поэтому влияет только на ссылки на страницы:
+    содержимое страницы всегда выбирается срезом без оглядки на него.
+    """
+
+    def __init__(self, object_list, per_page, feed):
+        super().__init__(object_list, per_page)
+        self.feed = feed
+
+    @cached_property
+    def count(self):
+        return counters.get_count(self.feed, self.object_list)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        return self._get_page(
+            self.object_list[bottom:bottom + self.per_page], number, self
+        )
+
+
+def pag(
+    request, post_list, keyset=None, feed=None, keys=('pub_date', 'id')
+):
+    """Возвращает страницу постов для запроса.
+
+    В keyset-режиме навигация идёт по курсорам ``?cursor=`` и ключу
+    ``keys``; ссылки вида ``?page=N`` по-прежнему обслуживаются обычным
+    паджинатором. Если указана лента ``feed``, её размер берётся из
+    счётчиков ``counters``.
+    """
+    if keyset is None:
+        keyset = settings.POSTS_KEYSET_PAGINATION
     page_number = request.GET.get('page')
+    if keyset and page_number is None:
+        paginator = KeysetPaginator(
+            post_list, settings.POSTS_PER_PAGE, keys=keys
+        )
+        return paginator.get_page(request.GET.get('cursor'))
+    if feed is not None:
+        paginator = CachedCountPaginator(
+            post_list, settings.POSTS_PER_PAGE, feed
+        )
+    else:
+        paginator = Paginator(post_list, settings.POSTS_PER_PAGE)
     return paginator.get_page(page_number)
+
+
+def comment_page(comments, cursor=None):
+    """Страница комментариев от новых к старым по курсору ``cursor``.
+
+    Комментарии выбираются по ключу ``(created, id)`` порциями
+    по ``COMMENTS_PER_PAGE``, поэтому страница поста с любым числом
+    комментариев читает и показывает не больше одной порции.
+    """
+    paginator = KeysetPaginator(
+        comments, settings.COMMENTS_PER_PAGE, keys=('created', 'id')
+    )
+    return paginator.get_page(cursor)
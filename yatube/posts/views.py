@@ -1,24 +1,34 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import redirect, render, get_object_or_404
 from django.contrib.auth.decorators import login_required
 
+from . import caching, counters, exporting, search, timeline
+from .caching import anonymous_cache_page, conditional_page
 from .forms import PostForm, CommentForm
 from .models import Post, Group, User, Comment, Follow
-from .utils import pag
+from .utils import comment_page, pag
 
 
+@conditional_page(caching.INDEX_TAG)
+@anonymous_cache_page(caching.INDEX_TAG)
 def index(request):
-    post_list = Post.objects.all().select_related('group', 'author')
-    page_obj = pag(request, post_list)
+    post_list = Post.objects.for_listing()
+    page_obj = pag(request, post_list, feed=counters.INDEX)
     context = {
         'page_obj': page_obj,
     }
     return render(request, 'posts/index.html', context)
 
 
+@conditional_page('group:{slug}')
+@anonymous_cache_page('group:{slug}')
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    page_obj = pag(request, post_list)
+    post_list = group.posts.for_listing()
+    page_obj = pag(request, post_list, feed=counters.group_feed(group.pk))
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -26,10 +36,14 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@conditional_page('author:{username}')
+@anonymous_cache_page('author:{username}')
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    page_obj = pag(request, post_list)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    post_list = author.posts.for_listing()
+    page_obj = pag(request, post_list, feed=counters.author_feed(author.pk))
     following = False
     if request.user.is_authenticated:
         following = Follow.objects.filter(
@@ -44,9 +58,30 @@ def profile(request, username):
     return render(request, 'posts/profile.html', context)
 
 
+def _post_author_state(request, post_id):
+    """На странице поста есть число постов автора, а новые посты
+    сбрасывают только тег автора. Автор поста запоминается в кэше,
+    чтобы ответ 304 не требовал запроса к базе."""
+    key = f'posts:post-author:{post_id}'
+    username = cache.get(key)
+    if username is None:
+        username = Post.objects.filter(pk=post_id).values_list(
+            'author__username', flat=True
+        ).first()
+        if username is None:
+            return []
+        cache.set(key, username, settings.POSTS_PAGE_CACHE_TTL)
+    tag = caching.author_tag(username)
+    return [caching.tag_stamps([tag])[tag]]
+
+
+@conditional_page('post:{post_id}', extra=_post_author_state)
+@anonymous_cache_page('post:{post_id}', extra=_post_author_state)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    comments = Comment.objects.filter(post=post_id)
+    post = get_object_or_404(Post.objects.for_detail(), pk=post_id)
+    comments = comment_page(
+        Comment.objects.filter(post=post_id).select_related('author')
+    )
     form = CommentForm()
     context = {
         'post': post,
@@ -56,6 +91,37 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+@conditional_page('post:{post_id}')
+@anonymous_cache_page('post:{post_id}')
+def post_comments(request, post_id):
+    """Следующая порция комментариев поста фрагментом HTML для кнопки
+    «Показать ещё»."""
+    comments = comment_page(
+        Comment.objects.filter(post=post_id).select_related('author'),
+        request.GET.get('cursor'),
+    )
+    if not comments and not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    context = {
+        'post_id': post_id,
+        'comments': comments,
+    }
+    return render(request, 'posts/includes/comments.html', context)
+
+
+def post_search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        results = search.search(Post.objects.for_listing(), query)
+        page_obj = pag(request, results, keyset=False)
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(
@@ -105,10 +171,16 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+def _follow_state(request):
+    return timeline.freshness(request.user)
+
+
 @login_required
+@conditional_page(extra=_follow_state)
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    page_obj = pag(request, post_list)
+    page_obj = timeline.page(
+        request, request.user, Post.objects.for_listing()
+    )
     context = {
         'page_obj': page_obj,
     }
@@ -129,3 +201,23 @@ def profile_unfollow(request, username):
     if author != request.user:
         Follow.objects.filter(user=request.user, author=author).delete()
     return redirect('posts:follow_index')
+
+
+@login_required
+def export_data(request, name):
+    if not request.user.is_staff:
+        raise PermissionDenied
+    if name not in exporting.EXPORTS:
+        raise Http404
+    file_format = request.GET.get('format', 'jsonl')
+    if file_format not in exporting.FORMATS:
+        file_format = 'jsonl'
+    compress = request.GET.get('gzip') == '1'
+    response = StreamingHttpResponse(
+        exporting.export(name, file_format, compress=compress),
+        content_type=exporting.content_type(file_format, compress),
+    )
+    response['Content-Disposition'] = 'attachment; filename="%s"' % (
+        exporting.filename(name, file_format, compress)
+    )
+    return response
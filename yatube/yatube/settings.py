@@ -28,6 +28,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',
+    'core.middleware.ProfilingMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -59,13 +62,84 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# Потоки, в которых ASGI-обработчик (yatube/asgi.py) выполняет Django.
+ASGI_THREADS = int(os.environ.get('YATUBE_ASGI_THREADS', 32))
+
+# Доля запросов, у которых замеряются SQL, шаблоны и миниатюры
+# (core/metrics.py). Длительность меряется у всех запросов.
+METRICS_SAMPLE_RATE = float(os.environ.get('YATUBE_METRICS_SAMPLE_RATE', 0.05))
+
+METRICS_SLOW_REQUEST_MS = 500
+
+METRICS_SLOW_QUERIES = 5
+
+METRICS_TIMERS = (
+    ('template', 'django.template.base.Template.render'),
+    ('thumbnail', 'posts.thumbnails.post_thumbnail'),
+)
+
+# Профили запросов по выборке стеков (core/profiling.py), по умолчанию
+# выключены.
+PROFILING_ENABLED = os.environ.get('YATUBE_PROFILING') == '1'
+
+PROFILING_DIR = os.path.join(BASE_DIR, 'profiles')
+
+PROFILING_INTERVAL_MS = 5
+
+PROFILING_THRESHOLD_MS = 500
+
+PROFILING_SAMPLE_RATE = 0.01
+
+# core.db — SQLite с WAL, настроенными прагмами, BEGIN IMMEDIATE
+# и повтором запросов при 'database is locked' (core/db/base.py).
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.db',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': int(os.environ.get('YATUBE_DB_CONN_MAX_AGE', 600)),
+        'OPTIONS': {
+            'LOCK_RETRIES': 5,
+            'LOCK_BACKOFF': 0.05,
+            'LOCK_TIMEOUT': 5,
+        },
     }
 }
 
+# Реплики только для чтения: пути к файлам SQLite через запятую в
+# YATUBE_DB_REPLICAS. Локально реплику обновляет sync_replicas.
+DB_REPLICAS = []
+for number, path in enumerate(
+    filter(None, os.environ.get('YATUBE_DB_REPLICAS', '').split(',')), 1
+):
+    DATABASES[f'replica{number}'] = dict(
+        DATABASES['default'], NAME=path, TEST={'MIRROR': 'default'}
+    )
+    DB_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Страницы, которые читают с реплик (только GET и HEAD).
+DB_REPLICA_VIEWS = (
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:post_comments',
+    'posts:post_search',
+    'posts:follow_index',
+    'posts:api_index',
+    'posts:api_post_detail',
+    'posts:api_post_comments',
+    'posts:api_group_list',
+    'posts:api_profile',
+    'posts:api_follow_index',
+    'about:author',
+    'about:tech',
+)
+
+# Сколько секунд после записи пользователь читает с основной базы.
+DB_STICKY_SECONDS = 10
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -107,11 +181,49 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 POSTS_PER_PAGE = 10
 
+POSTS_KEYSET_PAGINATION = False
+
+COMMENTS_PER_PAGE = 20
+
+POSTS_COUNT_CACHE_TTL = 60 * 15
+
+POSTS_HTTP_MAX_AGE = 0
+
+POSTS_PAGE_CACHE_TTL = 60 * 5
+
+TIMELINE_CELEBRITY_FOLLOWERS = 1000
+
+TIMELINE_CELEBRITIES_CACHE_TTL = 60 * 10
+
+TIMELINE_FOLLOW_BACKFILL = 1000
+
+TIMELINE_BATCH_SIZE = 500
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-CACHES = {
-    'default': {
+# Размеры миниатюр, которые создаются в фоне сразу после сохранения поста.
+POST_THUMBNAILS = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+
+POST_THUMBNAIL_WORKERS = 2
+
+# Кэш выбирается переменной окружения YATUBE_CACHE. LocMemCache у каждого
+# процесса свой, поэтому при нескольких воркерах нужен общий 'sqlite'.
+CACHE_BACKENDS = {
+    'locmem': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    'sqlite': {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
+    },
+}
+
+CACHES = {
+    'default': CACHE_BACKENDS[os.environ.get('YATUBE_CACHE', 'locmem')],
 }